@@ -65,8 +65,10 @@ def create_app():
     # Register blueprints
     from app.routes.setup import setup_bp
     from app.routes.webhook import webhook_bp
+    from app.routes.metrics import metrics_bp
 
     app.register_blueprint(setup_bp)
     app.register_blueprint(webhook_bp)
+    app.register_blueprint(metrics_bp)
 
     return app
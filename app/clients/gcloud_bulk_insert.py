@@ -0,0 +1,89 @@
+"""
+Coalescing of instance creations into Compute Engine bulk inserts.
+"""
+import threading
+import time
+from concurrent.futures import Future
+from app.utils import metrics
+
+
+class _Batch:
+    """Instance names waiting to be created together."""
+
+    def __init__(self):
+        self.names = []
+        self.futures = []
+
+
+class InsertCoalescer:
+    """
+    Collect instance creations per key over a short window and create them together.
+
+    The first caller for a key opens a batch, waits ``window`` seconds and then
+    flushes all names collected for that key in one call. Every caller blocks
+    until its batch is flushed and gets its own instance name back, or the
+    exception of the flush. A batch is closed early once it holds ``max_batch`` names.
+    """
+
+    def __init__(self, window, max_batch=50):
+        """
+        Initialize InsertCoalescer.
+
+        Args:
+            window (float): Seconds to wait for more creations with the same key.
+            max_batch (int): Maximum number of instances per flush.
+        """
+        self.window = window
+        self.max_batch = max_batch
+        self._lock = threading.Lock()
+        self._batches = {}
+
+    def submit(self, key, instance_name, flush):
+        """
+        Add an instance to the open batch for key and wait until the batch is flushed.
+
+        Args:
+            key: Hashable key, only instances with equal keys are created together.
+            instance_name (str): The name of the instance to create.
+            flush (callable): Function taking the list of instance names of a batch.
+                Used by the caller that opened the batch.
+
+        Returns:
+            str: The instance name.
+        """
+        future = Future()
+        with self._lock:
+            batch = self._batches.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._batches[key] = batch
+            batch.names.append(instance_name)
+            batch.futures.append(future)
+            if len(batch.names) >= self.max_batch:
+                # Full, the next creation opens a new batch
+                self._batches.pop(key, None)
+
+        if leader:
+            time.sleep(self.window)
+            with self._lock:
+                if self._batches.get(key) is batch:
+                    self._batches.pop(key)
+                names = list(batch.names)
+                futures = list(batch.futures)
+            self._flush(names, futures, flush)
+
+        return future.result()
+
+    def _flush(self, names, futures, flush):
+        """Create all instances of a batch and resolve the futures of its callers."""
+        metrics.inc('gce_bulk_insert_batches_total')
+        metrics.inc('gce_bulk_insert_instances_total', len(names))
+        try:
+            flush(names)
+        except Exception as e:
+            for future in futures:
+                future.set_exception(e)
+            return
+        for name, future in zip(names, futures):
+            future.set_result(name)
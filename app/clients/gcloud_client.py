@@ -1,15 +1,48 @@
 """
 Google Cloud Client for managing GCE instances.
 """
+import functools
 import logging
 import os
-import re
+import threading
+import time
 import uuid
 import shlex
+from collections import OrderedDict
 import google.cloud.compute_v1 as compute_v1
+from google.api_core import exceptions as google_exceptions
+from app.clients.gcloud_bulk_insert import InsertCoalescer
+from app.clients.gcloud_delete_queue import DeleteQueue
+from app.clients.gcloud_operations import OperationTracker
+from app.clients.gcloud_quota import QuotaTracker, template_demand
+from app.clients.gcloud_template_index import TEMPLATE_LIST_FILTER, label_prefix, template_index
+from app.clients.gcloud_zones import is_exhaustion_error, parse_zones, zone_cooldown
+from app.utils import metrics
+from app.utils.retry import RetryPolicy
 
 logger = logging.getLogger(__name__)
 
+# Instance metadata key holding the encoded just-in-time runner configuration
+JIT_CONFIG_METADATA_KEY = 'github-jit-config'
+METADATA_ATTRIBUTES_URL = 'http://metadata.google.internal/computeMetadata/v1/instance/attributes'
+# Bulk inserts cannot set per-instance metadata, so the runner reads its name from the metadata server
+METADATA_INSTANCE_NAME_URL = 'http://metadata.google.internal/computeMetadata/v1/instance/name'
+# Zones of created instances remembered for their deletion
+MAX_REMEMBERED_INSTANCE_ZONES = 10000
+# Warm pool instances boot without runner configuration and wait for this metadata attribute
+RUNNER_SCRIPT_METADATA_KEY = 'github-runner-script'
+# Metadata attribute of a claimed warm pool instance holding the owner/repo of its job
+RUNNER_SCOPE_METADATA_KEY = 'github-runner-scope'
+# Cost tracking labels of the job an instance was created for, see create_runner_instance
+JOB_LABELS = ('gha-owner', 'gha-repo', 'gha-runner')
+# Instance label holding the label prefix of the pool a warm instance belongs to
+POOL_LABEL = 'gha-pool'
+# Guest attribute a warm pool instance sets once it is booted and waits for a job
+POOL_READY_GUEST_ATTRIBUTE = 'github-runner/state'
+GUEST_ATTRIBUTES_URL = 'http://metadata.google.internal/computeMetadata/v1/instance/guest-attributes'
+# Zone operation recorded when Compute Engine reclaims a Spot VM
+PREEMPTED_OPERATION_TYPE = 'compute.instances.preempted'
+
 
 class GCloudClient:
     """Client for interacting with Google Cloud Compute Engine API."""
@@ -17,9 +50,54 @@ class GCloudClient:
     def __init__(self):
         """Initialize GCloudClient with project and zone configuration."""
         self.project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
-        self.zone = os.environ.get('GOOGLE_CLOUD_ZONE', 'us-central1-a')
+        # Ordered zones for runners, later zones are used when earlier ones are exhausted
+        self.zones = parse_zones(
+            os.environ.get('GOOGLE_CLOUD_ZONES'), os.environ.get('GOOGLE_CLOUD_ZONE', 'us-central1-a')
+        )
+        self.zone = self.zones[0]
         self.github_runner_group = os.environ.get('GITHUB_RUNNER_GROUP', '').strip()
         self.region = '-'.join(self.zone.split('-')[:-1])
+        self._instance_zones_lock = threading.Lock()
+        self._instance_zones = OrderedDict()
+        self.retry_policy = RetryPolicy('compute_api')
+        # Seconds to collect queued jobs with the same template into one bulk insert, 0 disables it
+        bulk_insert_window = float(os.environ.get('GCE_BULK_INSERT_WINDOW', 0))
+        self.insert_coalescer = None
+        if bulk_insert_window > 0:
+            self.insert_coalescer = InsertCoalescer(
+                bulk_insert_window, max_batch=int(os.environ.get('GCE_BULK_INSERT_MAX_BATCH', 50))
+            )
+        # Threads waiting for insert/delete operations to finish, 0 disables operation tracking
+        operation_tracker_workers = int(os.environ.get('GCE_OPERATION_TRACKER_WORKERS', 4))
+        self.operation_tracker = None
+        if operation_tracker_workers > 0:
+            self.operation_tracker = OperationTracker(
+                max_workers=operation_tracker_workers,
+                timeout=int(os.environ.get('GCE_OPERATION_TIMEOUT', 300)),
+            )
+        # Called with (instance_names, error) when an insert operation fails after it was accepted
+        self.on_provision_failure = None
+        # Labels created as Spot VMs, * for all labels
+        self.spot_labels = {
+            label.strip() for label in os.environ.get('GCE_SPOT_LABELS', '').split(',') if label.strip()
+        }
+        self._spot_unavailable_lock = threading.Lock()
+        self._spot_unavailable = {}
+        # Hold jobs while the regional quota has no room for their instance
+        self.quota = None
+        if os.environ.get('GCE_QUOTA_ADMISSION', 'false').strip().lower() == 'true':
+            self.quota = QuotaTracker(self._get_region, ttl=int(os.environ.get('GCE_QUOTA_CACHE_TTL', 60)))
+        self._machine_type_cpus = {}
+        # Seconds to collect deletions in the background queue, 0 deletes in the calling thread
+        delete_queue_window = float(os.environ.get('GCE_DELETE_QUEUE_WINDOW', 0))
+        self.delete_queue = None
+        if delete_queue_window > 0:
+            self.delete_queue = DeleteQueue(
+                self._start_delete,
+                window=delete_queue_window,
+                timeout=int(os.environ.get('GCE_OPERATION_TIMEOUT', 300)),
+                max_delay=float(os.environ.get('GCE_DELETE_QUEUE_MAX_BACKOFF', 300)),
+            )
 
         if not self.project_id:
             logger.warning("GOOGLE_CLOUD_PROJECT not set. GCloudClient will not work correctly.")
@@ -29,10 +107,27 @@ class GCloudClient:
         # Create a RegionInstanceTemplatesClient for retrieving templates in a specific region
         # https://docs.cloud.google.com/python/docs/reference/compute/latest/google.cloud.compute_v1.services.region_instance_templates
         self.instance_templates_client = compute_v1.RegionInstanceTemplatesClient()
+        self.operations_client = compute_v1.GlobalOperationsClient()
+        self.regions_client = compute_v1.RegionsClient()
+        self.machine_types_client = compute_v1.MachineTypesClient()
+
+    def _list_templates(self):
+        """List the runner instance templates of the region."""
+        return list(self.retry_policy.call(
+            self.instance_templates_client.list,
+            request=compute_v1.ListRegionInstanceTemplatesRequest(
+                project=self.project_id,
+                region=self.region,
+                filter=TEMPLATE_LIST_FILTER,
+            ),
+        ))
 
     def _get_template_name(self, template_name):
         """
-        Find a matching instance template by name prefix.
+        Find the newest instance template matching the label.
+
+        Templates are looked up in a process-wide index that is refreshed on a TTL,
+        so the list API call is not on the path of every queued job.
 
         Args:
             template_name (str): The name prefix to search for.
@@ -40,21 +135,102 @@ class GCloudClient:
         Returns:
             google.cloud.compute_v1.InstanceTemplate or None: The matching template resource.
         """
-        # Replace dots with dashes for template name, so gcp-ubuntu-24.04 matches gcp-ubuntu-24-04
-        prefix = template_name.replace('.', '-')
-        # logger.info(f"Prefix: {prefix}")
-        # Create regex pattern: prefix followed by dash, at least 12 digits, and optional alphanumeric characters
-        pattern = re.compile(f"^{re.escape(prefix)}-\\d{{14,}}[a-z0-9]*$")
         try:
-            # List all templates to find one that matches the pattern
-            for template in self.instance_templates_client.list(project=self.project_id, region=self.region):
-                # logger.info(f"Template: {template.name}")
-                if pattern.match(template.name):
-                    return template
-            return None
-        except Exception:
+            return template_index.get(
+                (self.project_id, self.region), label_prefix(template_name), self._list_templates
+            )
+        except Exception as e:
+            logger.warning("Failed to list instance templates in region %s: %s", self.region, e)
             return None
 
+    def load_templates(self):
+        """
+        Build the template index, e.g. at startup before the first job arrives.
+
+        Returns:
+            set: The known template name prefixes, empty if listing failed.
+        """
+        try:
+            return set(template_index.load((self.project_id, self.region), self._list_templates))
+        except Exception as e:
+            logger.warning("Failed to list instance templates in region %s: %s", self.region, e)
+            return set()
+
+    def template_exists(self, template_name):
+        """
+        Check if an instance template matches the given label.
+
+        Answered from the cached template index. A miss rebuilds the index at most
+        once per miss refresh interval, so a new template is found right away while
+        labels without template cannot cause a list call per job.
+
+        Args:
+            template_name (str): The name prefix to search for.
+
+        Returns:
+            bool: True if a matching template exists.
+        """
+        return self._get_template_name(template_name) is not None
+
+    def new_instance_name(self, template_name):
+        """
+        Generate a unique instance name, which is also used as runner name.
+
+        Args:
+            template_name (str): The label or name of the instance template.
+
+        Returns:
+            str: The instance name.
+        """
+        # Name must start with a lowercase letter followed by up to 62 lowercase letters,
+        # numbers, or hyphens, and cannot end with a hyphen.
+        instance_uuid = uuid.uuid4().hex[:16]
+        if template_name.lower().startswith("dependabot"):
+            return f"gcp-runner-dependabot-{instance_uuid}"
+        return f"gcp-runner-{instance_uuid}"
+
+    def _startup_script(
+        self, repo_url, registration_token, instance_name, template_name, jit_config=None, runner_labels=None
+    ):
+        """
+        Build the startup script that registers and starts the runner.
+
+        With a JIT config the runner skips ./config.sh and starts directly with the
+        configuration read from the instance metadata. Without instance_name the
+        runner is named after the instance, read from the metadata server. The
+        runner is registered with runner_labels, or with the template label.
+        """
+        if jit_config:
+            return (
+                "cd /actions-runner && "
+                "JIT_CONFIG=\"$(curl -sf -H 'Metadata-Flavor: Google' "
+                f"'{METADATA_ATTRIBUTES_URL}/{JIT_CONFIG_METADATA_KEY}')\" && "
+                "sudo -u runner ./run.sh --jitconfig \"$JIT_CONFIG\""
+            )
+
+        # Use shlex.quote to prevent command injection
+        runner_group_flag = ""
+        if self.github_runner_group:
+            runner_group_flag = f" --runnergroup {shlex.quote(self.github_runner_group)}"
+
+        runner_name = shlex.quote(instance_name) if instance_name else (
+            f"\"$(curl -sf -H 'Metadata-Flavor: Google' '{METADATA_INSTANCE_NAME_URL}')\""
+        )
+
+        return (
+            "cd /actions-runner && "
+            f"sudo -u runner ./config.sh --url {shlex.quote(repo_url)} "
+            f"--token {shlex.quote(registration_token)} "
+            f"--name {runner_name} "
+            f"--labels {shlex.quote(','.join(runner_labels or [template_name]))} "
+            f"{runner_group_flag} "
+            "--ephemeral "
+            "--unattended "
+            "--no-default-labels "
+            "--disableupdate && "
+            "sudo -u runner ./run.sh"
+        )
+
     def create_runner_instance(
         self,
         registration_token,
@@ -62,6 +238,9 @@ class GCloudClient:
         template_name,
         instance_label=None,
         delivery_id=None,
+        jit_config=None,
+        instance_name=None,
+        runner_labels=None,
     ):
         """
         Create a new GCE instance for a GitHub Actions runner.
@@ -72,6 +251,9 @@ class GCloudClient:
             template_name (str): The name of the instance template to use.
             instance_label (str): Label to add to the Instance for Cost Tracking.
             delivery_id (str): The GitHub webhook delivery ID for log correlation.
+            jit_config (str): Encoded just-in-time runner config, used instead of the registration token.
+            instance_name (str): The instance name, must match the runner name of the JIT config.
+            runner_labels (list): Labels of the runner, defaults to the template label.
 
         Returns:
             str: The name of the created instance.
@@ -93,105 +275,377 @@ class GCloudClient:
             )
             return None
 
-        # Name must start with a lowercase letter followed by up to 62 lowercase letters,
-        # numbers, or hyphens, and cannot end with a hyphen.
-        instance_uuid = uuid.uuid4().hex[:16]
-        if instance_template_resource.name.startswith("dependabot"):
-            instance_name = f"gcp-runner-dependabot-{instance_uuid}"
-        else:
-            instance_name = f"gcp-runner-{instance_uuid}"
-
-        logger.info(
-            "Creating GCE instance %s with template %s, delivery_id: %s",
-            instance_name,
-            instance_template_resource.self_link,
-            delivery_id,
-        )
-
-        # Set instance name
-        instance_resource = compute_v1.Instance()  # google.cloud.compute_v1.types.Instance
-        instance_resource.name = instance_name
+        if not instance_name:
+            instance_name = self.new_instance_name(instance_template_resource.name)
 
+        labels = None
         if instance_label is not None:
             owner, repo = instance_label.split("/")
-            instance_resource.labels = {
+            labels = {
                 "gha-owner": owner.lower(),
                 "gha-repo": repo.lower(),
                 "gha-runner": template_name
             }
 
-        # Set metadata (startup script) - use shlex.quote to prevent command injection
-        runner_group_flag = ""
-        if self.github_runner_group:
-            runner_group_flag = f" --runnergroup {shlex.quote(self.github_runner_group)}"
+        spot_label = template_name if self.use_spot(template_name) else None
 
-        startup_script = (
-            "cd /actions-runner && "
-            f"sudo -u runner ./config.sh --url {shlex.quote(repo_url)} "
-            f"--token {shlex.quote(registration_token)} "
-            f"--name {shlex.quote(instance_name)} "
-            f"--labels {shlex.quote(template_name)} "
-            f"{runner_group_flag} "
-            "--ephemeral "
-            "--unattended "
-            "--no-default-labels "
-            "--disableupdate && "
-            "sudo -u runner ./run.sh"
+        # JIT configs are per instance, bulk inserts can only set the same metadata for all instances
+        if self.insert_coalescer and not jit_config:
+            startup_script = self._startup_script(
+                repo_url, registration_token, None, template_name, runner_labels=runner_labels
+            )
+            return self.insert_coalescer.submit(
+                # The label is part of the shared startup script, labels with the same template are separate batches
+                (
+                    instance_template_resource.self_link,
+                    template_name,
+                    repo_url,
+                    registration_token,
+                    instance_label,
+                    spot_label,
+                    tuple(runner_labels or ()),
+                ),
+                instance_name,
+                lambda names: self._with_spot_fallback(
+                    spot_label,
+                    lambda spot: self._insert_instances(
+                        names, instance_template_resource, labels, self._metadata(startup_script), delivery_id, spot
+                    ),
+                    delivery_id,
+                ),
+            )
+
+        startup_script = self._startup_script(
+            repo_url, registration_token, instance_name, template_name, jit_config=jit_config, runner_labels=runner_labels
         )
-        metadata = compute_v1.Metadata()
-        metadata.items = [
+        metadata = self._metadata(startup_script, jit_config)
+        self._with_spot_fallback(
+            spot_label,
+            lambda spot: self._insert_instance(
+                instance_name, instance_template_resource, labels, metadata, delivery_id, spot
+            ),
+            delivery_id,
+        )
+        return instance_name
+
+    def _get_region(self):
+        """Get the region with its quotas."""
+        return self.retry_policy.call(self.regions_client.get, project=self.project_id, region=self.region)
+
+    def _guest_cpus(self, machine_type):
+        """Return the vCPUs of a machine type, cached as machine types do not change."""
+        machine_type = machine_type.rsplit('/', 1)[-1]
+        if machine_type not in self._machine_type_cpus:
+            self._machine_type_cpus[machine_type] = self.retry_policy.call(
+                self.machine_types_client.get, project=self.project_id, zone=self.zone, machine_type=machine_type
+            ).guest_cpus
+        return self._machine_type_cpus[machine_type]
+
+    def _quota_demand(self, template_name):
+        """Return the quota demand of one instance of a label, None if the label has no template."""
+        instance_template_resource = self._get_template_name(template_name)
+        if not instance_template_resource:
+            return None
+        return template_demand(
+            instance_template_resource, self._guest_cpus(instance_template_resource.properties.machine_type)
+        )
+
+    def has_quota(self, template_name):
+        """
+        Check if the regional quota has room for an instance of a label.
+
+        Args:
+            template_name (str): The runner label.
+
+        Returns:
+            bool: True if an instance fits, or quota admission is disabled.
+        """
+        if not self.quota:
+            return True
+        demand = self._quota_demand(template_name)
+        return demand is None or self.quota.fits(demand)
+
+    def reserve_quota(self, template_name):
+        """
+        Reserve the regional quota for an instance of a label.
+
+        Args:
+            template_name (str): The runner label.
+
+        Returns:
+            bool: True if the quota was reserved, or quota admission is disabled.
+        """
+        if not self.quota:
+            return True
+        demand = self._quota_demand(template_name)
+        return demand is None or self.quota.reserve(demand)
+
+    def use_spot(self, template_name):
+        """
+        Check if runners of a label are created as Spot VMs.
+
+        Args:
+            template_name (str): The runner label.
+
+        Returns:
+            bool: True if Spot is configured for the label and was not recently unavailable.
+        """
+        if not self.is_spot_label(template_name):
+            return False
+        with self._spot_unavailable_lock:
+            return self._spot_unavailable.get(template_name, 0) <= time.monotonic()
+
+    def is_spot_label(self, template_name):
+        """Check if Spot VMs are configured for a label."""
+        return template_name in self.spot_labels or '*' in self.spot_labels
+
+    def spot_unavailable(self, template_name, error=None):
+        """Create standard VMs for a label for the zone cool-down period."""
+        with self._spot_unavailable_lock:
+            self._spot_unavailable[template_name] = time.monotonic() + zone_cooldown.seconds
+        metrics.inc(f'gce_spot_fallbacks_total{{label="{template_name}"}}')
+        logger.warning(
+            "Spot VMs unavailable for label %s, creating standard VMs for %ss: %s",
+            template_name,
+            zone_cooldown.seconds,
+            error,
+        )
+
+    def _with_spot_fallback(self, spot_label, insert, delivery_id=None):
+        """Call insert with the Spot label and again as standard VM if no zone has Spot capacity."""
+        if not spot_label:
+            return insert(None)
+        try:
+            return insert(spot_label)
+        except Exception as e:
+            if not is_exhaustion_error(e):
+                raise
+            logger.warning("No Spot capacity for %s, falling back to standard, delivery_id: %s", spot_label, delivery_id)
+            self.spot_unavailable(spot_label, e)
+            return insert(None)
+
+    def _spot_scheduling(self, instance_template_resource):
+        """
+        Return the scheduling of the template changed to Spot.
+
+        Fields of the insert request replace the template's, so the template scheduling,
+        e.g. the maximum run duration, is copied.
+        """
+        scheduling = compute_v1.Scheduling(instance_template_resource.properties.scheduling)
+        scheduling.provisioning_model = 'SPOT'
+        scheduling.instance_termination_action = 'DELETE'
+        # Spot VMs cannot be restarted automatically or live migrated
+        scheduling.automatic_restart = False
+        scheduling.on_host_maintenance = 'TERMINATE'
+        return scheduling
+
+    def _metadata(self, startup_script, jit_config=None):
+        """Build the instance metadata with the startup script."""
+        metadata_items = [
             compute_v1.Items(key="startup-script", value=startup_script),
             compute_v1.Items(key="vmDnsSetting", value="ZonalOnly"),
             compute_v1.Items(key="block-project-ssh-keys", value="true"),
         ]
-        instance_resource.metadata = metadata
+        if jit_config:
+            metadata_items.append(compute_v1.Items(key=JIT_CONFIG_METADATA_KEY, value=jit_config))
+        metadata = compute_v1.Metadata()
+        metadata.items = metadata_items
+        return metadata
 
-        # Create the request
-        # https://docs.cloud.google.com/python/docs/reference/compute/latest/google.cloud.compute_v1.types.InsertInstanceRequest
-        request = compute_v1.InsertInstanceRequest(
-            project=self.project_id,
-            zone=self.zone,
-            instance_resource=instance_resource,
-            source_instance_template=instance_template_resource.self_link
+    def _insert_instances(
+        self, instance_names, instance_template_resource, labels, metadata, delivery_id=None, spot_label=None
+    ):
+        """Create instances with the same template and metadata, using a bulk insert for more than one."""
+        if len(instance_names) == 1:
+            self._insert_instance(
+                instance_names[0], instance_template_resource, labels, metadata, delivery_id, spot_label
+            )
+            return
+
+        logger.info(
+            "Bulk creating %d GCE instances with template %s, delivery_id: %s",
+            len(instance_names),
+            instance_template_resource.self_link,
+            delivery_id,
         )
 
+        instance_properties = compute_v1.InstanceProperties()
+        if labels is not None:
+            instance_properties.labels = labels
+        instance_properties.metadata = metadata
+        if spot_label:
+            instance_properties.scheduling = self._spot_scheduling(instance_template_resource)
+
+        # https://docs.cloud.google.com/compute/docs/reference/rest/v1/instances/bulkInsert
+        bulk_insert_resource = compute_v1.BulkInsertInstanceResource(
+            count=len(instance_names),
+            min_count=len(instance_names),
+            source_instance_template=instance_template_resource.self_link,
+            instance_properties=instance_properties,
+            per_instance_properties={
+                name: compute_v1.BulkInsertInstanceResourcePerInstanceProperties(name=name)
+                for name in instance_names
+            },
+        )
+
+        try:
+            operation, zone = self._insert_in_zones(
+                instance_names,
+                self.instance_client.bulk_insert,
+                lambda zone: compute_v1.BulkInsertInstanceRequest(
+                    project=self.project_id,
+                    zone=zone,
+                    bulk_insert_instance_resource_resource=bulk_insert_resource,
+                    request_id=str(uuid.uuid4()),
+                ),
+                delivery_id,
+                cool_down=not spot_label,
+            )
+            logger.info(
+                "Bulk instance creation operation started: %s in zone %s, delivery_id: %s",
+                operation.name,
+                zone,
+                delivery_id,
+            )
+            self._track(operation, 'insert', instance_names, delivery_id, zone=zone, spot_label=spot_label)
+        except Exception as e:
+            logger.error(
+                "Failed to bulk create instances: %s, delivery_id: %s", e, delivery_id
+            )
+            raise
+
+    def _insert_instance(
+        self, instance_name, instance_template_resource, labels, metadata, delivery_id=None, spot_label=None
+    ):
+        """Create one instance from the template, as Spot VM if spot_label is set."""
+        logger.info(
+            "Creating GCE instance %s with template %s, delivery_id: %s",
+            instance_name,
+            instance_template_resource.self_link,
+            delivery_id,
+        )
+
+        # Set instance name
+        instance_resource = compute_v1.Instance()  # google.cloud.compute_v1.types.Instance
+        instance_resource.name = instance_name
+        if labels is not None:
+            instance_resource.labels = labels
+        # Set metadata (startup script)
+        instance_resource.metadata = metadata
+        if spot_label:
+            instance_resource.scheduling = self._spot_scheduling(instance_template_resource)
+
         try:
             # https://docs.cloud.google.com/compute/docs/reference/rest/v1/instances/insert
-            operation = self.instance_client.insert(request=request)
+            operation, zone = self._insert_in_zones(
+                [instance_name],
+                self.instance_client.insert,
+                # The request_id makes retries idempotent, Compute Engine ignores a repeated request with the same ID.
+                # https://docs.cloud.google.com/python/docs/reference/compute/latest/google.cloud.compute_v1.types.InsertInstanceRequest
+                lambda zone: compute_v1.InsertInstanceRequest(
+                    project=self.project_id,
+                    zone=zone,
+                    instance_resource=instance_resource,
+                    source_instance_template=instance_template_resource.self_link,
+                    request_id=str(uuid.uuid4()),
+                ),
+                delivery_id,
+                cool_down=not spot_label,
+            )
             logger.info(
-                "Instance creation operation started: %s, delivery_id: %s",
+                "Instance creation operation started: %s in zone %s, delivery_id: %s",
                 operation.name,
+                zone,
                 delivery_id,
             )
-            return instance_name
+            self._track(operation, 'insert', [instance_name], delivery_id, zone=zone, spot_label=spot_label)
         except Exception as e:
             logger.error(
                 "Failed to create instance: %s, delivery_id: %s", e, delivery_id
             )
             raise
 
+    def _insert_in_zones(self, instance_names, insert, build_request, delivery_id=None, cool_down=True):
+        """
+        Call insert in the first zone with capacity.
+
+        Zones are tried in the configured order, skipping zones that recently ran
+        out of resources. An exhaustion error cools the zone down and moves on to the next one.
+
+        Args:
+            instance_names (list): The names of the instances to create.
+            insert (callable): The insert or bulk_insert method of the instances client.
+            build_request (callable): Function returning the request for a zone.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+            cool_down (bool): False for Spot VMs, whose capacity says nothing about standard capacity.
+
+        Returns:
+            tuple: The operation and the zone of the instances.
+        """
+        zones = zone_cooldown.available(self.zones)
+        for index, zone in enumerate(zones):
+            try:
+                operation = self.retry_policy.call(insert, request=build_request(zone))
+            except Exception as e:
+                if not is_exhaustion_error(e) or index == len(zones) - 1:
+                    raise
+                if cool_down:
+                    zone_cooldown.cool_down(zone, e)
+                logger.warning(
+                    "Zone %s exhausted, trying zone %s, delivery_id: %s", zone, zones[index + 1], delivery_id
+                )
+                continue
+            self._remember_zone(instance_names, zone)
+            return operation, zone
+
+    def _remember_zone(self, instance_names, zone):
+        """Remember the zone of created instances for their deletion."""
+        with self._instance_zones_lock:
+            for name in instance_names:
+                self._instance_zones[name] = zone
+            while len(self._instance_zones) > MAX_REMEMBERED_INSTANCE_ZONES:
+                self._instance_zones.popitem(last=False)
+
+    def _on_insert_failure(self, zone, spot_label, instance_names, error):
+        """Cool down an exhausted zone or Spot label and pass the failed insert on to on_provision_failure."""
+        if is_exhaustion_error(error):
+            if spot_label:
+                # The replacement runner is created as standard VM
+                self.spot_unavailable(spot_label, error)
+            else:
+                zone_cooldown.cool_down(zone, error)
+        with self._instance_zones_lock:
+            for name in instance_names:
+                self._instance_zones.pop(name, None)
+        if self.on_provision_failure:
+            self.on_provision_failure(instance_names, error)
+
+    def _track(self, operation, kind, instance_names, delivery_id=None, zone=None, spot_label=None):
+        """Wait for the operation in the background, failed inserts go to on_provision_failure."""
+        if not self.operation_tracker:
+            return
+        on_failure = functools.partial(self._on_insert_failure, zone, spot_label) if kind == 'insert' else None
+        self.operation_tracker.track(
+            operation, kind, instance_names, on_failure=on_failure, delivery_id=delivery_id
+        )
+
     def delete_runner_instance(self, instance_name, delivery_id=None):
         """
         Delete a GCE instance.
 
+        With the delete queue the deletion is only queued and retried in the
+        background until the instance is gone.
+
         Args:
             instance_name (str): The name of the instance to delete.
             delivery_id (str): The GitHub webhook delivery ID for log correlation.
         """
-        logger.info(
-            "Deleting GCE instance %s, delivery_id: %s", instance_name, delivery_id
-        )
+        if self.delete_queue:
+            self.delete_queue.submit(instance_name, delivery_id=delivery_id)
+            return
         try:
-            operation = self.instance_client.delete(
-                project=self.project_id,
-                zone=self.zone,
-                instance=instance_name
-            )
-            logger.info(
-                "Instance deletion operation started: %s, delivery_id: %s",
-                operation.name,
-                delivery_id,
-            )
+            operation = self._start_delete(instance_name, delivery_id)
+            self._track(operation, 'delete', [instance_name], delivery_id)
         except Exception as e:
             logger.error(
                 "Failed to delete instance %s: %s, delivery_id: %s",
@@ -200,3 +654,372 @@ class GCloudClient:
                 delivery_id,
             )
             raise
+
+    def _start_delete(self, instance_name, delivery_id=None):
+        """
+        Start the deletion of a GCE instance.
+
+        Args:
+            instance_name (str): The name of the instance to delete.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            google.api_core.extended_operation.ExtendedOperation: The delete operation.
+        """
+        logger.info(
+            "Deleting GCE instance %s, delivery_id: %s", instance_name, delivery_id
+        )
+        with self._instance_zones_lock:
+            known_zone = self._instance_zones.get(instance_name)
+        # Instances created by another process may be in any of the configured zones
+        zones = [known_zone] if known_zone else self.zones
+        for index, zone in enumerate(zones):
+            try:
+                # request_id is not a flattened argument, so it needs a request object
+                operation = self.retry_policy.call(
+                    self.instance_client.delete,
+                    request=compute_v1.DeleteInstanceRequest(
+                        project=self.project_id,
+                        zone=zone,
+                        instance=instance_name,
+                        request_id=str(uuid.uuid4()),
+                    ),
+                )
+            except google_exceptions.NotFound:
+                if index == len(zones) - 1:
+                    self._forget_zone(instance_name)
+                    raise
+                continue
+            break
+        self._forget_zone(instance_name)
+        logger.info(
+            "Instance deletion operation started: %s, delivery_id: %s",
+            operation.name,
+            delivery_id,
+        )
+        return operation
+
+    def was_preempted(self, instance_name):
+        """
+        Check if Compute Engine preempted a Spot VM.
+
+        The operations of all zones are listed, the zone of an instance created by
+        another process is not known here, and the instance may be deleted already.
+
+        Args:
+            instance_name (str): The name of the instance.
+
+        Returns:
+            bool: True if a preemption operation exists for the instance.
+        """
+        request = compute_v1.AggregatedListGlobalOperationsRequest(
+            project=self.project_id,
+            filter=f'operationType = "{PREEMPTED_OPERATION_TYPE}"',
+            return_partial_success=True,
+        )
+        scoped_lists = self.retry_policy.call(self.operations_client.aggregated_list, request=request)
+        return any(
+            operation.target_link.endswith(f'/instances/{instance_name}')
+            for _, scoped_list in scoped_lists
+            for operation in scoped_list.operations
+        )
+
+    def _forget_zone(self, instance_name):
+        with self._instance_zones_lock:
+            self._instance_zones.pop(instance_name, None)
+
+    def _pool_startup_script(self):
+        """
+        Build the startup script of warm pool instances.
+
+        The instance reports that it is booted through a guest attribute and then waits
+        until a runner script is set in its metadata. The wait survives suspend/resume.
+        Work files of a previous job are removed when a stopped instance is reused.
+        """
+        return (
+            "rm -rf /actions-runner/_work; "
+            "curl -sf -X PUT --data ready -H 'Metadata-Flavor: Google' "
+            f"'{GUEST_ATTRIBUTES_URL}/{POOL_READY_GUEST_ATTRIBUTE}'; "
+            "until RUNNER_SCRIPT=\"$(curl -sf -H 'Metadata-Flavor: Google' "
+            f"'{METADATA_ATTRIBUTES_URL}/{RUNNER_SCRIPT_METADATA_KEY}')\"; do sleep 1; done; "
+            "bash -c \"$RUNNER_SCRIPT\""
+        )
+
+    def create_pool_instance(self, template_name):
+        """
+        Create an unregistered instance for the warm pool of a label.
+
+        Args:
+            template_name (str): The label of the pool.
+
+        Returns:
+            str or None: The name of the created instance, None if no template matches.
+        """
+        instance_template_resource = self._get_template_name(template_name)
+        if not instance_template_resource:
+            logger.warning("No matching instance template found for warm pool '%s'", template_name)
+            return None
+
+        instance_name = self.new_instance_name(instance_template_resource.name)
+        self._insert_instance(
+            instance_name, instance_template_resource, {POOL_LABEL: label_prefix(template_name)}, self._pool_metadata()
+        )
+        return instance_name
+
+    def _pool_metadata(self, fingerprint=None):
+        """Build the metadata of an unclaimed warm pool instance."""
+        metadata = self._metadata(self._pool_startup_script())
+        metadata.items.append(compute_v1.Items(key="enable-guest-attributes", value="TRUE"))
+        if fingerprint:
+            metadata.fingerprint = fingerprint
+        return metadata
+
+    def list_pool_instances(self, template_name):
+        """
+        List the instances of the warm pool of a label in all zones.
+
+        Args:
+            template_name (str): The label of the pool.
+
+        Returns:
+            list: google.cloud.compute_v1.Instance resources.
+        """
+        instances = []
+        for zone in self.zones:
+            request = compute_v1.ListInstancesRequest(
+                project=self.project_id,
+                zone=zone,
+                filter=f'labels.{POOL_LABEL} = "{label_prefix(template_name)}"',
+            )
+            zone_instances = list(self.retry_policy.call(self.instance_client.list, request=request))
+            self._remember_zone([instance.name for instance in zone_instances], zone)
+            instances.extend(zone_instances)
+        return instances
+
+    def iter_runner_instances(self):
+        """
+        Iterate over the runner instances in all zones.
+
+        Pages are fetched while iterating, so large fleets are not held in memory.
+
+        Yields:
+            google.cloud.compute_v1.Instance: The runner instances.
+        """
+        for zone in self.zones:
+            request = compute_v1.ListInstancesRequest(
+                project=self.project_id,
+                zone=zone,
+                filter='name eq "gcp-runner-.*"',
+                max_results=500,
+            )
+            for instance in self.retry_policy.call(self.instance_client.list, request=request):
+                self._remember_zone([instance.name], zone)
+                yield instance
+
+    def is_pool_instance(self, instance):
+        """Check if an instance belongs to a warm pool."""
+        return POOL_LABEL in instance.labels
+
+    def is_pool_instance_claimed(self, instance):
+        """Check if a runner script was already set for a warm pool instance."""
+        return any(item.key == RUNNER_SCRIPT_METADATA_KEY for item in instance.metadata.items)
+
+    def runner_scope(self, instance):
+        """
+        Return the repository a runner instance was created for.
+
+        Args:
+            instance (google.cloud.compute_v1.Instance): The runner instance as listed.
+
+        Returns:
+            tuple or None: Lowercase (owner, repo), None for instances without
+                scope metadata or gha-owner and gha-repo labels.
+        """
+        # The metadata of a claim wins, a recycled instance may run a job of another repository
+        for item in instance.metadata.items:
+            if item.key == RUNNER_SCOPE_METADATA_KEY and '/' in item.value:
+                owner, repo = item.value.split('/', 1)
+                return owner, repo
+        owner, repo = instance.labels.get('gha-owner'), instance.labels.get('gha-repo')
+        if owner and repo:
+            return owner, repo
+        return None
+
+    def is_pool_instance_ready(self, instance_name):
+        """
+        Check if a warm pool instance finished booting.
+
+        Args:
+            instance_name (str): The name of the instance.
+
+        Returns:
+            bool: True if the instance waits for a runner script.
+        """
+        namespace, key = POOL_READY_GUEST_ATTRIBUTE.split('/')
+        try:
+            attributes = self.instance_client.get_guest_attributes(
+                project=self.project_id,
+                zone=self._zone_of(instance_name),
+                instance=instance_name,
+                query_path=f"{namespace}/",
+            )
+        except google_exceptions.NotFound:
+            # No guest attributes are written yet
+            return False
+        return any(
+            item.namespace == namespace and item.key == key and item.value == 'ready'
+            for item in attributes.query_value.items
+        )
+
+    def claim_pool_instance(
+        self,
+        instance,
+        repo_url,
+        registration_token,
+        template_name,
+        jit_config=None,
+        runner_labels=None,
+        instance_label=None,
+    ):
+        """
+        Hand a warm pool instance its runner configuration.
+
+        The metadata is written with the fingerprint read when the instance was listed,
+        so two managers can never claim the same instance.
+
+        Args:
+            instance (google.cloud.compute_v1.Instance): The pool instance as listed.
+            repo_url (str): The URL of the repository or organization.
+            registration_token (str): The GitHub Actions runner registration token.
+            template_name (str): The label of the runner.
+            jit_config (str): Encoded just-in-time runner config, used instead of the registration token.
+            runner_labels (list): Labels of the runner, defaults to the template label.
+            instance_label (str): The repository full name, see runner_scope.
+
+        Raises:
+            google.api_core.exceptions.PreconditionFailed: If the instance changed since it was listed.
+        """
+        runner_script = self._startup_script(
+            repo_url, registration_token, instance.name, template_name, jit_config=jit_config, runner_labels=runner_labels
+        )
+        metadata = compute_v1.Metadata()
+        metadata.fingerprint = instance.metadata.fingerprint
+        metadata.items = list(instance.metadata.items) + [
+            compute_v1.Items(key=RUNNER_SCRIPT_METADATA_KEY, value=runner_script)
+        ]
+        if jit_config:
+            metadata.items.append(compute_v1.Items(key=JIT_CONFIG_METADATA_KEY, value=jit_config))
+        if instance_label:
+            # Written with the runner script, labels would need a second call with their own fingerprint
+            metadata.items.append(compute_v1.Items(key=RUNNER_SCOPE_METADATA_KEY, value=instance_label.lower()))
+        self.retry_policy.call(
+            self.instance_client.set_metadata,
+            project=self.project_id,
+            zone=self._zone_of(instance.name),
+            instance=instance.name,
+            metadata_resource=metadata,
+        )
+
+    def suspend_instance(self, instance_name):
+        """Suspend an instance, keeping its memory."""
+        # https://docs.cloud.google.com/compute/docs/instances/suspend-resume-instance
+        return self._instance_action(
+            self.instance_client.suspend, compute_v1.SuspendInstanceRequest, 'suspend', instance_name
+        )
+
+    def resume_instance(self, instance_name, delivery_id=None):
+        """Resume a suspended instance."""
+        return self._instance_action(
+            self.instance_client.resume, compute_v1.ResumeInstanceRequest, 'resume', instance_name, delivery_id
+        )
+
+    def start_instance(self, instance_name, delivery_id=None):
+        """Start a stopped instance, keeping its boot disk."""
+        return self._instance_action(
+            self.instance_client.start, compute_v1.StartInstanceRequest, 'start', instance_name, delivery_id
+        )
+
+    def stop_instance(self, instance_name, delivery_id=None):
+        """Stop an instance, keeping its boot disk."""
+        return self._instance_action(
+            self.instance_client.stop, compute_v1.StopInstanceRequest, 'stop', instance_name, delivery_id
+        )
+
+    def get_instance(self, instance_name):
+        """
+        Get an instance.
+
+        Args:
+            instance_name (str): The name of the instance.
+
+        Returns:
+            google.cloud.compute_v1.Instance: The instance resource.
+        """
+        return self.retry_policy.call(
+            self.instance_client.get,
+            project=self.project_id,
+            zone=self._zone_of(instance_name),
+            instance=instance_name,
+        )
+
+    def recycle_pool_instance(self, instance, template_name, delivery_id=None):
+        """
+        Return the instance of a completed runner to the warm pool of its label and stop it.
+
+        The runner configuration is removed from the metadata and the pool startup script
+        is restored, so the next start waits for a new runner script on the warm boot disk.
+        The labels of the completed job are removed.
+
+        Args:
+            instance (google.cloud.compute_v1.Instance): The instance as read before.
+            template_name (str): The label of the pool.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+        """
+        zone = self._zone_of(instance.name)
+        self.retry_policy.call(
+            self.instance_client.set_metadata,
+            project=self.project_id,
+            zone=zone,
+            instance=instance.name,
+            metadata_resource=self._pool_metadata(fingerprint=instance.metadata.fingerprint),
+        )
+        # The next job may belong to another repository, its costs must not be charged to this one
+        labels = {key: value for key, value in instance.labels.items() if key not in JOB_LABELS}
+        labels[POOL_LABEL] = label_prefix(template_name)
+        self.retry_policy.call(
+            self.instance_client.set_labels,
+            project=self.project_id,
+            zone=zone,
+            instance=instance.name,
+            instances_set_labels_request_resource=compute_v1.InstancesSetLabelsRequest(
+                label_fingerprint=instance.label_fingerprint,
+                labels=labels,
+            ),
+        )
+        self.stop_instance(instance.name, delivery_id=delivery_id)
+
+    def _instance_action(self, action, request_type, kind, instance_name, delivery_id=None):
+        """Call an instance lifecycle method and track its operation."""
+        operation = self.retry_policy.call(
+            action,
+            request=request_type(
+                project=self.project_id,
+                zone=self._zone_of(instance_name),
+                instance=instance_name,
+                request_id=str(uuid.uuid4()),
+            ),
+        )
+        logger.info(
+            "Instance %s operation started for %s: %s, delivery_id: %s",
+            kind,
+            instance_name,
+            operation.name,
+            delivery_id,
+        )
+        self._track(operation, kind, [instance_name], delivery_id)
+        return operation
+
+    def _zone_of(self, instance_name):
+        """Return the remembered zone of an instance, or the first configured zone."""
+        with self._instance_zones_lock:
+            return self._instance_zones.get(instance_name, self.zone)
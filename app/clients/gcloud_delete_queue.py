@@ -0,0 +1,146 @@
+"""
+Background deletion of runner instances.
+"""
+import logging
+import threading
+import time
+from google.api_core import exceptions as google_exceptions
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class _PendingDelete:
+    """An instance waiting to be deleted."""
+
+    def __init__(self, delivery_id):
+        self.delivery_id = delivery_id
+        self.attempts = 0
+        self.due = 0
+
+
+class DeleteQueue:
+    """
+    Delete instances in a background thread until they are confirmed gone.
+
+    Deletions are collected for ``window`` seconds and then started together.
+    The queue waits for the delete operations of a batch, which run in parallel
+    in Compute Engine. An instance is done once its operation finished or it no
+    longer exists. Failed deletions are retried with exponential backoff without
+    limit, so a temporary API error does not leak a running VM.
+    """
+
+    def __init__(self, start_delete, window=2, timeout=300, base_delay=5, max_delay=300):
+        """
+        Initialize DeleteQueue.
+
+        Args:
+            start_delete (callable): Called with (instance_name, delivery_id), returns the
+                delete operation and raises google.api_core.exceptions.NotFound if the instance is gone.
+            window (float): Seconds to collect deletions into one batch.
+            timeout (int): Seconds to wait for a delete operation before retrying it.
+            base_delay (float): Seconds before the first retry.
+            max_delay (float): Maximum seconds between two retries.
+        """
+        self.start_delete = start_delete
+        self.window = window
+        self.timeout = timeout
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._condition = threading.Condition()
+        self._pending = {}
+        self._stopped = False
+        self._thread = None
+
+    def submit(self, instance_name, delivery_id=None):
+        """
+        Queue the deletion of an instance.
+
+        Args:
+            instance_name (str): The name of the instance.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+        """
+        with self._condition:
+            if instance_name not in self._pending:
+                self._pending[instance_name] = _PendingDelete(delivery_id)
+            self._set_backlog()
+            if not self._thread:
+                self._thread = threading.Thread(target=self._run, name='gce-delete-queue', daemon=True)
+                self._thread.start()
+            self._condition.notify()
+        logger.info("Queued deletion of instance %s, delivery_id: %s", instance_name, delivery_id)
+
+    def pending(self):
+        """Return the names of the instances not yet confirmed deleted."""
+        with self._condition:
+            return list(self._pending)
+
+    def stop(self):
+        """Stop the background thread, pending deletions are dropped."""
+        with self._condition:
+            self._stopped = True
+            self._condition.notify()
+
+    def _set_backlog(self):
+        metrics.set_gauge('gce_delete_queue_pending', len(self._pending))
+
+    def _run(self):
+        """Wait for due deletions, collect them for the window and delete them."""
+        while True:
+            with self._condition:
+                while not self._stopped:
+                    now = time.monotonic()
+                    if any(entry.due <= now for entry in self._pending.values()):
+                        break
+                    next_due = min((entry.due for entry in self._pending.values()), default=None)
+                    self._condition.wait(None if next_due is None else next_due - now)
+                if self._stopped:
+                    return
+            time.sleep(self.window)
+            with self._condition:
+                now = time.monotonic()
+                batch = [(name, entry) for name, entry in self._pending.items() if entry.due <= now]
+            self._flush(batch)
+
+    def _flush(self, batch):
+        """Start the deletions of a batch and wait for their operations."""
+        metrics.inc('gce_delete_queue_batches_total')
+        operations = []
+        for instance_name, entry in batch:
+            try:
+                operations.append((instance_name, entry, self.start_delete(instance_name, entry.delivery_id)))
+            except google_exceptions.NotFound:
+                self._done(instance_name, entry)
+            except Exception as e:
+                self._retry(instance_name, entry, e)
+
+        for instance_name, entry, operation in operations:
+            try:
+                # Raises the operation error if it finished unsuccessfully
+                operation.result(timeout=self.timeout)
+            except Exception as e:
+                self._retry(instance_name, entry, e)
+            else:
+                self._done(instance_name, entry)
+
+    def _done(self, instance_name, entry):
+        with self._condition:
+            self._pending.pop(instance_name, None)
+            self._set_backlog()
+        metrics.inc('gce_delete_queue_deleted_total')
+        logger.info("Instance %s deleted, delivery_id: %s", instance_name, entry.delivery_id)
+
+    def _retry(self, instance_name, entry, error):
+        entry.attempts += 1
+        delay = min(self.base_delay * 2 ** (entry.attempts - 1), self.max_delay)
+        with self._condition:
+            entry.due = time.monotonic() + delay
+        metrics.inc('gce_delete_queue_retries_total')
+        logger.warning(
+            "Failed to delete instance %s (attempt %s), retrying in %.0fs: %s, delivery_id: %s",
+            instance_name,
+            entry.attempts,
+            delay,
+            error,
+            entry.delivery_id,
+        )
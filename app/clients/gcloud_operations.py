@@ -0,0 +1,136 @@
+"""
+Background tracking of Compute Engine operations.
+"""
+import concurrent.futures
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class OperationTracker:
+    """
+    Wait for zone operations in a bounded thread pool and record their outcome.
+
+    Insert and delete calls return as soon as Compute Engine accepted the
+    operation. The tracker waits for the operation to finish in the background,
+    exports the result and duration as metrics and hands failed operations to
+    the ``on_failure`` callback, e.g. to provision a replacement runner.
+    """
+
+    def __init__(self, max_workers=4, timeout=300, max_pending=1000):
+        """
+        Initialize OperationTracker.
+
+        Args:
+            max_workers (int): Number of threads waiting for operations.
+            timeout (int): Seconds to wait for an operation before giving up on it.
+            max_pending (int): Maximum number of tracked operations, further operations are not tracked.
+        """
+        self.timeout = timeout
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gce-operation')
+        self._lock = threading.Lock()
+        self._pending = 0
+
+    def _set_pending(self, delta):
+        with self._lock:
+            self._pending += delta
+            pending = self._pending
+        metrics.set_gauge('gce_operations_pending', pending)
+        return pending
+
+    def track(self, operation, kind, instance_names, on_failure=None, delivery_id=None):
+        """
+        Wait for an operation in the background.
+
+        Args:
+            operation (google.api_core.extended_operation.ExtendedOperation): The operation.
+            kind (str): The kind of operation, e.g. insert or delete.
+            instance_names (list): The instances the operation applies to.
+            on_failure (callable): Called with (instance_names, error) if the operation failed.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            bool: True if the operation is tracked.
+        """
+        if self._set_pending(1) > self.max_pending:
+            self._set_pending(-1)
+            logger.warning(
+                "Too many pending operations, not tracking %s of %s, delivery_id: %s",
+                kind,
+                instance_names,
+                delivery_id,
+            )
+            return False
+        self._executor.submit(self._wait, operation, kind, instance_names, on_failure, delivery_id)
+        return True
+
+    def _wait(self, operation, kind, instance_names, on_failure, delivery_id):
+        """Wait for the operation, record the outcome and call on_failure on errors."""
+        started = time.monotonic()
+        error = None
+        try:
+            # Raises the operation error if it finished unsuccessfully
+            operation.result(timeout=self.timeout)
+            status = 'done'
+        except concurrent.futures.TimeoutError:
+            status = 'timeout'
+        except Exception as e:
+            status = 'failed'
+            error = e
+        finally:
+            self._set_pending(-1)
+        duration = time.monotonic() - started
+
+        metrics.inc(f'gce_operations_total{{kind="{kind}",status="{status}"}}')
+        metrics.set_gauge(f'gce_operation_last_duration_seconds{{kind="{kind}"}}', round(duration, 3))
+
+        if status == 'done':
+            logger.info(
+                "Operation %s %s of %s finished in %.1fs, delivery_id: %s",
+                operation.name,
+                kind,
+                instance_names,
+                duration,
+                delivery_id,
+            )
+            return
+        if status == 'timeout':
+            logger.warning(
+                "Operation %s %s of %s not finished after %.1fs, delivery_id: %s",
+                operation.name,
+                kind,
+                instance_names,
+                duration,
+                delivery_id,
+            )
+            return
+
+        logger.error(
+            "Operation %s %s of %s failed after %.1fs: %s, delivery_id: %s",
+            operation.name,
+            kind,
+            instance_names,
+            duration,
+            error,
+            delivery_id,
+        )
+        if on_failure:
+            try:
+                on_failure(instance_names, error)
+            except Exception as e:
+                logger.error(
+                    "Failure handler for %s of %s failed: %s, delivery_id: %s",
+                    kind,
+                    instance_names,
+                    e,
+                    delivery_id,
+                )
+
+    def shutdown(self, wait=True):
+        """Stop the worker threads."""
+        self._executor.shutdown(wait=wait)
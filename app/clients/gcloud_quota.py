@@ -0,0 +1,125 @@
+"""
+Regional quota tracking for runner creation.
+"""
+import logging
+import threading
+import time
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Quota metric of the boot disk by disk type, other types have no regional quota to check
+DISK_QUOTA_METRICS = {
+    'pd-standard': 'DISKS_TOTAL_GB',
+    'pd-balanced': 'SSD_TOTAL_GB',
+    'pd-ssd': 'SSD_TOTAL_GB',
+}
+
+
+def template_demand(instance_template, guest_cpus):
+    """
+    Compute the regional quota one instance of a template uses.
+
+    Args:
+        instance_template (google.cloud.compute_v1.InstanceTemplate): The instance template.
+        guest_cpus (int): The vCPUs of the template's machine type.
+
+    Returns:
+        dict: Amount by quota metric, e.g. {'CPUS': 4, 'E2_CPUS': 4, 'SSD_TOTAL_GB': 50}.
+    """
+    properties = instance_template.properties
+    family = properties.machine_type.rsplit('/', 1)[-1].split('-')[0].upper()
+    demand = {'CPUS': guest_cpus, f'{family}_CPUS': guest_cpus}
+    for disk in properties.disks:
+        disk_type = disk.initialize_params.disk_type.rsplit('/', 1)[-1] or 'pd-standard'
+        metric = DISK_QUOTA_METRICS.get(disk_type)
+        if metric:
+            demand[metric] = demand.get(metric, 0) + disk.initialize_params.disk_size_gb
+    if any(interface.access_configs for interface in properties.network_interfaces):
+        demand['IN_USE_ADDRESSES'] = 1
+    return demand
+
+
+class QuotaTracker:
+    """
+    Cached view of the free regional quota.
+
+    The quotas of the region are fetched at most every ``ttl`` seconds. Instances
+    admitted since the last fetch are reserved locally, as their usage only shows
+    up in the next fetch. Metrics that are not quotas of the region are not limited.
+    """
+
+    def __init__(self, fetch_region, ttl=60):
+        """
+        Initialize QuotaTracker.
+
+        Args:
+            fetch_region (callable): Returns the google.cloud.compute_v1.Region with its quotas.
+            ttl (int): Seconds the quotas are cached.
+        """
+        self.fetch_region = fetch_region
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._available = None
+        self._reserved = {}
+        self._fetched_at = 0
+
+    def _refresh(self):
+        """Fetch the quotas if the cached ones are expired, must be called with the lock held."""
+        now = time.monotonic()
+        if self._available is not None and now - self._fetched_at < self.ttl:
+            return
+        try:
+            region = self.fetch_region()
+        except Exception as e:
+            # Keep the last quotas, without any quotas runners are created as before
+            logger.warning("Failed to fetch regional quotas: %s", e)
+            self._fetched_at = now
+            return
+        self._available = {quota.metric: quota.limit - quota.usage for quota in region.quotas}
+        self._reserved = {}
+        self._fetched_at = now
+        for metric in ('CPUS', 'SSD_TOTAL_GB', 'DISKS_TOTAL_GB', 'IN_USE_ADDRESSES'):
+            if metric in self._available:
+                metrics.set_gauge(f'gce_quota_available{{metric="{metric}"}}', self._available[metric])
+
+    def _fits(self, demand):
+        if self._available is None:
+            return True
+        return all(
+            self._available[metric] - self._reserved.get(metric, 0) >= amount
+            for metric, amount in demand.items()
+            if metric in self._available
+        )
+
+    def fits(self, demand):
+        """
+        Check if the free quota covers the demand.
+
+        Args:
+            demand (dict): Amount by quota metric.
+
+        Returns:
+            bool: True if every limited metric has enough free quota.
+        """
+        with self._lock:
+            self._refresh()
+            return self._fits(demand)
+
+    def reserve(self, demand):
+        """
+        Reserve the demand if the free quota covers it.
+
+        Args:
+            demand (dict): Amount by quota metric.
+
+        Returns:
+            bool: True if the demand was reserved.
+        """
+        with self._lock:
+            self._refresh()
+            if not self._fits(demand):
+                return False
+            for metric, amount in demand.items():
+                self._reserved[metric] = self._reserved.get(metric, 0) + amount
+            return True
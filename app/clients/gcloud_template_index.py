@@ -0,0 +1,226 @@
+"""
+In-memory index of the instance templates used for runners.
+"""
+import logging
+import os
+import re
+import threading
+import time
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Runner templates are named <label prefix>-<14 digit timestamp>[suffix], e.g. gcp-ubuntu-24-04-20250101120000
+# for the label gcp-ubuntu-24.04. The suffix of Terraform's name_prefix is a counter that can start with digits,
+# so only the timestamp is compared.
+TEMPLATE_NAME_PATTERN = re.compile(r"^(?P<prefix>.+)-(?P<timestamp>\d{14})\d*[a-z0-9]*$")
+# Server-side filter, so the list call only returns templates for runner labels
+# https://docs.cloud.google.com/compute/docs/reference/rest/v1/regionInstanceTemplates/list
+TEMPLATE_LIST_FILTER = 'name eq "(gcp-|dependabot).*"'
+
+
+def is_base_label(label):
+    """Check if a job label selects a runner template by itself."""
+    return label.startswith('gcp-') or label.lower() == 'dependabot'
+
+
+def parse_label_rules(value):
+    """
+    Parse label rules, e.g. ``ARM64=arm,large=large``.
+
+    A job label of a rule appends the rule's suffix to the template label, an
+    empty suffix only accepts the label. The suffixes are appended in rule order.
+
+    Args:
+        value (str): Comma-separated label=suffix pairs.
+
+    Returns:
+        dict: Lowercase job label to suffix, in rule order.
+    """
+    rules = {}
+    for rule in (value or '').split(','):
+        if not rule.strip():
+            continue
+        label, _, suffix = rule.partition('=')
+        rules[label.strip().lower()] = suffix.strip()
+    return rules
+
+
+def resolve_labels(labels, rules=None):
+    """
+    Resolve the labels of a job to the template label and the labels of its runner.
+
+    The first label selecting a template is the base label, e.g. gcp-ubuntu-24.04.
+    Labels with a rule add their suffix, so gcp-ubuntu-24.04 and ARM64 select the
+    template of gcp-ubuntu-24.04-arm for the rule ``ARM64=arm``.
+
+    Args:
+        labels (list): The labels of the job.
+        rules (dict): Label rules as returned by parse_label_rules.
+
+    Returns:
+        tuple or None: (template label, runner labels), the runner labels are None
+            if the runner only needs the template label. None if no label selects a template.
+    """
+    base = None
+    modifiers = []
+    for label in labels or []:
+        if base is None and is_base_label(label):
+            base = label
+        elif rules and label.lower() in rules:
+            modifiers.append(label)
+    if base is None:
+        return None
+    if not modifiers:
+        return base, None
+    # Rule order, not job label order, so every job of a combination selects the same template
+    order = {label: position for position, label in enumerate(rules)}
+    modifiers.sort(key=lambda label: order[label.lower()])
+    suffixes = [rules[label.lower()] for label in modifiers if rules[label.lower()]]
+    return '-'.join([base] + suffixes), [base] + modifiers
+
+
+def label_prefix(label):
+    """
+    Return the template name prefix for a runner label.
+
+    Dots are replaced with dashes, so gcp-ubuntu-24.04 matches gcp-ubuntu-24-04.
+    """
+    return label.replace('.', '-')
+
+
+def build_index(templates):
+    """
+    Map each template name prefix to its newest template.
+
+    Args:
+        templates (iterable): InstanceTemplate resources.
+
+    Returns:
+        dict: Prefix to the template with the highest timestamp suffix.
+            Ties are broken by name, so the result does not depend on list order.
+    """
+    newest = {}
+    for template in templates:
+        match = TEMPLATE_NAME_PATTERN.match(template.name)
+        if not match:
+            continue
+        rank = (int(match.group('timestamp')), template.name)
+        prefix = match.group('prefix')
+        if prefix not in newest or rank > newest[prefix][0]:
+            newest[prefix] = (rank, template)
+    return {prefix: template for prefix, (_, template) in newest.items()}
+
+
+class TemplateIndex:
+    """
+    Process-wide, TTL-cached index from label prefix to the newest instance template.
+
+    The index for a project and region is rebuilt after ``ttl`` seconds, or on a
+    miss if it is older than ``miss_refresh_interval`` seconds, so a new template
+    is picked up quickly while unknown labels cannot trigger a list call per job.
+    Concurrent refreshes of the same index are collapsed into one list call.
+    """
+
+    def __init__(self, ttl=None, miss_refresh_interval=30):
+        """
+        Initialize TemplateIndex.
+
+        Args:
+            ttl (int): Seconds an index is used before it is rebuilt.
+                Defaults to GCE_TEMPLATE_CACHE_TTL or 300.
+            miss_refresh_interval (int): Min. age in seconds of an index before a miss rebuilds it.
+        """
+        if ttl is None:
+            ttl = int(os.environ.get('GCE_TEMPLATE_CACHE_TTL', 300))
+        self.ttl = ttl
+        self.miss_refresh_interval = miss_refresh_interval
+        self._lock = threading.Lock()
+        self._indexes = {}
+        self._key_locks = {}
+
+    def _cached(self, key):
+        """Return (loaded_at, index) for key, or (None, None)."""
+        with self._lock:
+            return self._indexes.get(key, (None, None))
+
+    def _key_lock(self, key):
+        """Return the lock that serializes refreshes for key."""
+        with self._lock:
+            return self._key_locks.setdefault(key, threading.Lock())
+
+    def _refresh(self, key, fetch, seen_loaded_at):
+        """Rebuild the index for key unless another thread did so meanwhile."""
+        with self._key_lock(key):
+            loaded_at, index = self._cached(key)
+            if loaded_at is not None and loaded_at != seen_loaded_at:
+                return index
+
+            started = time.monotonic()
+            index = build_index(fetch())
+            with self._lock:
+                self._indexes[key] = (time.monotonic(), index)
+            metrics.inc('gce_template_index_refreshes_total')
+            logger.info(
+                "Indexed %d instance templates for %s in %.2fs", len(index), key, time.monotonic() - started
+            )
+            return index
+
+    def load(self, key, fetch):
+        """
+        Build the index for key unless a fresh one is cached.
+
+        Args:
+            key: Hashable index key, e.g. (project, region).
+            fetch (callable): Function without arguments returning all templates.
+
+        Returns:
+            dict: Prefix to the newest template.
+        """
+        loaded_at, index = self._cached(key)
+        if loaded_at is not None and time.monotonic() - loaded_at < self.ttl:
+            return index
+        return self._refresh(key, fetch, loaded_at)
+
+    def get(self, key, prefix, fetch):
+        """
+        Return the newest template for a label prefix.
+
+        Args:
+            key: Hashable index key, e.g. (project, region).
+            prefix (str): The template name prefix.
+            fetch (callable): Function without arguments returning all templates.
+
+        Returns:
+            google.cloud.compute_v1.InstanceTemplate or None: The matching template resource.
+        """
+        loaded_at, index = self._cached(key)
+        age = None if loaded_at is None else time.monotonic() - loaded_at
+
+        if age is not None and age < self.ttl:
+            if prefix in index:
+                metrics.inc('gce_template_index_hits_total')
+                return index[prefix]
+            if age < self.miss_refresh_interval:
+                metrics.inc('gce_template_index_misses_total')
+                return None
+
+        try:
+            index = self._refresh(key, fetch, loaded_at)
+        except Exception as e:
+            if index is None:
+                raise
+            # Keep serving the last known templates if the list call fails
+            logger.warning("Failed to refresh instance templates for %s, using cached index: %s", key, e)
+
+        metrics.inc(f"gce_template_index_{'hits' if prefix in index else 'misses'}_total")
+        return index.get(prefix)
+
+    def clear(self):
+        """Drop all cached indexes."""
+        with self._lock:
+            self._indexes.clear()
+            self._key_locks.clear()
+
+
+template_index = TemplateIndex()
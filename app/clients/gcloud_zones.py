@@ -0,0 +1,113 @@
+"""
+Zone placement with cool-down of exhausted zones.
+"""
+import logging
+import os
+import threading
+import time
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# Errors after which another zone of the region may still have capacity
+# https://docs.cloud.google.com/compute/docs/troubleshooting/troubleshooting-resource-availability
+EXHAUSTION_ERRORS = ('ZONE_RESOURCE_POOL_EXHAUSTED', 'QUOTA_EXCEEDED')
+
+
+def is_exhaustion_error(error):
+    """
+    Check if an insert failed because the zone is out of resources or quota.
+
+    Args:
+        error (Exception): The API or operation error.
+
+    Returns:
+        bool: True if the instance may be placed in another zone.
+    """
+    message = str(error)
+    return any(code in message for code in EXHAUSTION_ERRORS)
+
+
+def parse_zones(value, default_zone):
+    """
+    Parse the ordered, comma-separated zone list.
+
+    Zones outside the region of the first zone are dropped, as instance
+    templates are regional.
+
+    Args:
+        value (str): Comma-separated zones, e.g. us-central1-a,us-central1-b.
+        default_zone (str): Zone to use if value is empty.
+
+    Returns:
+        list: The zones in order of preference.
+    """
+    zones = []
+    for zone in (value or '').split(','):
+        zone = zone.strip()
+        if zone and zone not in zones:
+            zones.append(zone)
+    if not zones:
+        return [default_zone]
+
+    region = zones[0].rsplit('-', 1)[0]
+    same_region = [zone for zone in zones if zone.rsplit('-', 1)[0] == region]
+    if len(same_region) != len(zones):
+        logger.warning("Ignoring zones outside region %s: %s", region, sorted(set(zones) - set(same_region)))
+    return same_region
+
+
+class ZoneCooldown:
+    """
+    Process-wide memory of zones that recently ran out of resources.
+
+    A zone is skipped for ``seconds`` after an exhaustion error, so a burst
+    of jobs does not hit the same exhausted zone over and over again.
+    """
+
+    def __init__(self, seconds=None):
+        """
+        Initialize ZoneCooldown.
+
+        Args:
+            seconds (int): Cool-down per zone. Defaults to GCE_ZONE_COOLDOWN or 300.
+        """
+        if seconds is None:
+            seconds = int(os.environ.get('GCE_ZONE_COOLDOWN', 300))
+        self.seconds = seconds
+        self._lock = threading.Lock()
+        self._until = {}
+
+    def cool_down(self, zone, error=None):
+        """Skip zone for the cool-down period."""
+        with self._lock:
+            self._until[zone] = time.monotonic() + self.seconds
+        metrics.inc(f'gce_zone_cooldowns_total{{zone="{zone}"}}')
+        logger.warning("Zone %s exhausted, skipping it for %ss: %s", zone, self.seconds, error)
+
+    def available(self, zones):
+        """
+        Return the zones to try in order.
+
+        Args:
+            zones (list): The configured zones in order of preference.
+
+        Returns:
+            list: Zones not cooling down in their configured order. If all zones
+                are cooling down, all zones in order of the earliest cool-down end.
+        """
+        now = time.monotonic()
+        with self._lock:
+            until = {zone: self._until.get(zone, 0) for zone in zones}
+        available = [zone for zone in zones if until[zone] <= now]
+        if available:
+            return available
+        return sorted(zones, key=lambda zone: until[zone])
+
+    def clear(self):
+        """Forget all cool-downs."""
+        with self._lock:
+            self._until.clear()
+
+
+zone_cooldown = ZoneCooldown()
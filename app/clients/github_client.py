@@ -1,27 +1,106 @@
 """
 GitHub Client for authenticating and interacting with the GitHub API.
 """
+import hashlib
 import os
+import threading
 import time
+from datetime import datetime
+from urllib.parse import quote
 import jwt
-import requests
 import logging
+import requests
+from cryptography.hazmat.primitives import serialization
+from app.clients.github_rate_limit import rate_limiter
+from app.utils import http, metrics
+from app.utils.http import GITHUB_API_URL, REQUEST_TIMEOUT
+from app.utils.retry import RetryPolicy
+from app.utils.token_cache import TokenCache
 
-REQUEST_TIMEOUT = 30  # seconds
+# Installation access tokens are valid for 1 hour, refresh them 5 minutes early
+INSTALLATION_TOKEN_REFRESH_MARGIN = 5 * 60  # seconds
+# App JWTs are valid for 10 minutes, renew them in the background once 7 minutes old
+JWT_LIFETIME = 10 * 60  # seconds
+JWT_RENEW_MARGIN = 3 * 60  # seconds
+JWT_REFRESH_MARGIN = 60  # seconds
+# Registration tokens are valid for 1 hour. A VM still has to boot before it uses the token,
+# so never hand out a token with less than GITHUB_REGISTRATION_TOKEN_MIN_TTL seconds left.
+REGISTRATION_TOKEN_MIN_TTL = int(os.environ.get('GITHUB_REGISTRATION_TOKEN_MIN_TTL', 15 * 60))  # seconds
+REGISTRATION_TOKEN_RENEW_MARGIN = REGISTRATION_TOKEN_MIN_TTL + 10 * 60  # seconds
+# Upper bound of cached installation tokens, one per installation of the GitHub App
+INSTALLATION_TOKEN_CACHE_SIZE = int(os.environ.get('GITHUB_INSTALLATION_TOKEN_CACHE_SIZE', 100))
 
 logger = logging.getLogger(__name__)
 
+# Process-wide cache shared by all GitHubClient instances and gunicorn threads
+installation_token_cache = TokenCache(
+    'github_installation_token',
+    refresh_margin=INSTALLATION_TOKEN_REFRESH_MARGIN,
+    max_entries=INSTALLATION_TOKEN_CACHE_SIZE,
+)
+jwt_cache = TokenCache(
+    'github_app_jwt',
+    refresh_margin=JWT_REFRESH_MARGIN,
+    renew_margin=JWT_RENEW_MARGIN,
+)
+registration_token_cache = TokenCache(
+    'github_registration_token',
+    refresh_margin=REGISTRATION_TOKEN_MIN_TTL,
+    renew_margin=REGISTRATION_TOKEN_RENEW_MARGIN,
+    max_entries=INSTALLATION_TOKEN_CACHE_SIZE * 10,
+)
+
+# Runner group IDs by (installation, organization, group name), they do not change
+_runner_group_ids_lock = threading.Lock()
+_runner_group_ids = {}
+
+# Deserialized private key shared by all GitHubClient instances, see GitHubClient._load_private_key()
+_private_key_lock = threading.Lock()
+_private_key_cache = {'version': None, 'key': None}
+
+
+def clear_private_key_cache():
+    """Drop the deserialized private key so it is loaded again on next use."""
+    with _private_key_lock:
+        _private_key_cache['version'] = None
+        _private_key_cache['key'] = None
+
+
+def parse_expires_at(value, default_ttl=3600):
+    """
+    Convert a GitHub `expires_at` timestamp to a UNIX timestamp.
+
+    Args:
+        value (str): ISO 8601 timestamp, e.g. 2016-07-11T22:14:10Z.
+        default_ttl (int): Lifetime in seconds to assume if value is missing or invalid.
+
+    Returns:
+        float: The expiry as UNIX timestamp.
+    """
+    try:
+        return datetime.fromisoformat(value.replace('Z', '+00:00')).timestamp()
+    except (AttributeError, TypeError, ValueError):
+        return time.time() + default_ttl
+
 
 class GitHubClient:
     """Client for authenticated interactions with the GitHub API as a GitHub App."""
 
-    def __init__(self):
-        """Initialize GitHubClient with environment configuration."""
+    def __init__(self, installation_id=None):
+        """
+        Initialize GitHubClient with environment configuration.
+
+        Args:
+            installation_id (str): The GitHub App installation to act as.
+                Defaults to GITHUB_INSTALLATION_ID.
+        """
         self.app_id = os.environ.get('GITHUB_APP_ID')
-        self.installation_id = os.environ.get('GITHUB_INSTALLATION_ID')
+        self.installation_id = str(installation_id) if installation_id else os.environ.get('GITHUB_INSTALLATION_ID')
         self.private_key = os.environ.get('GITHUB_PRIVATE_KEY')
         self.private_key_path = os.environ.get('GITHUB_PRIVATE_KEY_PATH')
         self.project_id = os.environ.get('GOOGLE_CLOUD_PROJECT')
+        self.github_runner_group = os.environ.get('GITHUB_RUNNER_GROUP', '').strip()
+        self.retry_policy = RetryPolicy('github_api')
 
         if not all([self.app_id, self.installation_id]) or not (self.private_key_path or self.private_key):
             logger.warning("GitHub App configuration missing.")
@@ -46,25 +125,157 @@ class GitHubClient:
         else:
             raise ValueError("No private key source configured.")
 
+    def _private_key_version(self):
+        """
+        Identify the current private key without reading or parsing it.
+
+        Returns:
+            tuple or None: A digest of the env value, or path, mtime and size of the key file.
+                None if the key file cannot be inspected.
+        """
+        if self.private_key:
+            return ('env', hashlib.sha256(self.private_key.encode()).hexdigest())
+        if self.private_key_path:
+            try:
+                stat = os.stat(self.private_key_path)
+            except OSError:
+                return None
+            return ('file', self.private_key_path, stat.st_mtime_ns, stat.st_size)
+        return None
+
+    def _load_private_key(self):
+        """
+        Return the deserialized GitHub App private key.
+
+        The PEM is read and parsed once per process. It is loaded again only if the
+        GITHUB_PRIVATE_KEY value or the mtime/size of GITHUB_PRIVATE_KEY_PATH changes.
+
+        Returns:
+            tuple: The cryptography private key object and its version.
+        """
+        version = self._private_key_version()
+        with _private_key_lock:
+            if version is not None and _private_key_cache['version'] == version:
+                return _private_key_cache['key'], version
+
+            pem = self._get_private_key()
+            key = serialization.load_pem_private_key(pem.encode(), password=None)
+            if _private_key_cache['version'] is not None:
+                logger.info("GitHub App private key changed, reloaded key.")
+            _private_key_cache['version'] = version
+            _private_key_cache['key'] = key
+            return key, version
+
     def _generate_jwt(self):
-        """Generates a JWT for GitHub App authentication."""
+        """Returns a JWT for GitHub App authentication (reused for most of its lifetime)."""
+        # A rotated private key results in a new cache key and therefore a new JWT
+        return jwt_cache.get((self.app_id, self._private_key_version()), self._sign_jwt)
+
+    def _sign_jwt(self):
+        """
+        Sign a new JWT for GitHub App authentication.
+
+        Returns:
+            tuple: The encoded JWT and its expiry as UNIX timestamp.
+        """
         try:
-            private_key = self._get_private_key()
+            private_key, _ = self._load_private_key()
 
+            now = int(time.time())
             payload = {
-                'iat': int(time.time()),
-                'exp': int(time.time()) + (10 * 60),
+                'iat': now,
+                'exp': now + JWT_LIFETIME,
                 'iss': self.app_id
             }
 
             encoded_jwt = jwt.encode(payload, private_key, algorithm='RS256')
-            return encoded_jwt
+            return encoded_jwt, payload['exp']
         except Exception as e:
             logger.error(f"Error generating JWT: {e}")
             raise
 
+    def _request(self, method, url, headers, rate_limit_key, urgent=True, idempotent=True, json=None):
+        """
+        Send a GitHub API request through the shared session, honoring rate limits.
+
+        A rate limited response (403/429 with Retry-After or an exhausted budget) is
+        retried once after the advertised delay if that delay is short enough.
+        Connection errors and 5xx responses of idempotent calls are retried with backoff.
+
+        Args:
+            method (str): HTTP method in lower case, e.g. 'post'.
+            url (str): The API URL.
+            headers (dict): Request headers.
+            rate_limit_key (str): The installation ID or 'app' for JWT-authenticated calls.
+            urgent (bool): False for calls that can wait until the rate limit resets.
+            idempotent (bool): False for calls that must not be repeated after an ambiguous error.
+            json (dict): Optional JSON request body.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        def send():
+            for attempt in range(2):
+                rate_limiter.before_request(rate_limit_key, urgent=urgent)
+                kwargs = {'json': json} if json is not None else {}
+                response = getattr(http.get_session(), method)(
+                    url, headers=headers, timeout=REQUEST_TIMEOUT, **kwargs
+                )
+                if rate_limiter.update(rate_limit_key, response) is None:
+                    break
+            response.raise_for_status()
+            return response
+
+        return self.retry_policy.call(send, idempotent=idempotent)
+
+    def _installation_request(self, method, url, **kwargs):
+        """
+        Send a request authenticated with the installation access token.
+
+        A cached token that was revoked or rotated is answered with 401 until it
+        expires, so on 401 the token is dropped and the request is sent once more
+        with a new token.
+
+        Args:
+            method (str): HTTP method in lower case, e.g. 'post'.
+            url (str): The API URL.
+            **kwargs: Passed to _request, e.g. urgent, idempotent or json.
+
+        Returns:
+            requests.Response: The successful response.
+        """
+        try:
+            return self._request(method, url, self._installation_headers(), self.installation_id, **kwargs)
+        except requests.exceptions.HTTPError as e:
+            if e.response is None or e.response.status_code != 401:
+                raise
+        logger.warning("Installation access token of installation %s was rejected, renewing it", self.installation_id)
+        metrics.inc('github_installation_token_rejected_total')
+        installation_token_cache.invalidate((self.app_id, self.installation_id))
+        return self._request(method, url, self._installation_headers(), self.installation_id, **kwargs)
+
+    def _installation_headers(self):
+        """Return the request headers authenticated with the installation access token."""
+        return {
+            'Authorization': f'Bearer {self.get_installation_access_token()}',
+            'Accept': 'application/vnd.github+json',
+            'X-GitHub-Api-Version': '2022-11-28'
+        }
+
     def get_installation_access_token(self):
-        """Obtains an installation access token."""
+        """Obtains an installation access token (cached until shortly before it expires)."""
+        return installation_token_cache.get(
+            (self.app_id, self.installation_id),
+            self._create_installation_access_token,
+        )
+
+    def _create_installation_access_token(self):
+        """
+        Create a new installation access token.
+
+        Returns:
+            tuple: The token and its expiry as UNIX timestamp.
+        """
         # https://docs.github.com/en/apps/creating-github-apps/authenticating-with-a-github-app/generating-an-installation-access-token-for-a-github-app
         jwt_token = self._generate_jwt()
         headers = {
@@ -72,41 +283,220 @@ class GitHubClient:
             'Accept': 'application/vnd.github+json',
             'X-GitHub-Api-Version': '2022-11-28'
         }
-        url = f'https://api.github.com/app/installations/{self.installation_id}/access_tokens'
+        url = f'{GITHUB_API_URL}/app/installations/{self.installation_id}/access_tokens'
 
-        response = requests.post(url, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
+        response = self._request('post', url, headers, 'app')
         # The installation access token will expire after 1 hour.
-        return response.json()['token']
+        data = response.json()
+        return data['token'], parse_expires_at(data.get('expires_at'))
 
     def get_registration_token(self, org_name=None, repo_name=None, delivery_id=None):
-        """Gets a runner registration token."""
+        """
+        Gets a runner registration token.
+
+        Registration tokens are valid for 1 hour and can register any number of runners,
+        so a still-valid token is reused per organization or repository.
+        """
         # https://docs.github.com/en/rest/actions/self-hosted-runners
-        token = self.get_installation_access_token()
-        headers = {
-            'Authorization': f'Bearer {token}',
-            'Accept': 'application/vnd.github+json',
-            'X-GitHub-Api-Version': '2022-11-28'
-        }
         if org_name:
             # GitHub Docs: https://t.ly/dAyGK
-            url = f"https://api.github.com/orgs/{org_name}/actions/runners/registration-token"
+            scope = f"orgs/{org_name}"
             logger.info(
-                "Create registration token for organization: %s, delivery_id: %s",
+                "Get registration token for organization: %s, delivery_id: %s",
                 org_name,
                 delivery_id,
             )
         elif repo_name:
             # GitHub Docs: https://t.ly/n0w2a
-            url = f"https://api.github.com/repos/{repo_name}/actions/runners/registration-token"
+            scope = f"repos/{repo_name}"
             logger.info(
-                "Create registration token for repository: %s, delivery_id: %s",
+                "Get registration token for repository: %s, delivery_id: %s",
                 repo_name,
                 delivery_id,
             )
         else:
             raise ValueError("Either org_name or repo_name must be provided")
 
-        response = requests.post(url, headers=headers, timeout=REQUEST_TIMEOUT)
-        response.raise_for_status()
-        return response.json()['token']
+        return registration_token_cache.get(
+            (self.app_id, self.installation_id, scope),
+            lambda: self._create_registration_token(scope, delivery_id=delivery_id),
+        )
+
+    def _create_registration_token(self, scope, delivery_id=None):
+        """
+        Create a new runner registration token.
+
+        Args:
+            scope (str): Either orgs/{org_name} or repos/{owner}/{repo}.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            tuple: The token and its expiry as UNIX timestamp.
+        """
+        url = f"{GITHUB_API_URL}/{scope}/actions/runners/registration-token"
+        logger.info("Create registration token for %s, delivery_id: %s", scope, delivery_id)
+
+        response = self._installation_request('post', url)
+        data = response.json()
+        return data['token'], parse_expires_at(data.get('expires_at'))
+
+    def get_runner_group_id(self, org_name, group_name):
+        """
+        Look up the ID of an organization runner group by name.
+
+        Args:
+            org_name (str): The organization login.
+            group_name (str): The runner group name.
+
+        Returns:
+            int: The runner group ID.
+
+        Raises:
+            ValueError: If the runner group does not exist.
+        """
+        key = (self.installation_id, org_name, group_name)
+        with _runner_group_ids_lock:
+            if key in _runner_group_ids:
+                return _runner_group_ids[key]
+
+        # GitHub Docs: https://docs.github.com/en/rest/actions/self-hosted-runner-groups
+        url = f"{GITHUB_API_URL}/orgs/{org_name}/actions/runner-groups?per_page=100"
+        while url:
+            response = self._installation_request('get', url)
+            for group in response.json().get('runner_groups', []):
+                if group.get('name') == group_name:
+                    with _runner_group_ids_lock:
+                        _runner_group_ids[key] = group['id']
+                    return group['id']
+            url = response.links.get('next', {}).get('url')
+
+        raise ValueError(f"Runner group '{group_name}' not found in organization {org_name}")
+
+    def list_runners(self, org_name=None, repo_name=None, name=None):
+        """
+        List the self-hosted runners of an organization or repository.
+
+        The pages are fetched as non-urgent calls, so the listing waits instead of
+        using up the rate limit budget reserved for provisioning runners.
+
+        Args:
+            org_name (str): The organization login for organization runners.
+            repo_name (str): The repository full name for repository runners.
+            name (str): Only list the runner with this name.
+
+        Returns:
+            list: Runner dicts with 'name', 'status' and 'busy' keys.
+        """
+        if org_name:
+            scope = f"orgs/{org_name}"
+        elif repo_name:
+            scope = f"repos/{repo_name}"
+        else:
+            raise ValueError("Either org_name or repo_name must be provided")
+
+        # GitHub Docs: https://docs.github.com/en/rest/actions/self-hosted-runners
+        runners = []
+        url = f"{GITHUB_API_URL}/{scope}/actions/runners?per_page=100"
+        if name:
+            url += f"&name={quote(name)}"
+        while url:
+            response = self._installation_request('get', url, urgent=False)
+            runners.extend(response.json().get('runners', []))
+            url = response.links.get('next', {}).get('url')
+        return runners
+
+    def rerun_job(self, repo_name, job_id, delivery_id=None):
+        """
+        Re-run a workflow job.
+
+        Args:
+            repo_name (str): The repository full name.
+            job_id (int): The workflow job ID.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+        """
+        # GitHub Docs: https://docs.github.com/en/rest/actions/workflow-runs#re-run-a-job-from-a-workflow-run
+        url = f"{GITHUB_API_URL}/repos/{repo_name}/actions/jobs/{job_id}/rerun"
+        logger.info("Re-run job %s of %s, delivery_id: %s", job_id, repo_name, delivery_id)
+        # Not idempotent: a repeated request starts another attempt or fails
+        self._installation_request('post', url, idempotent=False, json={})
+
+    def rerun_failed_jobs(self, repo_name, run_id, delivery_id=None):
+        """
+        Re-run the failed jobs of a completed workflow run.
+
+        Args:
+            repo_name (str): The repository full name.
+            run_id (int): The workflow run ID.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+        """
+        # GitHub Docs: https://docs.github.com/en/rest/actions/workflow-runs#re-run-failed-jobs-from-a-workflow-run
+        url = f"{GITHUB_API_URL}/repos/{repo_name}/actions/runs/{run_id}/rerun-failed-jobs"
+        logger.info("Re-run failed jobs of run %s of %s, delivery_id: %s", run_id, repo_name, delivery_id)
+        self._installation_request('post', url, idempotent=False, json={})
+
+    def list_run_jobs(self, repo_name, run_id):
+        """
+        List the jobs of the latest attempt of a workflow run.
+
+        Args:
+            repo_name (str): The repository full name.
+            run_id (int): The workflow run ID.
+
+        Returns:
+            list: Job dicts with 'id', 'conclusion', 'runner_name' and 'labels' keys.
+        """
+        # GitHub Docs: https://docs.github.com/en/rest/actions/workflow-jobs#list-jobs-for-a-workflow-run
+        jobs = []
+        url = f"{GITHUB_API_URL}/repos/{repo_name}/actions/runs/{run_id}/jobs?filter=latest&per_page=100"
+        while url:
+            response = self._installation_request('get', url, urgent=False)
+            jobs.extend(response.json().get('jobs', []))
+            url = response.links.get('next', {}).get('url')
+        return jobs
+
+    def generate_jit_config(self, runner_name, labels, org_name=None, repo_name=None, delivery_id=None):
+        """
+        Create a just-in-time runner configuration.
+
+        The runner starts with `./run.sh --jitconfig` and skips `./config.sh`, saving
+        the registration round-trip from the VM. JIT runners are always ephemeral.
+
+        Args:
+            runner_name (str): The runner name, must match the instance name.
+            labels (list): The runner labels.
+            org_name (str): The organization login for organization runners.
+            repo_name (str): The repository full name for repository runners.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            str: The encoded JIT config.
+        """
+        if org_name:
+            # GitHub Docs: https://docs.github.com/en/rest/actions/self-hosted-runners
+            scope = f"orgs/{org_name}"
+            runner_group_id = 1  # Default runner group
+            if self.github_runner_group:
+                runner_group_id = self.get_runner_group_id(org_name, self.github_runner_group)
+        elif repo_name:
+            # GitHub Docs: https://docs.github.com/en/rest/actions/self-hosted-runners
+            scope = f"repos/{repo_name}"
+            runner_group_id = 1  # Repositories only have the default runner group
+        else:
+            raise ValueError("Either org_name or repo_name must be provided")
+
+        logger.info(
+            "Create JIT runner config for %s, runner: %s, delivery_id: %s",
+            scope,
+            runner_name,
+            delivery_id,
+        )
+        url = f"{GITHUB_API_URL}/{scope}/actions/runners/generate-jitconfig"
+        body = {
+            'name': runner_name,
+            'runner_group_id': runner_group_id,
+            'labels': labels,
+            'work_folder': '_work',
+        }
+        # Not idempotent: a repeated request for the same runner name fails with 409 Conflict
+        response = self._installation_request('post', url, idempotent=False, json=body)
+        return response.json()['encoded_jit_config']
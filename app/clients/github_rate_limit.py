@@ -0,0 +1,149 @@
+"""
+Tracking of GitHub API rate limits per installation.
+"""
+import logging
+import os
+import threading
+import time
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class GitHubRateLimitError(Exception):
+    """Raised when a GitHub API call would have to wait longer than allowed for the rate limit."""
+
+    def __init__(self, message, retry_after):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _parse_number(value):
+    """Return value as float if it is a numeric header value, else None."""
+    if not isinstance(value, (str, int, float)):
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+class GitHubRateLimiter:
+    """
+    Process-wide view of the GitHub API rate limit budget, keyed by installation.
+
+    The state is updated from the X-RateLimit-* and Retry-After response headers.
+    Non-urgent calls are delayed until the budget resets once fewer than
+    ``reserve`` requests remain, so job provisioning keeps the remaining budget.
+    """
+
+    def __init__(self, reserve=None, max_wait=None):
+        """
+        Initialize GitHubRateLimiter.
+
+        Args:
+            reserve (int): Requests kept back for urgent calls.
+            max_wait (int): Max. seconds a call is delayed before GitHubRateLimitError is raised.
+        """
+        self.reserve = reserve if reserve is not None else int(os.environ.get('GITHUB_RATE_LIMIT_RESERVE', 100))
+        self.max_wait = max_wait if max_wait is not None else float(os.environ.get('GITHUB_RATE_LIMIT_MAX_WAIT', 10))
+        self._lock = threading.Lock()
+        self._states = {}
+
+    def _state(self, key):
+        """Return the mutable state dict for key."""
+        with self._lock:
+            return self._states.setdefault(
+                key, {'remaining': None, 'limit': None, 'reset': None, 'blocked_until': 0}
+            )
+
+    def before_request(self, key, urgent=True):
+        """
+        Delay the calling thread if the rate limit budget for key is exhausted.
+
+        Args:
+            key (str): The installation ID or 'app' for calls authenticated with the App JWT.
+            urgent (bool): Urgent calls may use the reserve, non-urgent calls wait for the reset.
+
+        Raises:
+            GitHubRateLimitError: If the call would have to wait longer than max_wait.
+        """
+        state = self._state(key)
+        now = time.time()
+        wait = 0
+        if state['blocked_until'] > now:
+            wait = state['blocked_until'] - now
+        elif state['remaining'] is not None and state['reset'] and state['reset'] > now:
+            if state['remaining'] <= 0 or (not urgent and state['remaining'] <= self.reserve):
+                wait = state['reset'] - now
+
+        if wait <= 0:
+            return
+        if wait > self.max_wait:
+            metrics.inc('github_rate_limit_rejected_total')
+            raise GitHubRateLimitError(
+                f"GitHub API rate limit for {key} exhausted, retry after {int(wait)} seconds", wait
+            )
+        logger.warning("GitHub API rate limit for %s low, delaying call by %.1f seconds", key, wait)
+        metrics.inc('github_rate_limit_delays_total')
+        time.sleep(wait)
+
+    def update(self, key, response):
+        """
+        Update the budget for key from a GitHub API response.
+
+        Args:
+            key (str): The installation ID or 'app'.
+            response (requests.Response): The API response.
+
+        Returns:
+            float or None: Seconds to wait before retrying if the response was rate limited.
+        """
+        headers = response.headers
+        remaining = _parse_number(headers.get('X-RateLimit-Remaining'))
+        limit = _parse_number(headers.get('X-RateLimit-Limit'))
+        reset = _parse_number(headers.get('X-RateLimit-Reset'))
+        retry_after = _parse_number(headers.get('Retry-After'))
+        now = time.time()
+
+        state = self._state(key)
+        with self._lock:
+            if remaining is not None:
+                state['remaining'] = remaining
+                metrics.set_gauge(f'github_rate_limit_remaining{{installation="{key}"}}', remaining)
+            if limit is not None:
+                state['limit'] = limit
+                metrics.set_gauge(f'github_rate_limit_limit{{installation="{key}"}}', limit)
+            if reset is not None:
+                state['reset'] = reset
+
+            if response.status_code not in (403, 429):
+                return None
+            # Secondary rate limits send Retry-After, primary ones X-RateLimit-Remaining: 0
+            if retry_after is None and remaining == 0 and reset is not None:
+                retry_after = max(reset - now, 0)
+            if retry_after is None:
+                return None
+            state['blocked_until'] = now + retry_after
+
+        logger.warning("GitHub API rate limit hit for %s, retry after %.1f seconds", key, retry_after)
+        metrics.inc('github_rate_limited_responses_total')
+        return retry_after
+
+    def stats(self, key):
+        """
+        Return the known budget for key.
+
+        Returns:
+            dict: A dict with 'remaining', 'limit', 'reset' and 'blocked_until' keys.
+        """
+        return dict(self._state(key))
+
+    def clear(self):
+        """Forget all tracked budgets."""
+        with self._lock:
+            self._states.clear()
+
+
+# Process-wide limiter shared by all GitHubClient instances
+rate_limiter = GitHubRateLimiter()
@@ -0,0 +1,18 @@
+"""
+Routes for exposing operational metrics.
+"""
+from flask import Blueprint, request, jsonify
+from app.routes.setup import check_auth, authenticate
+from app.utils import metrics
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+@metrics_bp.route('/metrics', methods=['GET'])
+def get_metrics():
+    """Return a snapshot of all in-process counters and gauges."""
+    auth = request.authorization
+    if not auth or not check_auth(auth.username, auth.password):
+        return authenticate()
+
+    return jsonify(metrics.snapshot()), 200
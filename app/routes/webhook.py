@@ -2,8 +2,13 @@
 Routes for handling GitHub webhooks.
 """
 import logging
-from flask import Blueprint, request, jsonify
+import threading
+import time
+from flask import Blueprint, current_app, request, jsonify
 from app.services import WebhookService
+from app.services.delivery_dedup import DeliveryDeduplicator
+from app.services.provisioning_workers import ProvisioningWorkers, provisions_in_process
+from app.utils import metrics
 from app.utils.security import verify_github_signature
 from app import limiter
 
@@ -11,6 +16,106 @@ logger = logging.getLogger(__name__)
 
 webhook_bp = Blueprint('webhook', __name__)
 
+_webhook_service_lock = threading.Lock()
+
+
+def get_webhook_service(app=None):
+    """
+    Return the WebhookService shared by all requests of the app.
+
+    The service and its GitHub and Compute Engine clients are created once per app,
+    so deliveries reuse the clients' credentials and keep-alive connections.
+    All clients are safe to share between gunicorn threads.
+
+    Args:
+        app (Flask): The app, defaults to the current app.
+
+    Returns:
+        WebhookService: The shared service.
+    """
+    app = app or current_app
+    service = app.extensions.get('webhook_service')
+    if service is not None:
+        return service
+
+    with _webhook_service_lock:
+        service = app.extensions.get('webhook_service')
+        if service is None:
+            started = time.perf_counter()
+            service = WebhookService()
+            if provisions_in_process():
+                service.start()
+            duration = time.perf_counter() - started
+            metrics.set_gauge('webhook_service_init_seconds', round(duration, 6))
+            logger.info("Created shared WebhookService in %.3fs", duration)
+            app.extensions['webhook_service'] = service
+    return service
+
+
+def get_provisioning_workers(app=None):
+    """
+    Return the worker pool processing accepted deliveries of the app.
+
+    Args:
+        app (Flask): The app, defaults to the current app.
+
+    Returns:
+        ProvisioningWorkers or None: The worker pool, or None if deliveries are processed in the request.
+    """
+    # The workers run outside the request, so they need the app itself rather than the proxy
+    app = app or current_app._get_current_object()
+    if 'provisioning_workers' in app.extensions:
+        return app.extensions['provisioning_workers']
+
+    with _webhook_service_lock:
+        if 'provisioning_workers' not in app.extensions:
+            app.extensions['provisioning_workers'] = ProvisioningWorkers.from_env(
+                lambda payload, delivery_id: get_webhook_service(app).handle_workflow_job(
+                    payload, delivery_id=delivery_id
+                ),
+                # A dropped delivery was answered with 202, GitHub's manual redelivery must not be a duplicate
+                on_drop=lambda payload, delivery_id: release_delivery(app, payload, delivery_id),
+            )
+    return app.extensions['provisioning_workers']
+
+
+def get_delivery_deduplicator(app=None):
+    """
+    Return the deduplicator of repeated deliveries of the app.
+
+    Args:
+        app (Flask): The app, defaults to the current app.
+
+    Returns:
+        DeliveryDeduplicator or None: The deduplicator, or None if it is disabled.
+    """
+    app = app or current_app
+    if 'delivery_deduplicator' in app.extensions:
+        return app.extensions['delivery_deduplicator']
+
+    with _webhook_service_lock:
+        if 'delivery_deduplicator' not in app.extensions:
+            app.extensions['delivery_deduplicator'] = DeliveryDeduplicator.from_env()
+    return app.extensions['delivery_deduplicator']
+
+
+def release_delivery(app, payload, delivery_id=None):
+    """Forget a delivery, so its redelivery is processed again."""
+    deduplicator = get_delivery_deduplicator(app)
+    if deduplicator:
+        deduplicator.release(payload, delivery_id)
+
+
+def init_webhook_service_in_background(app):
+    """Create the shared WebhookService and its template index before the first webhook arrives."""
+    def init():
+        try:
+            get_webhook_service(app).gcloud_client.load_templates()
+        except Exception as e:
+            logger.warning("Failed to create shared WebhookService: %s", e)
+
+    threading.Thread(target=init, name='webhook-service-init', daemon=True).start()
+
 
 @webhook_bp.route('/webhook', methods=['POST'])
 @limiter.limit("1000 per hour")  # Higher limit for high-traffic webhook endpoint
@@ -60,6 +165,9 @@ def webhook():
     # https://docs.github.com/en/webhooks/webhook-events-and-payloads#workflow_job
     if event_type == 'workflow_job':
         return handle_workflow_job_event(payload, delivery_id)
+    # https://docs.github.com/en/webhooks/webhook-events-and-payloads#workflow_run
+    elif event_type == 'workflow_run':
+        return handle_workflow_run_event(payload, delivery_id)
     else:
         logger.warning(
             "Received unknown event type: %s, delivery_id: %s",
@@ -70,9 +178,49 @@ def webhook():
 
 
 def handle_workflow_job_event(payload, delivery_id=None):
-    """Handle workflow_job event."""
+    """Handle workflow_job event, answering repeated deliveries without processing them."""
+    deduplicator = get_delivery_deduplicator()
+    if deduplicator and not deduplicator.claim(payload, delivery_id):
+        logger.info("Ignoring duplicate delivery, delivery_id: %s", delivery_id)
+        return jsonify({'status': 'duplicate'}), 200
+
+    response, status = process_workflow_job_event(payload, delivery_id)
+    if deduplicator and status >= 400:
+        # GitHub's redelivery of a failed delivery has to be processed
+        deduplicator.release(payload, delivery_id)
+    return response, status
+
+
+def handle_workflow_run_event(payload, delivery_id=None):
+    """Handle workflow_run event, re-running jobs of preempted Spot VMs once their run completed."""
+    deduplicator = get_delivery_deduplicator()
+    if deduplicator and not deduplicator.claim(payload, delivery_id):
+        logger.info("Ignoring duplicate delivery, delivery_id: %s", delivery_id)
+        return jsonify({'status': 'duplicate'}), 200
+
+    try:
+        result = get_webhook_service().handle_workflow_run(payload, delivery_id=delivery_id)
+    except ValueError as e:
+        logger.error("[Webhook] Validation error: %s, delivery_id: %s", str(e), delivery_id)
+        response, status = jsonify({'status': 'error', 'message': 'Invalid payload'}), 400
+    except Exception as e:
+        logger.error("[Webhook] Error handling webhook: %s, delivery_id: %s", str(e), delivery_id)
+        response, status = jsonify({'status': 'error', 'message': 'Internal error'}), 500
+    else:
+        return jsonify({'status': 'success', 'action': result.get('action')}), 200
+
+    if deduplicator:
+        deduplicator.release(payload, delivery_id)
+    return response, status
+
+
+def process_workflow_job_event(payload, delivery_id=None):
+    """Process workflow_job event."""
     try:
-        webhook_service = WebhookService()
+        webhook_service = get_webhook_service()
+        workers = get_provisioning_workers()
+        if workers:
+            return accept_workflow_job_event(webhook_service, workers, payload, delivery_id)
         result = webhook_service.handle_workflow_job(payload, delivery_id=delivery_id)
         logger.info(
             "Webhook processed successfully, action: %s, runner_name: %s, "
@@ -105,3 +253,18 @@ def handle_workflow_job_event(payload, delivery_id=None):
             delivery_id,
         )
         return jsonify({'status': 'error', 'message': 'Internal error'}), 500
+
+
+def accept_workflow_job_event(webhook_service, workers, payload, delivery_id=None):
+    """
+    Validate a workflow_job event and queue it for the provisioning workers.
+
+    Raises:
+        ValueError: If the payload is invalid.
+    """
+    webhook_service.validate_payload(payload)
+    if not workers.submit(payload, delivery_id):
+        logger.error("[Webhook] Provisioning queue is full, delivery_id: %s", delivery_id)
+        return jsonify({'status': 'error', 'message': 'Provisioning queue full'}), 503
+    logger.info("Webhook accepted, delivery_id: %s", delivery_id)
+    return jsonify({'status': 'accepted'}), 202
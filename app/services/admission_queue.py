@@ -0,0 +1,156 @@
+"""
+In-process queue of jobs waiting for regional quota.
+"""
+import logging
+import os
+import threading
+from collections import deque
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class CapacityUnavailable(Exception):
+    """The regional quota has no room for the runner instance of a job."""
+
+
+class HeldQueueFull(Exception):
+    """The regional quota has no room and no more jobs can be held, the job is dropped."""
+
+
+class AdmissionQueue:
+    """
+    Hold queued jobs until the regional quota has room for their runner.
+
+    Jobs are released in order per label. A label without room does not block
+    jobs of other labels that need less quota. The queue is drained after
+    completed jobs freed capacity and every ``interval`` seconds.
+    """
+
+    def __init__(self, has_capacity, provision, max_held=1000, interval=15):
+        """
+        Initialize AdmissionQueue.
+
+        Args:
+            has_capacity (callable): Called with the label, True if a runner fits into the quota.
+            provision (callable): Called with the held job to create its runner.
+            max_held (int): Maximum number of held jobs.
+            interval (int): Seconds between two drains.
+        """
+        self.has_capacity = has_capacity
+        self.provision = provision
+        self.max_held = max_held
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._held = deque()
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, has_capacity, provision):
+        """
+        Create the queue if GCE_QUOTA_ADMISSION is enabled.
+
+        Returns:
+            AdmissionQueue or None: The queue, or None if quota admission is disabled.
+        """
+        if os.environ.get('GCE_QUOTA_ADMISSION', 'false').strip().lower() != 'true':
+            return None
+        return cls(
+            has_capacity,
+            provision,
+            max_held=int(os.environ.get('GCE_ADMISSION_MAX_HELD', 1000)),
+            interval=int(os.environ.get('GCE_ADMISSION_INTERVAL', 15)),
+        )
+
+    def hold(self, label, job):
+        """
+        Hold a job until its runner fits into the quota.
+
+        Args:
+            label (str): The runner label.
+            job (dict): The job passed to provision.
+
+        Returns:
+            bool: False if the queue is full and the job was not held.
+        """
+        with self._lock:
+            if len(self._held) >= self.max_held:
+                return False
+            self._held.append((label, job))
+            held = len(self._held)
+        metrics.inc('gce_admission_held_total')
+        metrics.set_gauge('gce_admission_held', held)
+        if not self._thread:
+            self.start()
+        return True
+
+    def size(self):
+        """Return the number of held jobs."""
+        with self._lock:
+            return len(self._held)
+
+    def drain(self):
+        """
+        Provision the held jobs whose runner fits into the quota.
+
+        Returns:
+            int: The number of released jobs.
+        """
+        released = 0
+        blocked = set()
+        with self._lock:
+            held = list(self._held)
+        for entry in held:
+            label, job = entry
+            if label in blocked:
+                continue
+            try:
+                fits = self.has_capacity(label)
+            except Exception as e:
+                logger.error("Failed to check quota for label %s: %s", label, e)
+                fits = False
+            if not fits:
+                # Keep the order of jobs per label
+                blocked.add(label)
+                continue
+            with self._lock:
+                self._held.remove(entry)
+                metrics.set_gauge('gce_admission_held', len(self._held))
+            released += 1
+            metrics.inc('gce_admission_released_total')
+            try:
+                self.provision(job)
+            except Exception as e:
+                logger.error(
+                    "Failed to provision held job for label %s: %s, delivery_id: %s",
+                    label,
+                    e,
+                    job.get('delivery_id'),
+                )
+        return released
+
+    def wake(self):
+        """Drain the queue now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def start(self):
+        """Start draining the queue in a background thread."""
+        with self._lock:
+            if self._thread:
+                return
+            self._thread = threading.Thread(target=self._run, name='admission-queue', daemon=True)
+        self._thread.start()
+
+    def _run(self):
+        while not self._stopped.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            if self.size():
+                self.drain()
+
+    def stop(self):
+        """Stop the background drain."""
+        self._stopped.set()
+        self._wake.set()
@@ -0,0 +1,187 @@
+"""
+Deduplication of repeated webhook deliveries.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from contextlib import closing
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class DedupStore:
+    """
+    Interface of the store of seen keys.
+
+    The stores recognize the deliveries of one host only, a delivery received
+    by another instance of the app is processed again.
+    """
+
+    def add(self, key, ttl):
+        """
+        Remember a key for ttl seconds.
+
+        Args:
+            key (str): The key.
+            ttl (int): Seconds the key is remembered.
+
+        Returns:
+            bool: False if the key is already remembered.
+        """
+        raise NotImplementedError
+
+    def discard(self, key):
+        """Forget a key."""
+        raise NotImplementedError
+
+
+class MemoryDedupStore(DedupStore):
+    """In-process store, the least recently added key is dropped beyond ``max_entries``."""
+
+    def __init__(self, max_entries=10000):
+        """
+        Initialize MemoryDedupStore.
+
+        Args:
+            max_entries (int): Maximum number of remembered keys.
+        """
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._keys = OrderedDict()
+
+    def add(self, key, ttl):
+        now = time.monotonic()
+        with self._lock:
+            expires_at = self._keys.get(key)
+            if expires_at is not None and expires_at > now:
+                return False
+            self._keys[key] = now + ttl
+            self._keys.move_to_end(key)
+            while len(self._keys) > self.max_entries:
+                self._keys.popitem(last=False)
+            return True
+
+    def discard(self, key):
+        with self._lock:
+            self._keys.pop(key, None)
+
+
+class SQLiteDedupStore(DedupStore):
+    """Store in a SQLite database in WAL mode, shared by the processes of one host."""
+
+    def __init__(self, path):
+        """
+        Initialize SQLiteDedupStore.
+
+        Args:
+            path (str): The database file.
+        """
+        self.path = path
+        with closing(self._connect()) as connection:
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS seen (key TEXT PRIMARY KEY, expires_at REAL NOT NULL)')
+            connection.execute('CREATE INDEX IF NOT EXISTS seen_expires_at ON seen (expires_at)')
+
+    def _connect(self):
+        # A connection per call, sqlite3 connections must not be shared between threads
+        return sqlite3.connect(self.path, timeout=30, isolation_level=None)
+
+    def add(self, key, ttl):
+        now = time.time()
+        with closing(self._connect()) as connection:
+            connection.execute('DELETE FROM seen WHERE expires_at <= ?', (now,))
+            # INSERT OR IGNORE is atomic, only one process can add the key
+            cursor = connection.execute('INSERT OR IGNORE INTO seen (key, expires_at) VALUES (?, ?)', (key, now + ttl))
+            return cursor.rowcount == 1
+
+    def discard(self, key):
+        with closing(self._connect()) as connection:
+            connection.execute('DELETE FROM seen WHERE key = ?', (key,))
+
+
+class DeliveryDeduplicator:
+    """
+    Recognize repeated workflow_job deliveries.
+
+    GitHub redelivers a webhook after a timeout, and a delivery can be redelivered
+    by hand in the App settings. A delivery is a duplicate if its
+    ``X-GitHub-Delivery`` ID or the action of its workflow job was seen in the
+    last ``ttl`` seconds.
+    """
+
+    def __init__(self, store, ttl=3600):
+        """
+        Initialize DeliveryDeduplicator.
+
+        Args:
+            store (DedupStore): The store of seen keys.
+            ttl (int): Seconds a delivery is remembered.
+        """
+        self.store = store
+        self.ttl = ttl
+
+    @classmethod
+    def from_env(cls):
+        """
+        Create the deduplicator configured by GITHUB_DEDUP_TTL and GITHUB_DEDUP_STORE.
+
+        Returns:
+            DeliveryDeduplicator or None: The deduplicator, or None if it is disabled.
+        """
+        ttl = int(os.environ.get('GITHUB_DEDUP_TTL', 3600))
+        if ttl <= 0:
+            return None
+        url = os.environ.get('GITHUB_DEDUP_STORE', 'memory').strip()
+        if url.startswith('sqlite:///'):
+            store = SQLiteDedupStore(url[len('sqlite:///'):])
+        elif url == 'memory':
+            store = MemoryDedupStore(max_entries=int(os.environ.get('GITHUB_DEDUP_MAX_ENTRIES', 10000)))
+        else:
+            raise ValueError(f"Unsupported GITHUB_DEDUP_STORE: {url}")
+        return cls(store, ttl=ttl)
+
+    @staticmethod
+    def _keys(payload, delivery_id):
+        """Return the keys of a delivery by kind."""
+        keys = []
+        if delivery_id:
+            keys.append(('delivery', f'delivery:{delivery_id}'))
+        workflow_job = payload.get('workflow_job') if isinstance(payload, dict) else None
+        if isinstance(workflow_job, dict) and workflow_job.get('id'):
+            keys.append(('job', f"job:{workflow_job['id']}:{payload.get('action')}"))
+        return keys
+
+    def claim(self, payload, delivery_id=None):
+        """
+        Remember a delivery.
+
+        Args:
+            payload (dict): The workflow_job payload.
+            delivery_id (str): The GitHub webhook delivery ID.
+
+        Returns:
+            bool: False if the delivery is a duplicate.
+        """
+        for kind, key in self._keys(payload, delivery_id):
+            try:
+                added = self.store.add(key, self.ttl)
+            except Exception as e:
+                # Without the store deliveries are processed as before
+                logger.warning("Failed to check for duplicate delivery: %s, delivery_id: %s", e, delivery_id)
+                return True
+            if not added:
+                metrics.inc(f'webhook_duplicates_total{{key="{kind}"}}')
+                return False
+        return True
+
+    def release(self, payload, delivery_id=None):
+        """Forget a delivery that failed, so a redelivery is processed again."""
+        for _, key in self._keys(payload, delivery_id):
+            try:
+                self.store.discard(key)
+            except Exception as e:
+                logger.warning("Failed to forget delivery: %s, delivery_id: %s", e, delivery_id)
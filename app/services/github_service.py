@@ -3,10 +3,9 @@ Service for GitHub App specific logic.
 """
 import json
 import os
-import requests
 import logging
-
-REQUEST_TIMEOUT = 30  # seconds
+from app.utils import http
+from app.utils.http import GITHUB_API_URL, REQUEST_TIMEOUT
 
 logger = logging.getLogger(__name__)
 
@@ -42,10 +41,11 @@ class GitHubService:
             "default_permissions": {
                 "administration": "write",
                 "organization_self_hosted_runners": "write",
-                "actions": "read"
+                "actions": "write"
             },
             "default_events": [
-                "workflow_job"
+                "workflow_job",
+                "workflow_run"
             ]
         }
         return json.dumps(manifest)
@@ -53,8 +53,8 @@ class GitHubService:
     @staticmethod
     def exchange_code(code):
         """Exchange the temporary code for the app configuration."""
-        url = f"https://api.github.com/app-manifests/{code}/conversions"
-        response = requests.post(url, timeout=REQUEST_TIMEOUT)
+        url = f"{GITHUB_API_URL}/app-manifests/{code}/conversions"
+        response = http.get_session().post(url, timeout=REQUEST_TIMEOUT)
         response.raise_for_status()
         return response.json()
 
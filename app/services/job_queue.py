@@ -0,0 +1,278 @@
+"""
+Queues of accepted webhook deliveries waiting for a provisioning worker.
+"""
+import json
+import os
+import sqlite3
+import heapq
+import threading
+import time
+from collections import deque
+
+
+class JobQueueFull(Exception):
+    """The queue does not accept more jobs."""
+
+
+class Job:
+    """A queued webhook delivery."""
+
+    def __init__(self, job_id, payload, delivery_id=None, attempts=0, queued_at=None, available_at=None):
+        self.id = job_id
+        self.payload = payload
+        self.delivery_id = delivery_id
+        self.attempts = attempts
+        self.queued_at = queued_at if queued_at is not None else time.time()
+        # Monotonic time before which a released job is not handed out again
+        self.available_at = available_at
+
+
+class JobQueue:
+    """
+    Interface of a job queue.
+
+    ``get`` leases a job, which must be passed to ``ack`` once it is processed or
+    to ``nack`` to process it again later. Durable queues keep jobs across restarts
+    and hand out a job again once its lease expired, so a job of a crashed worker
+    is not lost. A managed queue, e.g. Pub/Sub with ack deadlines, fits the same
+    interface.
+    """
+
+    # True if jobs survive a restart of the process
+    durable = False
+
+    def put(self, payload, delivery_id=None):
+        """
+        Add a job.
+
+        Args:
+            payload (dict): The webhook payload.
+            delivery_id (str): The GitHub webhook delivery ID.
+
+        Raises:
+            JobQueueFull: If the queue does not accept more jobs.
+        """
+        raise NotImplementedError
+
+    def get(self, timeout=None):
+        """
+        Lease the next job.
+
+        Args:
+            timeout (float): Seconds to wait for a job.
+
+        Returns:
+            Job or None: The job, None if no job arrived in time.
+        """
+        raise NotImplementedError
+
+    def ack(self, job):
+        """Remove a processed job."""
+        raise NotImplementedError
+
+    def nack(self, job, delay=0):
+        """Release a job to be processed again after delay seconds."""
+        raise NotImplementedError
+
+    def size(self):
+        """Return the number of jobs not yet acknowledged."""
+        raise NotImplementedError
+
+
+class MemoryJobQueue(JobQueue):
+    """Bounded in-process queue, jobs are lost when the process exits."""
+
+    def __init__(self, max_size=1000):
+        """
+        Initialize MemoryJobQueue.
+
+        Args:
+            max_size (int): Maximum number of queued jobs.
+        """
+        self.max_size = max_size
+        self._condition = threading.Condition()
+        self._jobs = deque()
+        # Heap of (available_at, id, job) released with a delay
+        self._delayed = []
+        self._leased = 0
+        self._next_id = 0
+
+    def put(self, payload, delivery_id=None):
+        with self._condition:
+            if len(self._jobs) + len(self._delayed) >= self.max_size:
+                raise JobQueueFull()
+            self._next_id += 1
+            self._jobs.append(Job(self._next_id, payload, delivery_id))
+            self._condition.notify()
+
+    def get(self, timeout=None):
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                now = time.monotonic()
+                while self._delayed and self._delayed[0][0] <= now:
+                    self._jobs.append(heapq.heappop(self._delayed)[2])
+                if self._jobs:
+                    break
+                # Wake up for the next delayed job or the timeout, whichever comes first
+                wait = self._delayed[0][0] - now if self._delayed else None
+                if deadline is not None:
+                    if now >= deadline:
+                        return None
+                    wait = deadline - now if wait is None else min(wait, deadline - now)
+                self._condition.wait(wait)
+            job = self._jobs.popleft()
+            job.attempts += 1
+            self._leased += 1
+            return job
+
+    def ack(self, job):
+        with self._condition:
+            self._leased -= 1
+
+    def nack(self, job, delay=0):
+        with self._condition:
+            self._leased -= 1
+            if delay > 0:
+                job.available_at = time.monotonic() + delay
+                heapq.heappush(self._delayed, (job.available_at, job.id, job))
+            else:
+                self._jobs.append(job)
+            self._condition.notify()
+
+    def size(self):
+        with self._condition:
+            return len(self._jobs) + len(self._delayed) + self._leased
+
+
+class SQLiteJobQueue(JobQueue):
+    """
+    Durable queue in a local SQLite database in WAL mode.
+
+    Suited for tests and a single instance with a persistent disk. Processes on
+    the same host, e.g. the web server and ``worker.py``, can share the database.
+    A leased job is handed out again after ``lease`` seconds without ``ack``.
+    """
+
+    durable = True
+
+    def __init__(self, path, lease=300, max_size=10000):
+        """
+        Initialize SQLiteJobQueue.
+
+        Args:
+            path (str): The database file.
+            lease (int): Seconds a job is hidden from other workers after get.
+            max_size (int): Maximum number of queued jobs.
+        """
+        self.path = path
+        self.lease = lease
+        self.max_size = max_size
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        try:
+            # WAL lets readers and the writer work concurrently, it cannot be set inside a transaction
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS jobs ('
+                'id INTEGER PRIMARY KEY AUTOINCREMENT, '
+                'payload TEXT NOT NULL, '
+                'delivery_id TEXT, '
+                'attempts INTEGER NOT NULL DEFAULT 0, '
+                'queued_at REAL NOT NULL, '
+                'available_at REAL NOT NULL)'
+            )
+            connection.execute('CREATE INDEX IF NOT EXISTS jobs_available_at ON jobs (available_at)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        # A connection per call, sqlite3 connections must not be shared between threads
+        connection = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+        connection.execute('PRAGMA synchronous=NORMAL')
+        return _Transaction(connection)
+
+    def put(self, payload, delivery_id=None):
+        now = time.time()
+        with self._connect() as connection:
+            if connection.execute('SELECT COUNT(*) FROM jobs').fetchone()[0] >= self.max_size:
+                raise JobQueueFull()
+            connection.execute(
+                'INSERT INTO jobs (payload, delivery_id, queued_at, available_at) VALUES (?, ?, ?, ?)',
+                (json.dumps(payload), delivery_id, now, now),
+            )
+
+    def get(self, timeout=None):
+        deadline = time.monotonic() + (timeout or 0)
+        while True:
+            job = self._lease()
+            if job or time.monotonic() >= deadline:
+                return job
+            time.sleep(min(0.2, max(deadline - time.monotonic(), 0)))
+
+    def _lease(self):
+        now = time.time()
+        with self._connect() as connection:
+            row = connection.execute(
+                'SELECT id, payload, delivery_id, attempts, queued_at FROM jobs '
+                'WHERE available_at <= ? ORDER BY id LIMIT 1',
+                (now,),
+            ).fetchone()
+            if not row:
+                return None
+            connection.execute(
+                'UPDATE jobs SET attempts = attempts + 1, available_at = ? WHERE id = ?',
+                (now + self.lease, row[0]),
+            )
+        return Job(row[0], json.loads(row[1]), row[2], row[3] + 1, row[4])
+
+    def ack(self, job):
+        with self._connect() as connection:
+            connection.execute('DELETE FROM jobs WHERE id = ?', (job.id,))
+
+    def nack(self, job, delay=0):
+        with self._connect() as connection:
+            connection.execute('UPDATE jobs SET available_at = ? WHERE id = ?', (time.time() + delay, job.id))
+
+    def size(self):
+        with self._connect() as connection:
+            return connection.execute('SELECT COUNT(*) FROM jobs').fetchone()[0]
+
+
+class _Transaction:
+    """Run the statements of a with block in one immediate transaction and close the connection."""
+
+    def __init__(self, connection):
+        self.connection = connection
+
+    def __enter__(self):
+        # IMMEDIATE takes the write lock up front, so two workers cannot lease the same job
+        self.connection.execute('BEGIN IMMEDIATE')
+        return self.connection
+
+    def __exit__(self, exc_type, exc, traceback):
+        try:
+            self.connection.execute('ROLLBACK' if exc_type else 'COMMIT')
+        finally:
+            self.connection.close()
+
+
+def job_queue_from_env(max_size=1000):
+    """
+    Create the job queue configured by GITHUB_JOB_QUEUE.
+
+    Args:
+        max_size (int): Maximum number of queued jobs.
+
+    Returns:
+        JobQueue: A SQLiteJobQueue for sqlite:///path, otherwise a MemoryJobQueue.
+    """
+    url = os.environ.get('GITHUB_JOB_QUEUE', 'memory').strip()
+    if url.startswith('sqlite:///'):
+        return SQLiteJobQueue(
+            url[len('sqlite:///'):],
+            lease=int(os.environ.get('GITHUB_JOB_QUEUE_LEASE', 300)),
+            max_size=max_size,
+        )
+    if url != 'memory':
+        raise ValueError(f"Unsupported GITHUB_JOB_QUEUE: {url}")
+    return MemoryJobQueue(max_size=max_size)
@@ -0,0 +1,207 @@
+"""
+Bounded worker pool processing accepted webhook deliveries.
+"""
+import atexit
+import logging
+import os
+import threading
+import time
+from app.services.job_queue import JobQueueFull, MemoryJobQueue, job_queue_from_env
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def provisions_in_process():
+    """
+    Check if the web app process creates runners.
+
+    Returns:
+        bool: False if accepted deliveries are only queued for worker.py.
+    """
+    if os.environ.get('GITHUB_WEBHOOK_ASYNC', 'false').strip().lower() != 'true':
+        return True
+    return int(os.environ.get('GITHUB_WEBHOOK_WORKERS', 4)) > 0
+
+
+class ProvisioningWorkers:
+    """
+    Process accepted workflow_job deliveries outside the request thread.
+
+    The webhook route validates a delivery, queues it and answers 202 right away,
+    so neither GitHub's 10 second delivery timeout nor the gunicorn threads are
+    held up by GitHub and Compute Engine calls. ``max_workers`` threads process
+    the queue, with 0 workers the deliveries are only queued for ``worker.py``.
+
+    On shutdown, e.g. after SIGTERM on Cloud Run scale-in, an in-memory queue is
+    processed for up to ``drain_timeout`` seconds. With a durable queue only the
+    running deliveries are finished, the queued ones are kept for the next worker.
+    """
+
+    def __init__(
+        self, handle, max_workers=4, max_queue=1000, drain_timeout=8, job_queue=None, max_attempts=3, on_drop=None
+    ):
+        """
+        Initialize ProvisioningWorkers.
+
+        Args:
+            handle (callable): Called with (payload, delivery_id) for each delivery.
+            max_workers (int): Number of worker threads.
+            max_queue (int): Maximum number of queued deliveries of the default in-memory queue.
+            drain_timeout (float): Seconds to process queued deliveries on shutdown.
+            job_queue (JobQueue): The queue, defaults to an in-memory queue.
+            max_attempts (int): Attempts per delivery before it is dropped.
+            on_drop (callable): Called with (payload, delivery_id) for a dropped delivery,
+                e.g. to forget it, so a redelivery is processed again.
+
+        Raises:
+            ValueError: If there are no workers and the queue is not durable.
+        """
+        self.job_queue = job_queue or MemoryJobQueue(max_size=max_queue)
+        if max_workers < 1 and not self.job_queue.durable:
+            # No worker.py can read an in-process queue, every accepted delivery would be lost
+            raise ValueError("GITHUB_WEBHOOK_WORKERS=0 needs a durable GITHUB_JOB_QUEUE shared with worker.py")
+        self.handle = handle
+        self.on_drop = on_drop
+        self.drain_timeout = drain_timeout
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._busy = 0
+        self._accepting = True
+        self._stopping = False
+        self._threads = [
+            threading.Thread(target=self._run, name=f'provisioning-worker-{index}', daemon=True)
+            for index in range(max_workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+        atexit.register(self.shutdown)
+
+    @classmethod
+    def from_env(cls, handle, on_drop=None):
+        """
+        Create the worker pool if GITHUB_WEBHOOK_ASYNC is enabled.
+
+        Returns:
+            ProvisioningWorkers or None: The worker pool, or None if deliveries are processed in the request.
+        """
+        if os.environ.get('GITHUB_WEBHOOK_ASYNC', 'false').strip().lower() != 'true':
+            return None
+        return cls.create(handle, on_drop=on_drop)
+
+    @classmethod
+    def create(cls, handle, max_workers=None, on_drop=None):
+        """
+        Create the worker pool with the queue and concurrency configured in the environment.
+
+        Args:
+            handle (callable): Called with (payload, delivery_id) for each delivery.
+            max_workers (int): Number of worker threads, defaults to GITHUB_WEBHOOK_WORKERS.
+            on_drop (callable): Called with (payload, delivery_id) for a dropped delivery.
+
+        Returns:
+            ProvisioningWorkers: The worker pool.
+        """
+        if max_workers is None:
+            max_workers = int(os.environ.get('GITHUB_WEBHOOK_WORKERS', 4))
+        return cls(
+            handle,
+            max_workers=max_workers,
+            drain_timeout=float(os.environ.get('GITHUB_WEBHOOK_DRAIN_TIMEOUT', 8)),
+            job_queue=job_queue_from_env(max_size=int(os.environ.get('GITHUB_WEBHOOK_QUEUE_SIZE', 1000))),
+            max_attempts=int(os.environ.get('GITHUB_JOB_MAX_ATTEMPTS', 3)),
+            on_drop=on_drop,
+        )
+
+    def submit(self, payload, delivery_id=None):
+        """
+        Queue a delivery.
+
+        Args:
+            payload (dict): The validated workflow_job payload.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            bool: False if the queue is full or the pool is shutting down.
+        """
+        if not self._accepting:
+            return False
+        try:
+            self.job_queue.put(payload, delivery_id)
+        except JobQueueFull:
+            metrics.inc('provisioning_queue_rejected_total')
+            return False
+        metrics.set_gauge('provisioning_queue_depth', self.job_queue.size())
+        return True
+
+    def _set_busy(self, delta):
+        with self._lock:
+            self._busy += delta
+            busy = self._busy
+        metrics.set_gauge('provisioning_workers_busy', busy)
+
+    def _run(self):
+        """Process queued deliveries until the pool is stopped."""
+        while not self._stopping or not self.job_queue.durable:
+            job = self.job_queue.get(timeout=0.5)
+            if job is None:
+                continue
+            self._set_busy(1)
+            metrics.set_gauge('provisioning_queue_depth', self.job_queue.size())
+            metrics.set_gauge('provisioning_queue_last_wait_seconds', round(time.time() - job.queued_at, 3))
+            try:
+                result = self.handle(job.payload, job.delivery_id)
+                self.job_queue.ack(job)
+                metrics.inc('provisioning_jobs_total{status="done"}')
+                logger.info(
+                    "Webhook processed successfully, action: %s, runner_name: %s, delivery_id: %s",
+                    result.get('action'),
+                    result.get('runner_name'),
+                    job.delivery_id,
+                )
+            except Exception as e:
+                logger.error("[Webhook] Error handling webhook: %s, delivery_id: %s", e, job.delivery_id)
+                self._fail(job)
+            finally:
+                self._set_busy(-1)
+
+    def _fail(self, job):
+        """Retry a failed delivery with backoff or drop it after max_attempts."""
+        if job.attempts >= self.max_attempts:
+            metrics.inc('provisioning_jobs_total{status="failed"}')
+            if self.on_drop:
+                try:
+                    self.on_drop(job.payload, job.delivery_id)
+                except Exception as e:
+                    logger.warning("Failed to release dropped delivery: %s, delivery_id: %s", e, job.delivery_id)
+            self.job_queue.ack(job)
+            return
+        metrics.inc('provisioning_jobs_total{status="retried"}')
+        self.job_queue.nack(job, delay=2 ** job.attempts)
+
+    def pending(self):
+        """Return the number of running deliveries and, for an in-memory queue, the queued ones."""
+        if self.job_queue.durable:
+            with self._lock:
+                return self._busy
+        return self.job_queue.size()
+
+    def shutdown(self, timeout=None):
+        """
+        Stop accepting deliveries and wait for the queued ones.
+
+        Args:
+            timeout (float): Seconds to wait, defaults to drain_timeout.
+
+        Returns:
+            int: The number of deliveries not processed in time.
+        """
+        self._accepting = False
+        self._stopping = True
+        deadline = time.monotonic() + (self.drain_timeout if timeout is None else timeout)
+        while self.pending() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        remaining = self.pending()
+        if remaining:
+            logger.warning("Shutting down with %d unprocessed webhook deliveries", remaining)
+        return remaining
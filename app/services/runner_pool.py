@@ -0,0 +1,271 @@
+"""
+Warm pool of pre-booted runner instances.
+"""
+import logging
+import os
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def parse_pool_sizes(value):
+    """
+    Parse the pool size per label.
+
+    Args:
+        value (str): Comma-separated label=size pairs, e.g. gcp-ubuntu-24.04=2,gcp-ubuntu-24.04-arm=1.
+
+    Returns:
+        dict: Pool size by label, labels with invalid or zero size are skipped.
+    """
+    sizes = {}
+    for entry in (value or '').split(','):
+        label, _, size = entry.partition('=')
+        label = label.strip()
+        try:
+            size = int(size)
+        except ValueError:
+            if label:
+                logger.warning("Ignoring warm pool entry without valid size: %s", entry.strip())
+            continue
+        if label and size > 0:
+            sizes[label] = size
+    return sizes
+
+
+def instance_age(instance):
+    """
+    Return the age of an instance in seconds.
+
+    Args:
+        instance (google.cloud.compute_v1.Instance): The instance, creation_timestamp is RFC 3339.
+
+    Returns:
+        float: Seconds since the instance was created, 0 if unknown.
+    """
+    try:
+        created = datetime.fromisoformat(instance.creation_timestamp.replace('Z', '+00:00'))
+    except (AttributeError, TypeError, ValueError):
+        return 0
+    return time.time() - created.timestamp()
+
+
+class RunnerPool:
+    """
+    Keep pre-booted, unregistered runner instances per label.
+
+    In ``suspend`` mode pool instances boot from the label's template, report
+    that they are ready and are then suspended. A background thread refills
+    each pool to its size.
+
+    In ``stop`` mode instances of completed runners are not deleted but reset
+    and stopped, keeping their warm boot disk with page cache and docker layers.
+    The pool is only fed by completed runners. ``sizes`` is the maximum per label
+    and instances older than ``max_age`` are deleted instead of reused.
+
+    A queued job claims a pooled instance by setting its runner script in the
+    metadata and resumes or starts it, which is much faster than creating and
+    booting a new instance.
+    """
+
+    def __init__(self, gcloud_client, sizes, interval=30, mode='suspend', max_age=24 * 60 * 60):
+        """
+        Initialize RunnerPool.
+
+        Args:
+            gcloud_client (GCloudClient): The Compute Engine client.
+            sizes (dict): Number of pooled instances by label.
+            interval (int): Seconds between two refills.
+            mode (str): suspend or stop.
+            max_age (int): Seconds after creation a stopped instance is no longer reused.
+        """
+        self.gcloud_client = gcloud_client
+        self.sizes = sizes
+        self.interval = interval
+        self.mode = mode
+        self.max_age = max_age
+        self._lock = threading.Lock()
+        self._ready = {label: deque() for label in sizes}
+        self._wake = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, gcloud_client):
+        """
+        Create the pool configured by GCE_WARM_POOL.
+
+        Returns:
+            RunnerPool or None: The pool, or None if no pool is configured.
+        """
+        sizes = parse_pool_sizes(os.environ.get('GCE_WARM_POOL'))
+        if not sizes:
+            return None
+        mode = os.environ.get('GCE_WARM_POOL_MODE', 'suspend').strip().lower()
+        if mode not in ('suspend', 'stop'):
+            logger.warning("Unknown GCE_WARM_POOL_MODE %s, using suspend", mode)
+            mode = 'suspend'
+        return cls(
+            gcloud_client,
+            sizes,
+            interval=int(os.environ.get('GCE_WARM_POOL_INTERVAL', 30)),
+            mode=mode,
+            max_age=int(os.environ.get('GCE_WARM_POOL_MAX_AGE', 24 * 60 * 60)),
+        )
+
+    def has(self, label):
+        """Check if a pool is configured for the label."""
+        return label in self.sizes
+
+    def acquire(self, label):
+        """
+        Take a ready instance out of the pool.
+
+        Args:
+            label (str): The runner label.
+
+        Returns:
+            google.cloud.compute_v1.Instance or None: The instance as last listed, None if the pool is empty.
+        """
+        with self._lock:
+            ready = self._ready.get(label)
+            instance = ready.popleft() if ready else None
+        metrics.inc(f'gce_warm_pool_{"hits" if instance else "misses"}_total{{label="{label}"}}')
+        return instance
+
+    def wake(self, instance_name, delivery_id=None):
+        """Start a claimed instance."""
+        if self.mode == 'stop':
+            self.gcloud_client.start_instance(instance_name, delivery_id=delivery_id)
+        else:
+            self.gcloud_client.resume_instance(instance_name, delivery_id=delivery_id)
+
+    def _park(self, instance_name):
+        """Put a booted pool instance to rest until it is claimed."""
+        if self.mode == 'stop':
+            self.gcloud_client.stop_instance(instance_name)
+        else:
+            self.gcloud_client.suspend_instance(instance_name)
+
+    def recycle(self, instance_name, label, delivery_id=None):
+        """
+        Return the instance of a completed runner to the pool instead of deleting it.
+
+        Args:
+            instance_name (str): The name of the runner instance.
+            label (str): The runner label.
+            delivery_id (str): The GitHub webhook delivery ID for log correlation.
+
+        Returns:
+            bool: True if the instance was returned to the pool, False if it should be deleted.
+        """
+        if self.mode != 'stop' or not self.has(label):
+            return False
+
+        pooled = [
+            instance for instance in self.gcloud_client.list_pool_instances(label)
+            if not self.gcloud_client.is_pool_instance_claimed(instance)
+        ]
+        if len(pooled) >= self.sizes[label]:
+            logger.info("Warm pool for label %s is full, deleting %s, delivery_id: %s", label, instance_name, delivery_id)
+            return False
+
+        instance = self.gcloud_client.get_instance(instance_name)
+        if instance_age(instance) > self.max_age:
+            logger.info("Instance %s is too old for the warm pool, deleting it, delivery_id: %s", instance_name, delivery_id)
+            return False
+
+        self.gcloud_client.recycle_pool_instance(instance, label, delivery_id=delivery_id)
+        metrics.inc(f'gce_warm_pool_recycled_total{{label="{label}"}}')
+        logger.info("Returned instance %s to the warm pool of label %s, delivery_id: %s", instance_name, label, delivery_id)
+        return True
+
+    def refill(self, label):
+        """
+        Bring the pool of a label to its size.
+
+        Parked instances become ready, booted instances are parked and missing
+        instances are created. Claimed instances no longer count. In stop mode
+        nothing is created, and expired or surplus instances are deleted.
+
+        Args:
+            label (str): The runner label.
+        """
+        parked_status = 'TERMINATED' if self.mode == 'stop' else 'SUSPENDED'
+        ready = []
+        pending = 0
+        for instance in self.gcloud_client.list_pool_instances(label):
+            if self.gcloud_client.is_pool_instance_claimed(instance):
+                continue
+            if instance.status == parked_status:
+                ready.append(instance)
+            elif instance.status == 'RUNNING':
+                pending += 1
+                if self.gcloud_client.is_pool_instance_ready(instance.name):
+                    self._park(instance.name)
+            elif instance.status in ('PROVISIONING', 'STAGING', 'SUSPENDING', 'RESUMING', 'STOPPING'):
+                pending += 1
+
+        if self.mode == 'stop':
+            ready = self._expire(label, ready)
+
+        with self._lock:
+            self._ready[label] = deque(ready)
+        metrics.set_gauge(f'gce_warm_pool_ready{{label="{label}"}}', len(ready))
+
+        # Stopped pools are fed by completed runners only
+        if self.mode == 'stop':
+            return
+
+        missing = self.sizes[label] - len(ready) - pending
+        for _ in range(max(missing, 0)):
+            instance_name = self.gcloud_client.create_pool_instance(label)
+            if not instance_name:
+                break
+            logger.info("Creating warm pool instance %s for label %s", instance_name, label)
+
+    def _expire(self, label, ready):
+        """Delete stopped instances that are too old or exceed the pool size, newest are kept."""
+        keep = []
+        for instance in sorted(ready, key=instance_age):
+            if instance_age(instance) > self.max_age or len(keep) >= self.sizes[label]:
+                logger.info("Deleting instance %s from the warm pool of label %s", instance.name, label)
+                self.gcloud_client.delete_runner_instance(instance.name)
+            else:
+                keep.append(instance)
+        return keep
+
+    def refill_all(self):
+        """Refill the pools of all labels."""
+        for label in self.sizes:
+            try:
+                self.refill(label)
+            except Exception as e:
+                logger.error("Failed to refill warm pool for label %s: %s", label, e)
+
+    def request_refill(self):
+        """Refill the pools now instead of waiting for the next interval."""
+        self._wake.set()
+
+    def start(self):
+        """Start refilling the pools in a background thread."""
+        if self._thread:
+            return
+
+        def run():
+            while not self._stopped.is_set():
+                self.refill_all()
+                self._wake.wait(self.interval)
+                self._wake.clear()
+
+        self._thread = threading.Thread(target=run, name='runner-pool', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background refill."""
+        self._stopped.set()
+        self._wake.set()
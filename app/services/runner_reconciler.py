@@ -0,0 +1,219 @@
+"""
+Periodic cleanup of runner instances without a working GitHub runner.
+"""
+import logging
+import os
+import threading
+import time
+import requests
+from app.services.runner_pool import instance_age
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class RunnerReconciler:
+    """
+    Delete runner instances that GitHub no longer uses.
+
+    When a completed webhook is lost or a deletion fails, the instance keeps
+    running until its maximum run duration. The reconciler lists the runner
+    instances and compares each one with the self-hosted runners of the owner
+    and repository it was created for. An instance is deleted once its runner
+    has been missing or offline for ``grace`` seconds, or online but idle for
+    ``idle_timeout`` seconds. Busy runners, unclaimed warm pool instances and
+    instances whose runners could not be listed are never deleted.
+    """
+
+    def __init__(self, gcloud_client, github_client_for, interval=300, grace=600, idle_timeout=1800):
+        """
+        Initialize RunnerReconciler.
+
+        Args:
+            gcloud_client (GCloudClient): The Compute Engine client.
+            github_client_for (callable): Returns the GitHubClient for an installation ID.
+            interval (int): Seconds between two reconciliations, also the runner list cache TTL.
+            grace (int): Seconds a runner may be missing or offline, e.g. while the instance boots.
+            idle_timeout (int): Seconds an online runner may wait for a job.
+        """
+        self.gcloud_client = gcloud_client
+        self.github_client_for = github_client_for
+        self.interval = interval
+        self.grace = grace
+        self.idle_timeout = idle_timeout
+        self._lock = threading.Lock()
+        self._owners = {}
+        self._runners = {}
+        self._suspects = {}
+        self._stopped = threading.Event()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, gcloud_client, github_client_for):
+        """
+        Create the reconciler configured by GCE_RECONCILE_INTERVAL.
+
+        Returns:
+            RunnerReconciler or None: The reconciler, or None if it is disabled.
+        """
+        interval = int(os.environ.get('GCE_RECONCILE_INTERVAL', 0))
+        if interval <= 0:
+            return None
+        return cls(
+            gcloud_client,
+            github_client_for,
+            interval=interval,
+            grace=int(os.environ.get('GCE_RECONCILE_GRACE', 600)),
+            idle_timeout=int(os.environ.get('GCE_RECONCILE_IDLE_TIMEOUT', 1800)),
+        )
+
+    def remember_scope(self, installation_id, org_name, repo_name):
+        """
+        Remember the installation of an owner and whether it is an organization.
+
+        Owners not seen since the start are looked up with the configured installation.
+
+        Args:
+            installation_id (int): The GitHub App installation ID, None for the configured one.
+            org_name (str): The organization login for organization runners.
+            repo_name (str): The repository full name for repository runners.
+        """
+        owner = (org_name or repo_name.split('/')[0]).lower()
+        with self._lock:
+            self._owners[owner] = (installation_id, bool(org_name))
+
+    def _list_runners(self, installation_id, org_name, repo_name, now):
+        """Return the runners of an organization or repository by name, cached for one interval."""
+        key = (org_name, repo_name)
+        cached = self._runners.get(key)
+        if cached and now - cached[0] < self.interval:
+            return cached[1]
+        runners = self.github_client_for(installation_id).list_runners(org_name=org_name, repo_name=repo_name)
+        runners = {runner['name']: runner for runner in runners}
+        self._runners[key] = (now, runners)
+        return runners
+
+    def _runners_of(self, scope, now):
+        """
+        Return the runners an instance of a scope can be registered as.
+
+        Runners of an organization's repositories are organization runners, those
+        of a personal account are repository runners. For an owner that did not
+        queue a job since the start, the organization is tried first.
+
+        Args:
+            scope (tuple): Lowercase (owner, repo) of the instance.
+            now (float): Monotonic time of the reconciliation.
+
+        Returns:
+            dict: Runner name to runner.
+        """
+        owner, repo = scope
+        with self._lock:
+            installation_id, is_org = self._owners.get(owner, (None, None))
+        if is_org is not False:
+            try:
+                return self._list_runners(installation_id, owner, None, now)
+            except requests.exceptions.HTTPError as e:
+                if is_org or e.response is None or e.response.status_code != 404:
+                    raise
+            # Not an organization, its runners are registered at the repository
+            with self._lock:
+                self._owners.setdefault(owner, (installation_id, False))
+        return self._list_runners(installation_id, None, f'{owner}/{repo}', now)
+
+    def reconcile(self):
+        """
+        Compare the runner instances with GitHub and delete orphaned instances.
+
+        Instances without owner and repository, or whose runners could not be
+        listed, are skipped, since a missing listing would make their runners look gone.
+
+        Returns:
+            list: The names of the deleted instances.
+        """
+        now = time.monotonic()
+        listings = {}
+        deleted = []
+        seen = set()
+        for instance in self.gcloud_client.iter_runner_instances():
+            if self.gcloud_client.is_pool_instance(instance) and not self.gcloud_client.is_pool_instance_claimed(instance):
+                continue
+            seen.add(instance.name)
+            scope = self.gcloud_client.runner_scope(instance)
+            if scope is None:
+                continue
+            if scope not in listings:
+                try:
+                    listings[scope] = self._runners_of(scope, now)
+                except Exception as e:
+                    logger.warning("Failed to list GitHub runners of %s, skipping its instances: %s", '/'.join(scope), e)
+                    listings[scope] = None
+            runners = listings[scope]
+            if runners is None:
+                # Keep the suspect state, the listing may work in the next round
+                continue
+            reason = self._orphan_reason(instance, runners.get(instance.name), now)
+            if not reason:
+                continue
+            logger.warning("Deleting orphaned runner instance %s, runner is %s", instance.name, reason)
+            try:
+                self.gcloud_client.delete_runner_instance(instance.name)
+            except Exception as e:
+                logger.error("Failed to delete orphaned runner instance %s: %s", instance.name, e)
+                continue
+            metrics.inc(f'gce_orphans_deleted_total{{reason="{reason}"}}')
+            self._suspects.pop(instance.name, None)
+            deleted.append(instance.name)
+
+        # Forget instances that are gone
+        for name in set(self._suspects) - seen:
+            self._suspects.pop(name)
+        return deleted
+
+    def _orphan_reason(self, instance, runner, now):
+        """
+        Classify a runner instance.
+
+        Returns:
+            str or None: gone, offline or idle if the instance has to be deleted.
+        """
+        if runner is None:
+            state, limit = 'gone', self.grace
+        elif runner.get('busy'):
+            state, limit = None, None
+        elif runner.get('status') != 'online':
+            state, limit = 'offline', self.grace
+        else:
+            state, limit = 'idle', self.idle_timeout
+
+        if state is None:
+            self._suspects.pop(instance.name, None)
+            return None
+        # Track since when the instance is in this state, a new state restarts the clock
+        since_state, since = self._suspects.get(instance.name, (None, now))
+        if since_state != state:
+            since = now
+            self._suspects[instance.name] = (state, since)
+        if now - since >= limit and instance_age(instance) >= self.grace:
+            return state
+        return None
+
+    def start(self):
+        """Start reconciling in a background thread."""
+        if self._thread:
+            return
+
+        def run():
+            while not self._stopped.wait(self.interval):
+                try:
+                    self.reconcile()
+                except Exception as e:
+                    logger.error("Failed to reconcile runner instances: %s", e)
+
+        self._thread = threading.Thread(target=run, name='runner-reconciler', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stop the background reconciliation."""
+        self._stopped.set()
@@ -2,11 +2,26 @@
 Service for processing webhook events.
 """
 import logging
+import os
 import re
+import threading
+from collections import OrderedDict
+from google.api_core import exceptions as google_exceptions
 from app.clients import GitHubClient, GCloudClient
+from app.clients.gcloud_template_index import parse_label_rules, resolve_labels
+from app.services.admission_queue import AdmissionQueue, CapacityUnavailable, HeldQueueFull
+from app.services.runner_pool import RunnerPool
+from app.services.runner_reconciler import RunnerReconciler
+from app.utils import metrics
+from app.utils.retry import time_budget
 
 logger = logging.getLogger(__name__)
 
+# Provisions remembered for replacement runners, oldest are dropped first
+MAX_TRACKED_PROVISIONS = 1000
+# Job to runner instance assignments remembered for cancelled jobs, oldest are dropped first
+MAX_TRACKED_JOBS = 1000
+
 
 class WebhookService:
     """Service to process GitHub webhook payloads and trigger runner lifecycle actions."""
@@ -15,8 +30,43 @@ class WebhookService:
         """Initialize WebhookService with API clients."""
         self.github_client = GitHubClient()
         self.gcloud_client = GCloudClient()
+        # Total time retries of GitHub and Compute Engine calls may take per delivery.
+        # Stays below GitHub's 10 second webhook timeout so retries cannot pile up threads.
+        self.delivery_time_budget = float(os.environ.get('DELIVERY_TIME_BUDGET', 8))
+        # registration: VM runs ./config.sh with a registration token, jit: VM starts with a JIT config
+        self.provisioning_mode = os.environ.get('GITHUB_RUNNER_PROVISIONING_MODE', 'registration').strip().lower()
+        # Replacement runners to create when an accepted insert operation fails later (quota, stockout)
+        self.provision_max_retries = int(os.environ.get('GCE_PROVISION_MAX_RETRIES', 1))
+        # Re-runs of a job that failed because its Spot VM was preempted
+        self.spot_max_reruns = int(os.environ.get('GCE_SPOT_MAX_RERUNS', 1))
+        # Job labels combined with the base label into one template label, e.g. ARM64=arm
+        self.label_rules = parse_label_rules(os.environ.get('GCE_LABEL_RULES', ''))
+        self._provisions_lock = threading.Lock()
+        self._provisions = OrderedDict()
+        # Instance created for a job, and job an instance runs according to in_progress
+        self._jobs_lock = threading.Lock()
+        self._job_instances = OrderedDict()
+        self._instance_jobs = OrderedDict()
+        self.gcloud_client.on_provision_failure = self._on_provision_failure
+        # Pre-booted instances per label, configured by GCE_WARM_POOL
+        self.runner_pool = RunnerPool.from_env(self.gcloud_client)
+        # Jobs waiting for regional quota, enabled by GCE_QUOTA_ADMISSION
+        self.admission_queue = AdmissionQueue.from_env(self.gcloud_client.has_quota, self._provision_held_job)
+        # Deletes instances whose runner is gone, offline or idle, enabled by GCE_RECONCILE_INTERVAL
+        self.reconciler = RunnerReconciler.from_env(self.gcloud_client, self._github_client_for)
+
+    def start(self):
+        """Start the warm pool refills and the reconciliation of orphaned instances.
+
+        Only the process that provisions runners starts them, so a web app that
+        leaves provisioning to worker.py does not run them a second time.
+        """
+        if self.runner_pool:
+            self.runner_pool.start()
+        if self.reconciler:
+            self.reconciler.start()
 
-    def _validate_payload(self, payload):
+    def validate_payload(self, payload):
         """Validate webhook payload structure and content."""
         if not isinstance(payload, dict):
             raise ValueError("Payload must be a dictionary")
@@ -33,6 +83,10 @@ class WebhookService:
         if not isinstance(repository, dict):
             raise ValueError("Invalid repository field")
 
+        installation = payload.get('installation') or {}
+        if not isinstance(installation, dict):
+            raise ValueError("Invalid installation field")
+
         # Validate URL formats
         repo_url = repository.get('html_url', '')
         if repo_url and not re.match(r'^https://github\.com/[\w\-\.]+/[\w\-\.]+$', repo_url):
@@ -40,6 +94,18 @@ class WebhookService:
 
         return True
 
+    def _github_client_for(self, installation_id):
+        """Return a GitHub client acting as the installation that sent the webhook.
+
+        Tokens are cached per installation, so a client per delivery is cheap.
+
+        Returns:
+            GitHubClient: The client for installation_id, or the default client.
+        """
+        if not installation_id or str(installation_id) == str(self.github_client.installation_id):
+            return self.github_client
+        return GitHubClient(installation_id=installation_id)
+
     def handle_workflow_job(self, payload, delivery_id=None):
         """Process the workflow_job webhook payload from GitHub.
 
@@ -47,7 +113,7 @@ class WebhookService:
             dict: A result dict with 'action' and 'runner_name' keys.
         """
         # Validate payload structure
-        self._validate_payload(payload)
+        self.validate_payload(payload)
 
         # https://docs.github.com/en/webhooks/webhook-events-and-payloads#workflow_job
         action = payload.get('action')
@@ -57,6 +123,8 @@ class WebhookService:
         repo_name = payload.get('repository', {}).get('full_name')
         repo_owner_url = payload.get('repository', {}).get('owner', {}).get('html_url')
         org_name = payload.get('organization', {}).get('login')
+        # Set when the GitHub App is installed on several accounts, route to the sending one
+        installation_id = (payload.get('installation') or {}).get('id')
 
         # Sanitize log output - don't log full payload
         logger.info(
@@ -68,28 +136,8 @@ class WebhookService:
 
         # https://docs.github.com/en/webhooks/webhook-events-and-payloads?actionType=queued#workflow_job
         if action == 'queued':
-            template_name = None
-            if labels:
-                for label in labels:
-                    if label.startswith('gcp-') or label.lower() == 'dependabot':
-                        template_name = label
-                        break
-            if template_name:
-                logger.info(
-                    "Found matching label prefix: %s, delivery_id: %s",
-                    template_name,
-                    delivery_id,
-                )
-                instance_name = self._handle_queued_job(
-                    template_name,
-                    repo_url,
-                    repo_owner_url,
-                    repo_name,
-                    org_name,
-                    delivery_id=delivery_id,
-                )
-                return {'action': 'created', 'runner_name': instance_name}
-            else:
+            resolved = resolve_labels(labels, self.label_rules)
+            if not resolved:
                 logger.warning(
                     "No matching gcp- label prefix found for labels %s. "
                     "Ignoring job. delivery_id: %s",
@@ -98,15 +146,67 @@ class WebhookService:
                 )
                 return {'action': 'ignored', 'runner_name': None}
 
+            template_name, runner_labels = resolved
+            # Checked against the cached template index, before any GitHub call for a runner token
+            if not self.gcloud_client.template_exists(template_name):
+                logger.warning(
+                    "No instance template for label %s. Ignoring job. delivery_id: %s",
+                    template_name,
+                    delivery_id,
+                )
+                metrics.inc('webhook_jobs_rejected_total')
+                return {'action': 'ignored', 'runner_name': None}
+
+            logger.info(
+                "Found matching label prefix: %s, delivery_id: %s",
+                template_name,
+                delivery_id,
+            )
+            try:
+                with time_budget(self.delivery_time_budget):
+                    instance_name = self._handle_queued_job(
+                        template_name,
+                        repo_url,
+                        repo_owner_url,
+                        repo_name,
+                        org_name,
+                        delivery_id=delivery_id,
+                        installation_id=installation_id,
+                        job_id=workflow_job.get('id'),
+                        runner_labels=runner_labels,
+                    )
+            except CapacityUnavailable:
+                return {'action': 'held', 'runner_name': None}
+            except HeldQueueFull:
+                return {'action': 'held_queue_full', 'runner_name': None}
+            return {'action': 'created', 'runner_name': instance_name}
+
         # https://docs.github.com/en/webhooks/webhook-events-and-payloads?actionType=completed#workflow_job
         elif action == 'completed':
-            runner_name = self._handle_completed_job(
-                workflow_job, delivery_id=delivery_id
-            )
+            with time_budget(self.delivery_time_budget):
+                runner_name = self._handle_completed_job(
+                    workflow_job,
+                    delivery_id=delivery_id,
+                    repo_name=repo_name,
+                    installation_id=installation_id,
+                    org_name=org_name,
+                )
+            if self.admission_queue:
+                # The deleted runner may free quota for held jobs
+                self.admission_queue.wake()
             return {'action': 'deleted', 'runner_name': runner_name}
 
+        # https://docs.github.com/en/webhooks/webhook-events-and-payloads?actionType=in_progress#workflow_job
+        elif action == 'in_progress':
+            self._remember_assignment(workflow_job.get('id'), workflow_job.get('runner_name'))
+
         return {'action': 'ignored', 'runner_name': None}
 
+    def _runner_label(self, labels):
+        """Return the template label selected by the labels of a job, or None."""
+        resolved = resolve_labels(labels, self.label_rules)
+        return resolved[0] if resolved else None
+
     def _handle_queued_job(
         self,
         template_name,
@@ -115,34 +215,83 @@ class WebhookService:
         repo_name,
         org_name,
         delivery_id=None,
+        installation_id=None,
+        attempt=0,
+        job_id=None,
+        runner_labels=None,
     ):
         """Handle queued workflow job.
 
         Returns:
             str or None: The name of the created runner instance.
+
+        Raises:
+            CapacityUnavailable: If the job is held until the regional quota has room.
+            HeldQueueFull: If the job cannot be held and is dropped.
         """
         try:
-            # Get registration token
-            if org_name:
-                # Create GitHub Actions runner instance for organization
-                token = self.github_client.get_registration_token(
-                    org_name=org_name, delivery_id=delivery_id
-                )
-                return self.gcloud_client.create_runner_instance(
-                    token,
-                    repo_owner_url,
+            instance_name = self._provision_runner(
+                template_name, repo_url, repo_owner_url, repo_name, org_name, delivery_id, installation_id,
+                runner_labels=runner_labels,
+            )
+        except CapacityUnavailable:
+            job = {
+                'template_name': template_name,
+                'repo_url': repo_url,
+                'repo_owner_url': repo_owner_url,
+                'repo_name': repo_name,
+                'org_name': org_name,
+                'delivery_id': delivery_id,
+                'installation_id': installation_id,
+                'attempt': attempt,
+                'job_id': job_id,
+                'runner_labels': runner_labels,
+            }
+            if not self.admission_queue.hold(template_name, job):
+                logger.warning(
+                    "No quota for label %s and too many held jobs, dropping job, delivery_id: %s",
                     template_name,
-                    repo_name,
-                    delivery_id=delivery_id,
+                    delivery_id,
                 )
+                metrics.inc('gce_admission_dropped_total')
+                raise HeldQueueFull(template_name)
+            logger.warning("No quota for label %s, holding job, delivery_id: %s", template_name, delivery_id)
+            raise
+        if instance_name and self.reconciler:
+            self.reconciler.remember_scope(installation_id, org_name, repo_name)
+        if instance_name:
+            self._remember_provision(instance_name, {
+                'template_name': template_name,
+                'repo_url': repo_url,
+                'repo_owner_url': repo_owner_url,
+                'repo_name': repo_name,
+                'org_name': org_name,
+                'delivery_id': delivery_id,
+                'installation_id': installation_id,
+                'attempt': attempt,
+                'job_id': job_id,
+                'runner_labels': runner_labels,
+            })
+            self._remember_job_instance(job_id, instance_name)
+        return instance_name
+
+    def _provision_runner(
+        self, template_name, repo_url, repo_owner_url, repo_name, org_name, delivery_id, installation_id,
+        runner_labels=None,
+    ):
+        """Create the runner instance for a queued job.
+
+        Returns:
+            str or None: The name of the created runner instance.
+        """
+        github_client = self._github_client_for(installation_id)
+        try:
+            if org_name:
+                # Create GitHub Actions runner instance for organization
+                url = repo_owner_url
             elif repo_name:
                 # Create GitHub Actions runner instance for repository
-                token = self.github_client.get_registration_token(
-                    repo_name=repo_name, delivery_id=delivery_id
-                )
-                return self.gcloud_client.create_runner_instance(
-                    token, repo_url, template_name, repo_name, delivery_id=delivery_id
-                )
+                url = repo_url
             else:
                 logger.error(
                     "Neither repository nor organization found in payload. "
@@ -151,13 +300,332 @@ class WebhookService:
                 )
                 return None
 
+            if self.runner_pool and self.runner_pool.has(template_name):
+                instance_name = self._provision_from_pool(
+                    github_client, url, template_name, repo_name, org_name, delivery_id=delivery_id,
+                    runner_labels=runner_labels,
+                )
+                if instance_name:
+                    return instance_name
+
+            if self.admission_queue and not self.gcloud_client.reserve_quota(template_name):
+                raise CapacityUnavailable(template_name)
+
+            if self.provisioning_mode == 'jit':
+                return self._create_jit_runner(
+                    github_client, url, template_name, repo_name, org_name, delivery_id=delivery_id,
+                    runner_labels=runner_labels,
+                )
+
+            token = self._get_registration_token(github_client, repo_name, org_name, delivery_id)
+            return self.gcloud_client.create_runner_instance(
+                token, url, template_name, repo_name, delivery_id=delivery_id, runner_labels=runner_labels
+            )
+
+        except CapacityUnavailable:
+            raise
         except Exception as e:
             logger.error(
                 "Failed to spawn runner: %s, delivery_id: %s", str(e), delivery_id
             )
             raise
 
-    def _handle_completed_job(self, workflow_job, delivery_id=None):
+    def _provision_held_job(self, job):
+        """Create the runner of a job released by the admission queue."""
+        try:
+            self._handle_queued_job(**job)
+        except (CapacityUnavailable, HeldQueueFull):
+            # Held again, e.g. another job took the quota in the meantime, or dropped and logged
+            pass
+
+    def _get_registration_token(self, github_client, repo_name, org_name, delivery_id=None):
+        """Get a registration token for the organization or repository."""
+        if org_name:
+            return github_client.get_registration_token(
+                org_name=org_name, delivery_id=delivery_id
+            )
+        return github_client.get_registration_token(
+            repo_name=repo_name, delivery_id=delivery_id
+        )
+
+    def _provision_from_pool(
+        self, github_client, url, template_name, repo_name, org_name, delivery_id=None, runner_labels=None
+    ):
+        """Claim and start a pre-booted instance from the warm pool.
+
+        Returns:
+            str or None: The name of the started runner instance, None if the pool is empty.
+        """
+        try:
+            # Another manager may claim the same instance first, then try the next one
+            for _ in range(3):
+                instance = self.runner_pool.acquire(template_name)
+                if instance is None:
+                    return None
+
+                jit_config = None
+                token = None
+                if self.provisioning_mode == 'jit':
+                    jit_config = github_client.generate_jit_config(
+                        instance.name,
+                        runner_labels or [template_name],
+                        org_name=org_name,
+                        repo_name=None if org_name else repo_name,
+                        delivery_id=delivery_id,
+                    )
+                else:
+                    token = self._get_registration_token(github_client, repo_name, org_name, delivery_id)
+
+                try:
+                    self.gcloud_client.claim_pool_instance(
+                        instance,
+                        url,
+                        token,
+                        template_name,
+                        jit_config=jit_config,
+                        runner_labels=runner_labels,
+                        instance_label=repo_name,
+                    )
+                except google_exceptions.PreconditionFailed:
+                    logger.info(
+                        "Warm pool instance %s was claimed by another manager, delivery_id: %s",
+                        instance.name,
+                        delivery_id,
+                    )
+                    continue
+
+                try:
+                    self.runner_pool.wake(instance.name, delivery_id=delivery_id)
+                except Exception:
+                    # Do not leave a claimed instance behind that never runs a job
+                    self.gcloud_client.delete_runner_instance(instance.name, delivery_id=delivery_id)
+                    raise
+                logger.info(
+                    "Started warm pool instance %s for label %s, delivery_id: %s",
+                    instance.name,
+                    template_name,
+                    delivery_id,
+                )
+                return instance.name
+            return None
+        except Exception as e:
+            logger.warning(
+                "Failed to start warm pool instance, creating a new one: %s, delivery_id: %s",
+                e,
+                delivery_id,
+            )
+            return None
+        finally:
+            self.runner_pool.request_refill()
+
+    def _remember_provision(self, instance_name, provision):
+        """Keep the arguments of a provision, so it can be repeated if the insert operation fails."""
+        with self._provisions_lock:
+            self._provisions[instance_name] = provision
+            while len(self._provisions) > MAX_TRACKED_PROVISIONS:
+                self._provisions.popitem(last=False)
+
+    def _remember_job_instance(self, job_id, instance_name):
+        """Remember the runner instance created for a queued job."""
+        if not job_id:
+            return
+        with self._jobs_lock:
+            self._job_instances[job_id] = instance_name
+            while len(self._job_instances) > MAX_TRACKED_JOBS:
+                self._job_instances.popitem(last=False)
+
+    def _remember_assignment(self, job_id, runner_name):
+        """Remember the job a runner instance picked up."""
+        if not job_id or not runner_name:
+            return
+        with self._jobs_lock:
+            self._instance_jobs[runner_name] = job_id
+            while len(self._instance_jobs) > MAX_TRACKED_JOBS:
+                self._instance_jobs.popitem(last=False)
+
+    def _forget_job(self, job_id, runner_name):
+        """Forget the instance and assignment of a job that ran."""
+        with self._jobs_lock:
+            self._job_instances.pop(job_id, None)
+            self._instance_jobs.pop(runner_name, None)
+
+    def _surplus_instance(self, job_id):
+        """Return the runner instance no longer needed after a job completed without runner.
+
+        Runners are not bound to the job they were created for. If the instance of
+        the job picked up another job, the instance created for that other job is
+        still waiting and is the surplus one.
+
+        Returns:
+            str or None: The name of the waiting instance, None if it is unknown.
+        """
+        if not job_id:
+            return None
+        with self._jobs_lock:
+            instance_name = self._job_instances.pop(job_id, None)
+            for _ in range(len(self._instance_jobs) + 1):
+                if instance_name is None:
+                    return None
+                other_job_id = self._instance_jobs.get(instance_name)
+                if other_job_id is None:
+                    return instance_name
+                instance_name = self._job_instances.pop(other_job_id, None)
+        return None
+
+    def _on_provision_failure(self, instance_names, error):
+        """Provision replacements for instances whose insert operation failed."""
+        for instance_name in instance_names:
+            with self._provisions_lock:
+                provision = self._provisions.pop(instance_name, None)
+            if provision is None:
+                continue
+
+            delivery_id = provision['delivery_id']
+            if provision['attempt'] >= self.provision_max_retries:
+                metrics.inc('gce_provision_retries_exhausted_total')
+                logger.error(
+                    "Creating runner %s failed, giving up after %d attempts: %s, delivery_id: %s",
+                    instance_name,
+                    provision['attempt'] + 1,
+                    error,
+                    delivery_id,
+                )
+                continue
+
+            metrics.inc('gce_provision_retries_total')
+            logger.warning(
+                "Creating runner %s failed, provisioning a replacement: %s, delivery_id: %s",
+                instance_name,
+                error,
+                delivery_id,
+            )
+            try:
+                self._handle_queued_job(**dict(provision, attempt=provision['attempt'] + 1))
+            except Exception as e:
+                logger.error(
+                    "Failed to provision replacement for runner %s: %s, delivery_id: %s",
+                    instance_name,
+                    e,
+                    delivery_id,
+                )
+
+    def _create_jit_runner(
+        self, github_client, url, template_name, repo_name, org_name, delivery_id=None, runner_labels=None
+    ):
+        """Create a runner instance that starts with a just-in-time runner config.
+
+        Returns:
+            str or None: The name of the created runner instance.
+        """
+        # Check the template first, so no JIT runner is registered for a label without template
+        if not self.gcloud_client.template_exists(template_name):
+            logger.warning(
+                "No matching instance template found for label '%s'. "
+                "Skipping instance creation. delivery_id: %s",
+                template_name,
+                delivery_id,
+            )
+            return None
+
+        instance_name = self.gcloud_client.new_instance_name(template_name)
+        jit_config = github_client.generate_jit_config(
+            instance_name,
+            runner_labels or [template_name],
+            org_name=org_name,
+            repo_name=None if org_name else repo_name,
+            delivery_id=delivery_id,
+        )
+        return self.gcloud_client.create_runner_instance(
+            None,
+            url,
+            template_name,
+            repo_name,
+            delivery_id=delivery_id,
+            jit_config=jit_config,
+            instance_name=instance_name,
+            runner_labels=runner_labels,
+        )
+
+    def _record_preemption(self, runner_name, label, delivery_id=None):
+        """Pause Spot VMs for a label whose runner was preempted.
+
+        The job is re-run once its workflow run completed, see handle_workflow_run.
+        """
+        try:
+            if not self.gcloud_client.was_preempted(runner_name):
+                return
+        except Exception as e:
+            logger.error(
+                "Failed to check preemption of runner %s: %s, delivery_id: %s",
+                runner_name,
+                e,
+                delivery_id,
+            )
+            return
+        metrics.inc(f'gce_spot_preemptions_total{{label="{label}"}}')
+        # A preemption wave is likely to hit the re-run as well
+        self.gcloud_client.spot_unavailable(label, 'preempted')
+
+    def handle_workflow_run(self, payload, delivery_id=None):
+        """Re-run the jobs of a completed workflow run that failed on preempted Spot VMs.
+
+        GitHub only re-runs a job once its whole workflow run completed, so the re-run
+        waits for the workflow_run delivery instead of the job's completion.
+
+        Returns:
+            dict: A result dict with 'action' and 'runner_name' keys.
+        """
+        workflow_run = payload.get('workflow_run') if isinstance(payload, dict) else None
+        if not isinstance(workflow_run, dict) or not workflow_run.get('id'):
+            raise ValueError("Invalid workflow_run field")
+        if (
+            payload.get('action') != 'completed'
+            or workflow_run.get('conclusion') != 'failure'
+            or not self.gcloud_client.spot_labels
+        ):
+            return {'action': 'ignored', 'runner_name': None}
+
+        repo_name = (payload.get('repository') or {}).get('full_name')
+        run_id = workflow_run['id']
+        if workflow_run.get('run_attempt', 1) > self.spot_max_reruns:
+            logger.info("Run %s of %s reached the re-run limit, delivery_id: %s", run_id, repo_name, delivery_id)
+            return {'action': 'ignored', 'runner_name': None}
+
+        github_client = self._github_client_for((payload.get('installation') or {}).get('id'))
+        failed = [job for job in github_client.list_run_jobs(repo_name, run_id) if job.get('conclusion') == 'failure']
+        preempted = []
+        for job in failed:
+            runner_name = job.get('runner_name') or ''
+            label = self._runner_label(job.get('labels'))
+            if (
+                runner_name.startswith('gcp-runner-')
+                and label
+                and self.gcloud_client.is_spot_label(label)
+                and self.gcloud_client.was_preempted(runner_name)
+            ):
+                preempted.append(job)
+        if not preempted:
+            return {'action': 'ignored', 'runner_name': None}
+
+        if len(preempted) == len(failed):
+            github_client.rerun_failed_jobs(repo_name, run_id, delivery_id=delivery_id)
+        else:
+            # A run accepts a single job re-run only while it is completed, the first one starts it again
+            if len(preempted) > 1:
+                logger.warning(
+                    "Run %s of %s has %d preempted jobs besides other failures, re-running job %s only, "
+                    "delivery_id: %s",
+                    run_id,
+                    repo_name,
+                    len(preempted),
+                    preempted[0]['id'],
+                    delivery_id,
+                )
+            github_client.rerun_job(repo_name, preempted[0]['id'], delivery_id=delivery_id)
+        metrics.inc('gce_spot_reruns_total')
+        return {'action': 'rerun', 'runner_name': None}
+
+    def _handle_completed_job(self, workflow_job, delivery_id=None, repo_name=None, installation_id=None, org_name=None):
         """Handle completed workflow job.
 
         Returns:
@@ -170,17 +638,88 @@ class WebhookService:
             delivery_id,
         )
 
+        label = self._runner_label(workflow_job.get('labels'))
         if not runner_name:
-            logger.warning(
-                "Job completed but no runner_name found in payload. delivery_id: %s",
+            # Cancelled before a runner picked the job up, its instance would wait until max_run_duration
+            instance_name = self._surplus_instance(workflow_job.get('id'))
+            if not instance_name:
+                logger.warning(
+                    "Job completed but no runner_name found in payload. delivery_id: %s",
+                    delivery_id,
+                )
+                return None
+            if self._runner_is_busy(instance_name, org_name, repo_name, installation_id, delivery_id):
+                # Picked up a job whose in_progress delivery is not seen yet, its completion releases it
+                logger.info(
+                    "Job %s completed without runner, keeping busy runner %s, delivery_id: %s",
+                    workflow_job.get('id'),
+                    instance_name,
+                    delivery_id,
+                )
+                return None
+            logger.info(
+                "Job %s completed without runner, releasing its runner %s, delivery_id: %s",
+                workflow_job.get('id'),
+                instance_name,
                 delivery_id,
             )
-            return None
+            metrics.inc('gce_unassigned_runners_released_total')
+            with self._provisions_lock:
+                self._provisions.pop(instance_name, None)
+            return self._release_runner(instance_name, label, delivery_id)
 
         if not runner_name.startswith('gcp-runner-'):
             logger.warning("gcp-runner prefix not found in runner name %s. Ignoring job.", runner_name)
             return
 
+        with self._provisions_lock:
+            self._provisions.pop(runner_name, None)
+        self._forget_job(workflow_job.get('id'), runner_name)
+
+        if label and workflow_job.get('conclusion') == 'failure' and self.gcloud_client.is_spot_label(label):
+            self._record_preemption(runner_name, label, delivery_id)
+        return self._release_runner(runner_name, label, delivery_id)
+
+    def _runner_is_busy(self, runner_name, org_name, repo_name, installation_id, delivery_id=None):
+        """Check with GitHub whether a runner is running a job.
+
+        Returns:
+            bool: True if the runner is busy or its state is unknown, False if it
+            is idle or not registered yet.
+        """
+        try:
+            # One runner by name, not a listing of all runners per cancelled job
+            runners = self._github_client_for(installation_id).list_runners(
+                org_name=org_name, repo_name=repo_name, name=runner_name
+            )
+        except Exception as e:
+            logger.warning(
+                "Failed to check whether runner %s is busy, keeping it: %s, delivery_id: %s",
+                runner_name,
+                e,
+                delivery_id,
+            )
+            return True
+        return any(runner.get('name') == runner_name and runner.get('busy') for runner in runners)
+
+    def _release_runner(self, runner_name, label, delivery_id=None):
+        """Return a runner instance to the warm pool or delete it.
+
+        Returns:
+            str: The name of the runner instance.
+        """
+        if self.runner_pool and label:
+            try:
+                if self.runner_pool.recycle(runner_name, label, delivery_id=delivery_id):
+                    return runner_name
+            except Exception as e:
+                logger.warning(
+                    "Failed to return runner %s to the warm pool, deleting it: %s, delivery_id: %s",
+                    runner_name,
+                    e,
+                    delivery_id,
+                )
+
         try:
             self.gcloud_client.delete_runner_instance(
                 runner_name, delivery_id=delivery_id
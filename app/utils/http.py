@@ -0,0 +1,65 @@
+"""
+Shared, pooled HTTP session for GitHub API calls.
+"""
+import logging
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+GITHUB_API_URL = 'https://api.github.com'
+
+# Separate connect and read timeouts: a dead endpoint fails fast, a slow response still has time
+CONNECT_TIMEOUT = float(os.environ.get('GITHUB_CONNECT_TIMEOUT', 5))  # seconds
+READ_TIMEOUT = float(os.environ.get('GITHUB_READ_TIMEOUT', 30))  # seconds
+REQUEST_TIMEOUT = (CONNECT_TIMEOUT, READ_TIMEOUT)
+
+# Keep-alive connections per host, should match the gunicorn thread count (--threads 8)
+POOL_SIZE = int(os.environ.get('GITHUB_HTTP_POOL_SIZE', 8))
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_session = None
+
+
+def get_session():
+    """
+    Return the process-wide HTTP session.
+
+    The session keeps TCP+TLS connections to api.github.com alive, so consecutive
+    calls skip the handshake. requests.Session is safe to share between threads
+    for plain request/response calls.
+
+    Returns:
+        requests.Session: The shared session.
+    """
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=POOL_SIZE, pool_maxsize=POOL_SIZE)
+                session.mount('https://', adapter)
+                session.mount('http://', adapter)
+                _session = session
+    return _session
+
+
+def warm_up(url=GITHUB_API_URL):
+    """
+    Open a keep-alive connection to url so the first webhook does not pay for the handshake.
+
+    Args:
+        url (str): The URL to connect to.
+    """
+    try:
+        get_session().head(url, timeout=REQUEST_TIMEOUT)
+        logger.info("Pre-warmed HTTP connection to %s", url)
+    except Exception as e:
+        logger.warning("Failed to pre-warm HTTP connection to %s: %s", url, e)
+
+
+def warm_up_in_background(url=GITHUB_API_URL):
+    """Pre-warm the connection to url without blocking application startup."""
+    threading.Thread(target=warm_up, args=(url,), name='http-warm-up', daemon=True).start()
@@ -0,0 +1,51 @@
+"""
+In-process metrics registry for operational counters and gauges.
+"""
+import threading
+
+
+_lock = threading.Lock()
+_counters = {}
+_gauges = {}
+
+
+def inc(name, value=1):
+    """
+    Increment a counter.
+
+    Args:
+        name (str): The counter name.
+        value (int): The amount to add.
+    """
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + value
+
+
+def set_gauge(name, value):
+    """
+    Set a gauge to an absolute value.
+
+    Args:
+        name (str): The gauge name.
+        value (int or float): The current value.
+    """
+    with _lock:
+        _gauges[name] = value
+
+
+def snapshot():
+    """
+    Return a point-in-time copy of all metrics.
+
+    Returns:
+        dict: A dict with 'counters' and 'gauges' keys.
+    """
+    with _lock:
+        return {'counters': dict(_counters), 'gauges': dict(_gauges)}
+
+
+def reset():
+    """Remove all metrics (used by tests)."""
+    with _lock:
+        _counters.clear()
+        _gauges.clear()
@@ -0,0 +1,145 @@
+"""
+Retry policy with jittered exponential backoff and a per-delivery time budget.
+"""
+import contextlib
+import contextvars
+import logging
+import os
+import random
+import time
+import requests
+from google.api_core import exceptions as google_exceptions
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+# HTTP status codes that indicate a transient server-side problem
+RETRYABLE_STATUS_CODES = {500, 502, 503, 504}
+# Errors where the request was not processed by the server, safe to retry for any call
+SAFE_GOOGLE_ERRORS = (
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.TooManyRequests,
+)
+# Errors where the request may have been processed, only retried for idempotent calls
+TRANSIENT_GOOGLE_ERRORS = (
+    google_exceptions.InternalServerError,
+    google_exceptions.BadGateway,
+    google_exceptions.GatewayTimeout,
+    google_exceptions.DeadlineExceeded,
+)
+
+_deadline = contextvars.ContextVar('retry_deadline', default=None)
+
+
+@contextlib.contextmanager
+def time_budget(seconds):
+    """
+    Limit the total time retries may take within the block, e.g. for one webhook delivery.
+
+    Args:
+        seconds (float): The budget in seconds. None or 0 disables the budget.
+    """
+    token = _deadline.set(time.monotonic() + seconds if seconds else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+def remaining_budget():
+    """
+    Return the seconds left in the current time budget.
+
+    Returns:
+        float or None: Remaining seconds, or None if no budget is active.
+    """
+    deadline = _deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def is_retryable(error, idempotent=True):
+    """
+    Classify an error as transient.
+
+    Args:
+        error (Exception): The raised error.
+        idempotent (bool): Whether repeating the call cannot cause duplicate side effects.
+
+    Returns:
+        bool: True if the call should be retried.
+    """
+    if isinstance(error, requests.exceptions.ConnectTimeout):
+        return True
+    if isinstance(error, requests.exceptions.HTTPError) and error.response is not None:
+        status = error.response.status_code
+        return status == 429 or (idempotent and status in RETRYABLE_STATUS_CODES)
+    if isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout)):
+        return idempotent
+    if isinstance(error, SAFE_GOOGLE_ERRORS):
+        return True
+    if isinstance(error, TRANSIENT_GOOGLE_ERRORS):
+        return idempotent
+    return False
+
+
+class RetryPolicy:
+    """Retry transient errors with full-jitter exponential backoff, bounded by the current time budget."""
+
+    def __init__(self, name, max_attempts=None, base_delay=None, max_delay=None):
+        """
+        Initialize RetryPolicy.
+
+        Args:
+            name (str): Name used in log messages and metrics.
+            max_attempts (int): Total attempts including the first call.
+            base_delay (float): Backoff base in seconds.
+            max_delay (float): Max. backoff in seconds.
+        """
+        self.name = name
+        self.max_attempts = max_attempts or int(os.environ.get('RETRY_MAX_ATTEMPTS', 3))
+        self.base_delay = base_delay if base_delay is not None else float(os.environ.get('RETRY_BASE_DELAY', 0.5))
+        self.max_delay = max_delay if max_delay is not None else float(os.environ.get('RETRY_MAX_DELAY', 4))
+
+    def _backoff(self, attempt):
+        """Return the full-jitter delay before the given retry attempt (starting at 1)."""
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** (attempt - 1))))
+
+    def call(self, func, *args, idempotent=True, **kwargs):
+        """
+        Call func and retry it on transient errors.
+
+        Args:
+            func (callable): The function to call.
+            *args: Positional arguments for func.
+            idempotent (bool): Whether func may be repeated without duplicate side effects.
+            **kwargs: Keyword arguments for func.
+
+        Returns:
+            The return value of func.
+        """
+        attempt = 1
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                if attempt >= self.max_attempts or not is_retryable(e, idempotent):
+                    raise
+                delay = self._backoff(attempt)
+                remaining = remaining_budget()
+                if remaining is not None and delay >= remaining:
+                    logger.warning("%s: time budget exhausted, not retrying: %s", self.name, e)
+                    metrics.inc(f'retry_budget_exhausted_total{{operation="{self.name}"}}')
+                    raise
+                logger.warning(
+                    "%s failed (attempt %s/%s), retrying in %.2f seconds: %s",
+                    self.name,
+                    attempt,
+                    self.max_attempts,
+                    delay,
+                    e,
+                )
+                metrics.inc(f'retry_attempts_total{{operation="{self.name}"}}')
+                time.sleep(delay)
+                attempt += 1
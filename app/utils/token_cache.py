@@ -0,0 +1,176 @@
+"""
+Thread-safe cache for short-lived credentials.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from app.utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class TokenCache:
+    """
+    Process-wide cache for expiring tokens keyed by an arbitrary hashable key.
+
+    Entries are treated as expired ``refresh_margin`` seconds before their real
+    expiry. Concurrent misses for the same key are collapsed into a single
+    fetch (single-flight), so a burst of threads only mints one new token.
+
+    If ``renew_margin`` is set, a token entering that window is still returned,
+    but a replacement is fetched in a background thread so callers never wait.
+
+    If ``max_entries`` is set, the least recently used entry is evicted once
+    the cache grows beyond that many keys.
+    """
+
+    def __init__(self, name, refresh_margin=300, renew_margin=None, max_entries=None):
+        """
+        Initialize TokenCache.
+
+        Args:
+            name (str): Name used as metrics prefix and in log messages.
+            refresh_margin (int): Seconds before expiry at which a token is refreshed.
+            renew_margin (int): Seconds before expiry at which a token is renewed
+                in the background. Must be larger than refresh_margin.
+            max_entries (int): Maximum number of cached keys, unbounded if None.
+        """
+        self.name = name
+        self.refresh_margin = refresh_margin
+        self.renew_margin = renew_margin
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.renewals = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._key_locks = {}
+
+    def _fresh_entry(self, key):
+        """Return the cached (value, expires_at) for key if it is still usable, else None."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None:
+            return None
+        if entry[1] - self.refresh_margin <= time.time():
+            return None
+        return entry
+
+    def _store(self, key, fetch):
+        """Fetch a new token for key and store it."""
+        value, expires_at = fetch()
+        evicted = 0
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while self.max_entries and len(self._entries) > self.max_entries:
+                evicted_key, _ = self._entries.popitem(last=False)
+                self._key_locks.pop(evicted_key, None)
+                evicted += 1
+            self.evictions += evicted
+        if evicted:
+            metrics.inc(f"{self.name}_cache_evictions_total", evicted)
+        logger.debug("Cached %s token for %s until %s", self.name, key, expires_at)
+        return value
+
+    def _renew_in_background(self, key, fetch):
+        """Start a background renewal for key unless one is already running."""
+        lock = self._key_lock(key)
+        if not lock.acquire(blocking=False):
+            return
+
+        def renew():
+            try:
+                self._store(key, fetch)
+                with self._lock:
+                    self.renewals += 1
+                metrics.inc(f"{self.name}_cache_renewals_total")
+            except Exception as e:
+                logger.warning("Background renewal of %s token failed: %s", self.name, e)
+            finally:
+                lock.release()
+
+        threading.Thread(target=renew, name=f"{self.name}-renewal", daemon=True).start()
+
+    def _key_lock(self, key):
+        """Return the lock that serializes fetches for key."""
+        with self._lock:
+            lock = self._key_locks.get(key)
+            if lock is None:
+                lock = threading.Lock()
+                self._key_locks[key] = lock
+            return lock
+
+    def _record(self, hit):
+        """Update hit/miss counters."""
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+        metrics.inc(f"{self.name}_cache_{'hits' if hit else 'misses'}_total")
+
+    def get(self, key, fetch):
+        """
+        Return a cached token or fetch a new one.
+
+        Args:
+            key: Hashable cache key.
+            fetch (callable): Function without arguments returning a tuple of
+                (token, expires_at) where expires_at is a UNIX timestamp.
+
+        Returns:
+            The cached or freshly fetched token.
+        """
+        entry = self._fresh_entry(key)
+        if entry is not None:
+            self._record(hit=True)
+            value, expires_at = entry
+            if self.renew_margin and expires_at - self.renew_margin <= time.time():
+                self._renew_in_background(key, fetch)
+            return value
+
+        with self._key_lock(key):
+            # Another thread may have refreshed the token while we waited
+            entry = self._fresh_entry(key)
+            if entry is not None:
+                self._record(hit=True)
+                return entry[0]
+
+            self._record(hit=False)
+            return self._store(key, fetch)
+
+    def invalidate(self, key):
+        """Drop the cached token for key."""
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def clear(self):
+        """Drop all cached tokens and reset counters."""
+        with self._lock:
+            self._entries.clear()
+            self._key_locks.clear()
+            self.hits = 0
+            self.misses = 0
+            self.renewals = 0
+            self.evictions = 0
+
+    def stats(self):
+        """
+        Return cache statistics.
+
+        Returns:
+            dict: A dict with 'hits', 'misses', 'renewals', 'evictions' and 'size' keys.
+        """
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'renewals': self.renewals,
+                'evictions': self.evictions,
+                'size': len(self._entries),
+            }
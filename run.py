@@ -8,11 +8,21 @@ This script initializes the app and runs it, listening on the specified PORT.
 import os
 from dotenv import load_dotenv
 from app import create_app
+from app.routes.webhook import get_provisioning_workers, init_webhook_service_in_background
+from app.utils.http import warm_up_in_background
 
 load_dotenv()
 
 app = create_app()
 
+# Fail at startup on an invalid GITHUB_WEBHOOK_ASYNC configuration, not on the first webhook
+get_provisioning_workers(app)
+
+# Open the keep-alive connection to the GitHub API before the first webhook arrives
+warm_up_in_background()
+# Create the GitHub and Compute Engine clients once, off the webhook path
+init_webhook_service_in_background(app)
+
 if __name__ == "__main__":
     # Never run with debug=True in production
     app.run(
@@ -20,7 +20,7 @@ class TestIntegrationWorkflow:
         response = client.get('/setup/', headers=make_basic_auth_headers())
         assert response.status_code == 200
 
-    @patch('app.services.github_service.requests.post')
+    @patch('app.utils.http.requests.Session.post')
     @patch('app.services.config_service.ConfigService.store_github_app_id')
     @patch('app.services.config_service.ConfigService.store_github_private_key')
     @patch('app.services.config_service.ConfigService.store_github_webhook_secret')
@@ -9,6 +9,34 @@ def setup_test_env(monkeypatch):
     monkeypatch.setenv('GOOGLE_CLOUD_PROJECT', 'test-project')
 
 
+@pytest.fixture(autouse=True)
+def reset_process_caches():
+    """Reset process-wide caches and metrics so tests stay independent."""
+    from app.clients import github_client
+    from app.clients.github_rate_limit import rate_limiter
+    from app.clients.gcloud_template_index import template_index
+    from app.clients.gcloud_zones import zone_cooldown
+    from app.utils import metrics
+    github_client.installation_token_cache.clear()
+    github_client.jwt_cache.clear()
+    github_client.registration_token_cache.clear()
+    github_client.clear_private_key_cache()
+    github_client._runner_group_ids.clear()
+    rate_limiter.clear()
+    template_index.clear()
+    zone_cooldown.clear()
+    metrics.reset()
+    yield
+    github_client.installation_token_cache.clear()
+    github_client.jwt_cache.clear()
+    github_client.registration_token_cache.clear()
+    github_client.clear_private_key_cache()
+    rate_limiter.clear()
+    template_index.clear()
+    zone_cooldown.clear()
+    metrics.reset()
+
+
 @pytest.fixture
 def app():
     """Create and configure a test app instance."""
@@ -60,8 +88,8 @@ def mock_config_service():
 
 @pytest.fixture
 def mock_requests():
-    """Mock requests library."""
-    with patch('app.services.github_service.requests') as mock:
+    """Mock the shared HTTP session module."""
+    with patch('app.services.github_service.http') as mock:
         yield mock
 
 
@@ -0,0 +1,56 @@
+from unittest.mock import MagicMock, Mock
+from app.services.admission_queue import AdmissionQueue
+from app.utils import metrics
+
+
+class TestAdmissionQueue:
+    def test_from_env_disabled(self, monkeypatch):
+        """Test that no queue is created without GCE_QUOTA_ADMISSION."""
+        monkeypatch.delenv('GCE_QUOTA_ADMISSION', raising=False)
+        assert AdmissionQueue.from_env(Mock(), Mock()) is None
+
+    def test_drain_in_order_per_label(self):
+        """Test that jobs are released in order and a label without quota does not block other labels."""
+        capacity = {'gcp-small': 2, 'gcp-large': 0}
+
+        def has_capacity(label):
+            return capacity[label] > 0
+
+        provisioned = []
+
+        def provision(job):
+            capacity[job['label']] -= 1
+            provisioned.append(job['id'])
+
+        queue = AdmissionQueue(has_capacity, provision)
+        queue.start = MagicMock()
+        for index, label in enumerate(['gcp-large', 'gcp-small', 'gcp-small', 'gcp-small']):
+            assert queue.hold(label, {'label': label, 'id': index})
+
+        assert queue.drain() == 2
+        assert provisioned == [1, 2]
+        assert queue.size() == 2
+        assert metrics.snapshot()['gauges']['gce_admission_held'] == 2
+
+        capacity.update({'gcp-small': 1, 'gcp-large': 1})
+        assert queue.drain() == 2
+        assert provisioned == [1, 2, 0, 3]
+
+    def test_hold_full(self):
+        """Test that jobs beyond the maximum are not held."""
+        queue = AdmissionQueue(Mock(), Mock(), max_held=1)
+        queue.start = MagicMock()
+
+        assert queue.hold('gcp-a', {})
+        assert not queue.hold('gcp-a', {})
+
+    def test_provision_errors_are_logged(self):
+        """Test that a failing provision does not stop the drain."""
+        provision = Mock(side_effect=[Exception("Insert Error"), None])
+        queue = AdmissionQueue(Mock(return_value=True), provision)
+        queue.start = MagicMock()
+        queue.hold('gcp-a', {'delivery_id': 'held-001'})
+        queue.hold('gcp-a', {'delivery_id': 'held-002'})
+
+        assert queue.drain() == 2
+        assert provision.call_count == 2
@@ -0,0 +1,85 @@
+import pytest
+from unittest.mock import MagicMock
+from app.services.delivery_dedup import DeliveryDeduplicator, MemoryDedupStore, SQLiteDedupStore
+from app.utils import metrics
+
+PAYLOAD = {'action': 'queued', 'workflow_job': {'id': 42}}
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def store(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryDedupStore()
+    return SQLiteDedupStore(str(tmp_path / 'dedup.db'))
+
+
+class TestDedupStore:
+    def test_add(self, store):
+        """Test that a key is only added once."""
+        assert store.add('delivery:1', 60)
+        assert not store.add('delivery:1', 60)
+        assert store.add('delivery:2', 60)
+
+    def test_expired(self, store):
+        """Test that an expired key can be added again."""
+        assert store.add('delivery:1', 0)
+        assert store.add('delivery:1', 60)
+
+    def test_discard(self, store):
+        """Test that a discarded key can be added again."""
+        store.add('delivery:1', 60)
+        store.discard('delivery:1')
+        assert store.add('delivery:1', 60)
+
+    def test_memory_lru(self):
+        """Test that the oldest keys are dropped beyond max_entries."""
+        store = MemoryDedupStore(max_entries=2)
+        for key in ('a', 'b', 'c'):
+            store.add(key, 60)
+        assert store.add('a', 60)
+        assert not store.add('c', 60)
+
+
+class TestDeliveryDeduplicator:
+    def test_duplicate_delivery_id(self):
+        """Test that a redelivery with the same delivery ID is a duplicate."""
+        deduplicator = DeliveryDeduplicator(MemoryDedupStore())
+        assert deduplicator.claim(PAYLOAD, 'delivery-1')
+        assert not deduplicator.claim({'action': 'queued', 'workflow_job': {'id': 43}}, 'delivery-1')
+        assert metrics.snapshot()['counters']['webhook_duplicates_total{key="delivery"}'] == 1
+
+    def test_duplicate_job(self):
+        """Test that the same job action under a new delivery ID is a duplicate."""
+        deduplicator = DeliveryDeduplicator(MemoryDedupStore())
+        assert deduplicator.claim(PAYLOAD, 'delivery-1')
+        assert not deduplicator.claim(PAYLOAD, 'delivery-2')
+        assert deduplicator.claim(dict(PAYLOAD, action='completed'), 'delivery-3')
+        assert metrics.snapshot()['counters']['webhook_duplicates_total{key="job"}'] == 1
+
+    def test_release(self):
+        """Test that a released delivery is processed again."""
+        deduplicator = DeliveryDeduplicator(MemoryDedupStore())
+        deduplicator.claim(PAYLOAD, 'delivery-1')
+        deduplicator.release(PAYLOAD, 'delivery-1')
+        assert deduplicator.claim(PAYLOAD, 'delivery-1')
+
+    def test_store_error(self):
+        """Test that deliveries are processed if the store fails."""
+        store = MagicMock()
+        store.add.side_effect = Exception("Store down")
+        assert DeliveryDeduplicator(store).claim(PAYLOAD, 'delivery-1')
+
+    def test_from_env(self, monkeypatch, tmp_path):
+        """Test the configuration of TTL and store."""
+        monkeypatch.setenv('GITHUB_DEDUP_TTL', '0')
+        assert DeliveryDeduplicator.from_env() is None
+
+        monkeypatch.setenv('GITHUB_DEDUP_TTL', '120')
+        monkeypatch.setenv('GITHUB_DEDUP_STORE', f"sqlite:///{tmp_path / 'dedup.db'}")
+        deduplicator = DeliveryDeduplicator.from_env()
+        assert deduplicator.ttl == 120
+        assert isinstance(deduplicator.store, SQLiteDedupStore)
+
+        monkeypatch.setenv('GITHUB_DEDUP_STORE', 'redis://localhost')
+        with pytest.raises(ValueError):
+            DeliveryDeduplicator.from_env()
@@ -0,0 +1,77 @@
+import threading
+from unittest.mock import Mock
+import pytest
+from app.clients.gcloud_bulk_insert import InsertCoalescer
+from app.utils import metrics
+
+
+def submit_concurrently(coalescer, items, flush):
+    """Submit (key, name) items from parallel threads and return the results by name."""
+    results = {}
+
+    def run(key, name):
+        try:
+            results[name] = coalescer.submit(key, name, flush)
+        except Exception as e:
+            results[name] = e
+
+    threads = [threading.Thread(target=run, args=item) for item in items]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(5)
+    return results
+
+
+class TestInsertCoalescer:
+    def test_single_submit(self):
+        """Test that a lone creation is flushed after the window."""
+        coalescer = InsertCoalescer(window=0.01)
+        flush = Mock()
+
+        assert coalescer.submit('key', 'runner-1', flush) == 'runner-1'
+        flush.assert_called_once_with(['runner-1'])
+
+    def test_same_key_is_coalesced(self):
+        """Test that concurrent creations with the same key are flushed together."""
+        coalescer = InsertCoalescer(window=0.2)
+        flush = Mock()
+
+        results = submit_concurrently(coalescer, [('key', f'runner-{i}') for i in range(5)], flush)
+
+        assert results == {f'runner-{i}': f'runner-{i}' for i in range(5)}
+        flush.assert_called_once()
+        assert sorted(flush.call_args[0][0]) == [f'runner-{i}' for i in range(5)]
+        counters = metrics.snapshot()['counters']
+        assert counters['gce_bulk_insert_batches_total'] == 1
+        assert counters['gce_bulk_insert_instances_total'] == 5
+
+    def test_keys_are_flushed_separately(self):
+        """Test that creations with different keys are not mixed."""
+        coalescer = InsertCoalescer(window=0.2)
+        flush = Mock()
+
+        submit_concurrently(coalescer, [('a', 'runner-a1'), ('b', 'runner-b1'), ('a', 'runner-a2')], flush)
+
+        batches = sorted(sorted(call[0][0]) for call in flush.call_args_list)
+        assert batches == [['runner-a1', 'runner-a2'], ['runner-b1']]
+
+    def test_max_batch(self):
+        """Test that a full batch is closed and further creations open a new one."""
+        coalescer = InsertCoalescer(window=0.2, max_batch=2)
+        flush = Mock()
+
+        submit_concurrently(coalescer, [('key', f'runner-{i}') for i in range(4)], flush)
+
+        assert [len(call[0][0]) for call in flush.call_args_list] == [2, 2]
+
+    def test_flush_error_is_raised_to_all_callers(self):
+        """Test that every caller of a failed batch gets the exception."""
+        coalescer = InsertCoalescer(window=0.2)
+        flush = Mock(side_effect=Exception("Bulk Error"))
+
+        results = submit_concurrently(coalescer, [('key', 'runner-1'), ('key', 'runner-2')], flush)
+
+        assert all(isinstance(result, Exception) for result in results.values())
+        with pytest.raises(Exception, match="Bulk Error"):
+            coalescer.submit('key', 'runner-3', flush)
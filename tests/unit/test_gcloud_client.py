@@ -1,7 +1,12 @@
+import threading
 import pytest
 import logging
-from unittest.mock import patch, MagicMock
+from unittest.mock import patch, MagicMock, ANY
+from google.api_core import exceptions as google_exceptions
+import google.cloud.compute_v1 as compute_v1
 from app.clients.gcloud_client import GCloudClient
+from app.services.runner_reconciler import RunnerReconciler
+from app.utils import metrics
 
 
 @pytest.fixture
@@ -126,6 +131,488 @@ class TestGCloudClient:
         assert startup_script.startswith('cd /actions-runner && ')
         assert '--runnergroup platform-runners' in startup_script
 
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_with_jit_config(self, mock_compute, mock_env_vars):
+        """Test creating a runner instance that starts with a JIT config from the metadata."""
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        instance_name = client.create_runner_instance(
+            None,
+            'https://github.com/owner/repo',
+            'gcp-ubuntu-24.04',
+            jit_config='ENCODED_JIT_CONFIG',
+            instance_name='gcp-runner-0123456789abcdef',
+        )
+
+        assert instance_name == 'gcp-runner-0123456789abcdef'
+        items = {call.kwargs['key']: call.kwargs['value'] for call in mock_compute.Items.call_args_list}
+        assert items['github-jit-config'] == 'ENCODED_JIT_CONFIG'
+        startup_script = items['startup-script']
+        assert 'config.sh' not in startup_script
+        assert 'instance/attributes/github-jit-config' in startup_script
+        assert 'sudo -u runner ./run.sh --jitconfig "$JIT_CONFIG"' in startup_script
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instances_bulk_insert(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that concurrent creations with the same template are created with one bulk insert."""
+        monkeypatch.setenv('GCE_BULK_INSERT_WINDOW', '0.2')
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        client._get_template_name('gcp-ubuntu-24.04')
+        results = []
+
+        def create():
+            results.append(client.create_runner_instance(
+                'fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04', 'owner/repo'
+            ))
+
+        threads = [threading.Thread(target=create) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        assert len(set(results)) == 3
+        mock_instance_client.insert.assert_not_called()
+        mock_instance_client.bulk_insert.assert_called_once()
+        resource_kwargs = mock_compute.BulkInsertInstanceResource.call_args.kwargs
+        assert resource_kwargs['count'] == 3
+        assert resource_kwargs['min_count'] == 3
+        assert sorted(resource_kwargs['per_instance_properties']) == sorted(results)
+        startup_script = mock_compute.Items.call_args_list[0].kwargs['value']
+        assert "--name \"$(curl -sf -H 'Metadata-Flavor: Google' " in startup_script
+        assert "computeMetadata/v1/instance/name" in startup_script
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_bulk_insert_separates_labels_of_one_template(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that labels resolving to the same template are not batched, their startup scripts differ."""
+        monkeypatch.setenv('GCE_BULK_INSERT_WINDOW', '0.2')
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_compute.RegionInstanceTemplatesClient.return_value.list.return_value = [mock_template]
+
+        client = GCloudClient()
+        client._get_template_name('gcp-ubuntu-24.04')
+        threads = [
+            threading.Thread(target=client.create_runner_instance, args=(
+                'fake-token', 'https://github.com/owner/repo', label, 'owner/repo'
+            ))
+            for label in ('gcp-ubuntu-24.04', 'gcp-ubuntu-24-04')
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join(5)
+
+        mock_instance_client.bulk_insert.assert_not_called()
+        assert mock_instance_client.insert.call_count == 2
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_bulk_single(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that a batch with one instance uses a regular insert."""
+        monkeypatch.setenv('GCE_BULK_INSERT_WINDOW', '0.01')
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        instance_name = GCloudClient().create_runner_instance(
+            'fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04'
+        )
+
+        assert instance_name.startswith('gcp-runner-')
+        mock_instance_client.insert.assert_called_once()
+        mock_instance_client.bulk_insert.assert_not_called()
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_tracks_operation(self, mock_compute, mock_env_vars):
+        """Test that insert operations are tracked and failures go to on_provision_failure."""
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        client.operation_tracker = MagicMock()
+        client.on_provision_failure = MagicMock()
+        instance_name = client.create_runner_instance(
+            'fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04', delivery_id='op-001'
+        )
+        client.delete_runner_instance(instance_name, delivery_id='op-002')
+
+        insert_call, delete_call = client.operation_tracker.track.call_args_list
+        assert insert_call.args == (mock_instance_client.insert.return_value, 'insert', [instance_name])
+        assert insert_call.kwargs['delivery_id'] == 'op-001'
+        error = Exception("Insert Error")
+        insert_call.kwargs['on_failure']([instance_name], error)
+        client.on_provision_failure.assert_called_once_with([instance_name], error)
+        assert delete_call.args == (mock_instance_client.delete.return_value, 'delete', [instance_name])
+        assert delete_call.kwargs == {'on_failure': None, 'delivery_id': 'op-002'}
+
+    def test_operation_tracking_disabled(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth, monkeypatch):
+        """Test that GCE_OPERATION_TRACKER_WORKERS=0 disables operation tracking."""
+        monkeypatch.setenv('GCE_OPERATION_TRACKER_WORKERS', '0')
+        assert GCloudClient().operation_tracker is None
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_zone_fallback(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that an exhausted zone is cooled down and the next zone is used."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b,us-central1-c')
+        mock_instance_client = MagicMock()
+        mock_instance_client.insert.side_effect = [
+            google_exceptions.ServiceUnavailable("ZONE_RESOURCE_POOL_EXHAUSTED"),
+            MagicMock(),
+            MagicMock(),
+        ]
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        client.retry_policy.max_attempts = 1
+        first = client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+        second = client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+
+        zones = [call.kwargs['zone'] for call in mock_compute.InsertInstanceRequest.call_args_list]
+        # The exhausted zone is skipped for the second instance
+        assert zones == ['us-central1-a', 'us-central1-b', 'us-central1-b']
+
+        client.delete_runner_instance(first)
+        client.delete_runner_instance(second)
+        assert [call.kwargs['zone'] for call in mock_compute.DeleteInstanceRequest.call_args_list] == [
+            'us-central1-b', 'us-central1-b'
+        ]
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_all_zones_exhausted(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that the error of the last zone is raised if all zones are exhausted."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b')
+        mock_instance_client = MagicMock()
+        mock_instance_client.insert.side_effect = google_exceptions.Forbidden("QUOTA_EXCEEDED")
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        with pytest.raises(google_exceptions.Forbidden):
+            GCloudClient().create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+        assert mock_instance_client.insert.call_count == 2
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_failed_insert_operation_cools_down_zone(self, mock_compute, mock_env_vars, monkeypatch):
+        """Test that an exhaustion error of an insert operation cools down its zone."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b')
+        mock_compute.InstancesClient.return_value = MagicMock()
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        client.operation_tracker = MagicMock()
+        client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+        on_failure = client.operation_tracker.track.call_args.kwargs['on_failure']
+        on_failure(['gcp-runner-1'], Exception("ZONE_RESOURCE_POOL_EXHAUSTED"))
+        client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+
+        zones = [call.kwargs['zone'] for call in mock_compute.InsertInstanceRequest.call_args_list]
+        assert zones == ['us-central1-a', 'us-central1-b']
+
+    def test_create_spot_runner_instance_fallback(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth,
+                                                  monkeypatch):
+        """Test that Spot VMs keep the template scheduling and fall back to standard without Spot capacity."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b')
+        monkeypatch.setenv('GCE_SPOT_LABELS', 'gcp-ubuntu-24.04')
+        mock_instances, mock_templates = mock_compute_clients
+        mock_templates.return_value.list.return_value = [compute_v1.InstanceTemplate(
+            name='gcp-ubuntu-24-04-12345678901234',
+            properties=compute_v1.InstanceProperties(
+                scheduling=compute_v1.Scheduling(max_run_duration=compute_v1.Duration(seconds=100))
+            ),
+        )]
+        insert = mock_instances.return_value.insert
+        insert.side_effect = [
+            google_exceptions.ServiceUnavailable("ZONE_RESOURCE_POOL_EXHAUSTED"),
+            google_exceptions.ServiceUnavailable("ZONE_RESOURCE_POOL_EXHAUSTED"),
+            MagicMock(),
+            MagicMock(),
+        ]
+        client = GCloudClient()
+        client.retry_policy.max_attempts = 1
+
+        client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+
+        requests = [call.kwargs['request'] for call in insert.call_args_list]
+        assert requests[0].instance_resource.scheduling.provisioning_model == 'SPOT'
+        assert requests[0].instance_resource.scheduling.max_run_duration.seconds == 100
+        # Spot exhaustion does not cool down the zone for standard VMs
+        assert [request.zone for request in requests] == ['us-central1-a', 'us-central1-b', 'us-central1-a']
+        assert requests[2].instance_resource.scheduling.provisioning_model == ''
+        assert not client.use_spot('gcp-ubuntu-24.04')
+        assert metrics.snapshot()['counters']['gce_spot_fallbacks_total{label="gcp-ubuntu-24.04"}'] == 1
+
+        client.create_runner_instance('fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04')
+        assert insert.call_args.kwargs['request'].instance_resource.scheduling.provisioning_model == ''
+
+    def test_reserve_quota(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth, monkeypatch):
+        """Test that the quota demand of a label is computed from its template and machine type."""
+        monkeypatch.setenv('GCE_QUOTA_ADMISSION', 'true')
+        _, mock_templates = mock_compute_clients
+        mock_templates.return_value.list.return_value = [compute_v1.InstanceTemplate(
+            name='gcp-ubuntu-24-04-12345678901234',
+            properties=compute_v1.InstanceProperties(machine_type='e2-standard-4'),
+        )]
+        client = GCloudClient()
+        client.regions_client = MagicMock()
+        client.regions_client.get.return_value = compute_v1.Region(
+            quotas=[compute_v1.Quota(metric='CPUS', limit=10, usage=2)]
+        )
+        client.machine_types_client = MagicMock()
+        client.machine_types_client.get.return_value = compute_v1.MachineType(guest_cpus=4)
+
+        assert client.reserve_quota('gcp-ubuntu-24.04')
+        assert client.reserve_quota('gcp-ubuntu-24.04')
+        assert not client.has_quota('gcp-ubuntu-24.04')
+        assert not client.reserve_quota('gcp-ubuntu-24.04')
+        # Labels without template are left to the creation
+        assert client.has_quota('gcp-unknown')
+        client.machine_types_client.get.assert_called_once_with(
+            project='test-project', zone='us-central1-a', machine_type='e2-standard-4'
+        )
+
+    def test_quota_admission_disabled(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that every label has quota without quota admission."""
+        client = GCloudClient()
+        assert client.quota is None
+        assert client.reserve_quota('gcp-ubuntu-24.04')
+
+    def test_was_preempted(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that a preemption operation of the instance is detected."""
+        client = GCloudClient()
+        client.operations_client = MagicMock()
+        client.operations_client.aggregated_list.return_value = [
+            ('zones/us-central1-a', compute_v1.OperationsScopedList()),
+            ('zones/us-central1-b', compute_v1.OperationsScopedList(operations=[
+                compute_v1.Operation(target_link='https://compute.googleapis.com/.../instances/gcp-runner-1')
+            ])),
+        ]
+
+        # The instance was created in another zone than the first configured one
+        assert client.was_preempted('gcp-runner-1')
+        assert not client.was_preempted('gcp-runner-2')
+        request = client.operations_client.aggregated_list.call_args.kwargs['request']
+        assert request.filter == 'operationType = "compute.instances.preempted"'
+
+    def test_delete_unknown_instance_tries_all_zones(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth,
+                                                     monkeypatch):
+        """Test that an instance of unknown zone is looked for in all configured zones."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b')
+        mock_instances, _ = mock_compute_clients
+        mock_instances.return_value.delete.side_effect = [google_exceptions.NotFound("Not found"), MagicMock()]
+
+        GCloudClient().delete_runner_instance('gcp-runner-12345')
+
+        assert [call.kwargs['request'].zone for call in mock_instances.return_value.delete.call_args_list] == [
+            'us-central1-a', 'us-central1-b'
+        ]
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_pool_instance(self, mock_compute, mock_env_vars):
+        """Test that warm pool instances boot without runner configuration and report readiness."""
+        mock_instance_client = MagicMock()
+        mock_compute.InstancesClient.return_value = mock_instance_client
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+        mock_compute.Metadata.return_value.items = []
+
+        instance_name = GCloudClient().create_pool_instance('gcp-ubuntu-24.04')
+
+        assert instance_name.startswith('gcp-runner-')
+        mock_instance_client.insert.assert_called_once()
+        items = {call.kwargs['key']: call.kwargs['value'] for call in mock_compute.Items.call_args_list}
+        assert items['enable-guest-attributes'] == 'TRUE'
+        assert 'config.sh' not in items['startup-script']
+        assert 'guest-attributes/github-runner/state' in items['startup-script']
+        assert 'attributes/github-runner-script' in items['startup-script']
+        assert mock_compute.Instance.return_value.labels == {'gha-pool': 'gcp-ubuntu-24-04'}
+
+    def test_pool_instance_lifecycle(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test listing, readiness, claiming, suspending and resuming pool instances."""
+        mock_instances, _ = mock_compute_clients
+        client_api = mock_instances.return_value
+        instance = compute_v1.Instance(
+            name='gcp-runner-1',
+            status='SUSPENDED',
+            metadata=compute_v1.Metadata(
+                fingerprint='abc', items=[compute_v1.Items(key='startup-script', value='wait')]
+            ),
+        )
+        client_api.list.return_value = [instance]
+        client_api.get_guest_attributes.return_value = compute_v1.GuestAttributes(
+            query_value=compute_v1.GuestAttributesValue(items=[
+                compute_v1.GuestAttributesEntry(namespace='github-runner', key='state', value='ready')
+            ])
+        )
+
+        client = GCloudClient()
+        assert client.list_pool_instances('gcp-ubuntu-24.04') == [instance]
+        assert client_api.list.call_args.kwargs['request'].filter == 'labels.gha-pool = "gcp-ubuntu-24-04"'
+        assert not client.is_pool_instance_claimed(instance)
+        assert client.is_pool_instance_ready('gcp-runner-1')
+
+        assert client.runner_scope(instance) is None
+        client.claim_pool_instance(
+            instance, 'https://github.com/owner/repo', 'fake-token', 'gcp-ubuntu-24.04', instance_label='Owner/Repo'
+        )
+        metadata = client_api.set_metadata.call_args.kwargs['metadata_resource']
+        assert metadata.fingerprint == 'abc'
+        assert [item.key for item in metadata.items] == ['startup-script', 'github-runner-script', 'github-runner-scope']
+        assert '--name gcp-runner-1' in metadata.items[1].value
+        assert client.runner_scope(compute_v1.Instance(metadata=metadata)) == ('owner', 'repo')
+        assert client.runner_scope(
+            compute_v1.Instance(labels={'gha-owner': 'my-org', 'gha-repo': 'repo'})
+        ) == ('my-org', 'repo')
+
+        client.suspend_instance('gcp-runner-1')
+        client.resume_instance('gcp-runner-1')
+        assert client_api.suspend.call_args.kwargs['request'].instance == 'gcp-runner-1'
+        assert client_api.resume.call_args.kwargs['request'].request_id
+
+    def test_delete_runner_instance_queued(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth, monkeypatch):
+        """Test that deletions are only queued with the delete queue."""
+        monkeypatch.setenv('GCE_DELETE_QUEUE_WINDOW', '1')
+        mock_instances, _ = mock_compute_clients
+        client = GCloudClient()
+        assert client.delete_queue.window == 1
+        client.delete_queue = MagicMock()
+
+        client.delete_runner_instance('gcp-runner-1', delivery_id='queue-001')
+
+        client.delete_queue.submit.assert_called_once_with('gcp-runner-1', delivery_id='queue-001')
+        mock_instances.return_value.delete.assert_not_called()
+        assert client._start_delete('gcp-runner-1').name == mock_instances.return_value.delete.return_value.name
+
+    def test_iter_runner_instances(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth, monkeypatch):
+        """Test that runner instances of all zones are listed with a name filter."""
+        monkeypatch.setenv('GOOGLE_CLOUD_ZONES', 'us-central1-a,us-central1-b')
+        mock_instances, _ = mock_compute_clients
+        mock_instances.return_value.list.side_effect = [
+            [compute_v1.Instance(name='gcp-runner-1')], [compute_v1.Instance(name='gcp-runner-2')]
+        ]
+        client = GCloudClient()
+
+        assert [instance.name for instance in client.iter_runner_instances()] == ['gcp-runner-1', 'gcp-runner-2']
+        request = mock_instances.return_value.list.call_args.kwargs['request']
+        assert request.filter == 'name eq "gcp-runner-.*"'
+        assert client._zone_of('gcp-runner-2') == 'us-central1-b'
+
+    def test_recycle_pool_instance(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that a completed runner gets the pool metadata and label back and is stopped."""
+        mock_instances, _ = mock_compute_clients
+        client_api = mock_instances.return_value
+        instance = compute_v1.Instance(
+            name='gcp-runner-1',
+            metadata=compute_v1.Metadata(fingerprint='abc'),
+            labels={'env': 'ci', 'gha-owner': 'orga', 'gha-repo': 'repo1', 'gha-runner': 'gcp-ubuntu-24.04'},
+            label_fingerprint='def',
+        )
+
+        GCloudClient().recycle_pool_instance(instance, 'gcp-ubuntu-24.04', delivery_id='recycle-001')
+
+        metadata = client_api.set_metadata.call_args.kwargs['metadata_resource']
+        assert metadata.fingerprint == 'abc'
+        assert 'attributes/github-runner-script' in metadata.items[0].value
+        assert 'rm -rf /actions-runner/_work' in metadata.items[0].value
+        labels_request = client_api.set_labels.call_args.kwargs['instances_set_labels_request_resource']
+        assert labels_request.label_fingerprint == 'def'
+        assert dict(labels_request.labels) == {'env': 'ci', 'gha-pool': 'gcp-ubuntu-24-04'}
+        assert client_api.stop.call_args.kwargs['request'].instance == 'gcp-runner-1'
+
+    def test_recycled_instance_is_reconciled_in_new_scope(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that a recycled instance claimed by another repository is compared with that repository's runners."""
+        mock_instances, _ = mock_compute_clients
+        client_api = mock_instances.return_value
+        client = GCloudClient()
+        client.recycle_pool_instance(
+            compute_v1.Instance(
+                name='gcp-runner-1',
+                metadata=compute_v1.Metadata(fingerprint='abc'),
+                labels={'gha-owner': 'orga', 'gha-repo': 'repo1', 'gha-runner': 'gcp-ubuntu-24.04'},
+            ),
+            'gcp-ubuntu-24.04',
+        )
+        recycled = compute_v1.Instance(
+            name='gcp-runner-1',
+            labels=client_api.set_labels.call_args.kwargs['instances_set_labels_request_resource'].labels,
+            metadata=client_api.set_metadata.call_args.kwargs['metadata_resource'],
+        )
+        client.claim_pool_instance(
+            recycled, 'https://github.com/orgB', 'fake-token', 'gcp-ubuntu-24.04', instance_label='orgB/repo2'
+        )
+        claimed = compute_v1.Instance(
+            name='gcp-runner-1',
+            labels=recycled.labels,
+            metadata=client_api.set_metadata.call_args.kwargs['metadata_resource'],
+            creation_timestamp='2025-01-01T00:00:00+00:00',
+        )
+        assert client.runner_scope(claimed) == ('orgb', 'repo2')
+
+        client.iter_runner_instances = lambda: iter([claimed])
+        client.delete_runner_instance = MagicMock()
+        github_client = MagicMock()
+        github_client.list_runners.return_value = [{'name': 'gcp-runner-1', 'status': 'online', 'busy': True}]
+        reconciler = RunnerReconciler(client, MagicMock(return_value=github_client), grace=0, idle_timeout=0)
+
+        assert reconciler.reconcile() == []
+        github_client.list_runners.assert_called_once_with(org_name='orgb', repo_name=None)
+        client.delete_runner_instance.assert_not_called()
+
+    def test_is_pool_instance_ready_without_attributes(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that an instance without guest attributes is not ready."""
+        mock_instances, _ = mock_compute_clients
+        mock_instances.return_value.get_guest_attributes.side_effect = google_exceptions.NotFound("Not found")
+
+        assert not GCloudClient().is_pool_instance_ready('gcp-runner-1')
+
+    def test_new_instance_name(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test generating instance names."""
+        client = GCloudClient()
+        assert client.new_instance_name('gcp-ubuntu-24.04').startswith('gcp-runner-')
+        assert client.new_instance_name('dependabot').startswith('gcp-runner-dependabot-')
+        assert client.new_instance_name('gcp-ubuntu-24.04') != client.new_instance_name('gcp-ubuntu-24.04')
+
     @patch('app.clients.gcloud_client.compute_v1')
     def test_create_runner_instance_error(self, mock_compute, mock_env_vars):
         """Test error handling when creating instance fails."""
@@ -151,6 +638,36 @@ class TestGCloudClient:
                 'gcp-ubuntu-24.04'
             )
 
+    @patch('app.utils.retry.time.sleep')
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_retries_service_unavailable(self, mock_compute, mock_sleep, mock_env_vars):
+        """Test that a transient ServiceUnavailable is retried with the same request_id."""
+        mock_instance_client = MagicMock()
+        mock_operation = MagicMock()
+        mock_operation.name = 'operation-123'
+        mock_instance_client.insert.side_effect = [
+            google_exceptions.ServiceUnavailable("unavailable"),
+            mock_operation,
+        ]
+        mock_compute.InstancesClient.return_value = mock_instance_client
+
+        mock_templates_client = MagicMock()
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-12345678901234'
+        mock_templates_client.list.return_value = [mock_template]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        client = GCloudClient()
+        instance_name = client.create_runner_instance(
+            'fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04'
+        )
+
+        assert instance_name.startswith('gcp-runner-')
+        assert mock_instance_client.insert.call_count == 2
+        first, second = mock_instance_client.insert.call_args_list
+        assert first.kwargs['request'] is second.kwargs['request']
+        assert 'request_id' in mock_compute.InsertInstanceRequest.call_args.kwargs
+
     @patch('app.clients.gcloud_client.compute_v1')
     def test_delete_runner_instance(self, mock_compute, mock_env_vars):
         """Test deleting a runner instance."""
@@ -163,11 +680,24 @@ class TestGCloudClient:
         client = GCloudClient()
         client.delete_runner_instance('runner-12345')
 
-        mock_instance_client.delete.assert_called_once_with(
+        mock_compute.DeleteInstanceRequest.assert_called_once_with(
             project='test-project',
             zone='us-central1-a',
-            instance='runner-12345'
+            instance='runner-12345',
+            request_id=ANY,
         )
+        mock_instance_client.delete.assert_called_once_with(request=mock_compute.DeleteInstanceRequest.return_value)
+
+    def test_delete_runner_instance_request(self, mock_env_vars, mock_compute_clients, mock_gcloud_auth):
+        """Test that the delete request carries a request_id for idempotent retries."""
+        mock_instances, _ = mock_compute_clients
+
+        GCloudClient().delete_runner_instance('runner-12345')
+
+        request = mock_instances.return_value.delete.call_args.kwargs['request']
+        assert request.instance == 'runner-12345'
+        assert request.zone == 'us-central1-a'
+        assert request.request_id
 
     @patch('app.clients.gcloud_client.compute_v1')
     def test_delete_runner_instance_error(self, mock_compute, mock_env_vars):
@@ -198,6 +728,80 @@ class TestGCloudClient:
 
         assert result.name == 'gcp-target-template-123456789012345'
 
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_get_template_name_uses_index(self, mock_compute, mock_env_vars):
+        """Test that templates are listed once with a server-side filter and the newest one is used."""
+        mock_templates_client = MagicMock()
+        older = MagicMock()
+        older.name = 'gcp-ubuntu-24-04-20250101120000'
+        newer = MagicMock()
+        newer.name = 'gcp-ubuntu-24-04-20250201120000'
+        mock_templates_client.list.return_value = [newer, older]
+        mock_compute.RegionInstanceTemplatesClient.return_value = mock_templates_client
+
+        assert GCloudClient()._get_template_name('gcp-ubuntu-24.04') is newer
+        assert GCloudClient()._get_template_name('gcp-ubuntu-24.04') is newer
+
+        mock_templates_client.list.assert_called_once()
+        mock_compute.ListRegionInstanceTemplatesRequest.assert_called_once_with(
+            project='test-project',
+            region='us-central1',
+            filter='name eq "(gcp-|dependabot).*"',
+        )
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_create_runner_instance_with_runner_labels(self, mock_compute, mock_env_vars):
+        """Test that the runner registers with all labels of a combined label set."""
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-arm-12345678901234'
+        mock_compute.RegionInstanceTemplatesClient.return_value.list.return_value = [mock_template]
+
+        GCloudClient().create_runner_instance(
+            'fake-token', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04-arm',
+            runner_labels=['gcp-ubuntu-24.04', 'ARM64'],
+        )
+
+        startup_script = mock_compute.Items.call_args_list[0].kwargs['value']
+        assert '--labels gcp-ubuntu-24.04,ARM64 ' in startup_script
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_load_templates(self, mock_compute, mock_env_vars):
+        """Test that the template index is built ahead of the first lookup."""
+        mock_template = MagicMock()
+        mock_template.name = 'gcp-ubuntu-24-04-20250101120000'
+        mock_templates_client = mock_compute.RegionInstanceTemplatesClient.return_value
+        mock_templates_client.list.return_value = [mock_template]
+
+        client = GCloudClient()
+        assert client.load_templates() == {'gcp-ubuntu-24-04'}
+        assert client.template_exists('gcp-ubuntu-24.04')
+        mock_templates_client.list.assert_called_once()
+
+        mock_templates_client.list.side_effect = Exception("API Error")
+        assert GCloudClient().load_templates() == {'gcp-ubuntu-24-04'}
+
+    @patch('app.clients.gcloud_client.compute_v1')
+    def test_template_exists_finds_new_template(self, mock_compute, mock_env_vars):
+        """Test that a miss finds a new template, rebuilding the index at most once per interval."""
+        old_template = MagicMock()
+        old_template.name = 'gcp-ubuntu-24-04-20250101120000'
+        new_template = MagicMock()
+        new_template.name = 'gcp-new-20250101120000'
+        mock_templates_client = mock_compute.RegionInstanceTemplatesClient.return_value
+        mock_templates_client.list.return_value = [old_template]
+
+        client = GCloudClient()
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1000):
+            assert client.template_exists('gcp-ubuntu-24.04')
+            assert not client.template_exists('gcp-unknown')
+        assert mock_templates_client.list.call_count == 1
+
+        mock_templates_client.list.return_value = [old_template, new_template]
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1031):
+            assert client.template_exists('gcp-new')
+            assert not client.template_exists('gcp-unknown')
+        assert mock_templates_client.list.call_count == 2
+
     @patch('app.clients.gcloud_client.compute_v1')
     def test_get_template_name_not_found(self, mock_compute, mock_env_vars):
         """Test not finding a template."""
@@ -0,0 +1,71 @@
+import time
+from unittest.mock import Mock
+from google.api_core import exceptions as google_exceptions
+from app.clients.gcloud_delete_queue import DeleteQueue
+from app.utils import metrics
+
+
+def wait_until_empty(queue, timeout=2):
+    deadline = time.monotonic() + timeout
+    while queue.pending() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return not queue.pending()
+
+
+class TestDeleteQueue:
+    def test_coalesces_deletions(self):
+        """Test that deletions within the window are started in one batch and duplicates are dropped."""
+        start_delete = Mock()
+        queue = DeleteQueue(start_delete, window=0.1)
+
+        queue.submit('gcp-runner-1', delivery_id='delete-001')
+        queue.submit('gcp-runner-2', delivery_id='delete-002')
+        queue.submit('gcp-runner-1', delivery_id='delete-003')
+
+        assert wait_until_empty(queue)
+        queue.stop()
+        assert sorted(call.args for call in start_delete.call_args_list) == [
+            ('gcp-runner-1', 'delete-001'), ('gcp-runner-2', 'delete-002')
+        ]
+        counters = metrics.snapshot()['counters']
+        assert counters['gce_delete_queue_batches_total'] == 1
+        assert counters['gce_delete_queue_deleted_total'] == 2
+        assert metrics.snapshot()['gauges']['gce_delete_queue_pending'] == 0
+
+    def test_not_found_is_deleted(self):
+        """Test that an instance that no longer exists is not retried."""
+        start_delete = Mock(side_effect=google_exceptions.NotFound("Not found"))
+        queue = DeleteQueue(start_delete, window=0.01)
+
+        queue.submit('gcp-runner-1')
+
+        assert wait_until_empty(queue)
+        queue.stop()
+        start_delete.assert_called_once()
+        assert 'gce_delete_queue_retries_total' not in metrics.snapshot()['counters']
+
+    def test_retries_until_deleted(self):
+        """Test that failed calls and failed operations are retried with backoff."""
+        failed_operation = Mock()
+        failed_operation.result.side_effect = Exception("Operation Error")
+        start_delete = Mock(side_effect=[Exception("API Error"), failed_operation, Mock()])
+        queue = DeleteQueue(start_delete, window=0.01, base_delay=0.01, max_delay=0.02)
+
+        queue.submit('gcp-runner-1')
+
+        assert wait_until_empty(queue)
+        queue.stop()
+        assert start_delete.call_count == 3
+        assert metrics.snapshot()['counters']['gce_delete_queue_retries_total'] == 2
+
+    def test_backoff(self):
+        """Test that the retry delay doubles up to the maximum."""
+        queue = DeleteQueue(Mock(), base_delay=5, max_delay=12)
+        queue._pending['gcp-runner-1'] = entry = Mock(attempts=0, delivery_id=None)
+
+        due = []
+        for _ in range(3):
+            queue._retry('gcp-runner-1', entry, Exception("API Error"))
+            due.append(entry.due - time.monotonic())
+
+        assert [round(delay) for delay in due] == [5, 10, 12]
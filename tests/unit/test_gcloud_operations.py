@@ -0,0 +1,79 @@
+import concurrent.futures
+import threading
+from unittest.mock import MagicMock, Mock
+from app.clients.gcloud_operations import OperationTracker
+from app.utils import metrics
+
+
+def wait_for(tracker):
+    """Wait until all tracked operations are processed."""
+    tracker.shutdown(wait=True)
+
+
+class TestOperationTracker:
+    def test_successful_operation(self):
+        """Test that a finished operation is recorded without calling the failure handler."""
+        tracker = OperationTracker(max_workers=1)
+        operation = MagicMock()
+        on_failure = Mock()
+
+        assert tracker.track(operation, 'insert', ['runner-1'], on_failure=on_failure)
+        wait_for(tracker)
+
+        operation.result.assert_called_once_with(timeout=300)
+        on_failure.assert_not_called()
+        snapshot = metrics.snapshot()
+        assert snapshot['counters']['gce_operations_total{kind="insert",status="done"}'] == 1
+        assert snapshot['gauges']['gce_operations_pending'] == 0
+        assert 'gce_operation_last_duration_seconds{kind="insert"}' in snapshot['gauges']
+
+    def test_failed_operation_calls_handler(self):
+        """Test that a failed operation is handed to the failure handler."""
+        tracker = OperationTracker(max_workers=1)
+        operation = MagicMock()
+        error = Exception("ZONE_RESOURCE_POOL_EXHAUSTED")
+        operation.result.side_effect = error
+        on_failure = Mock()
+
+        tracker.track(operation, 'insert', ['runner-1', 'runner-2'], on_failure=on_failure)
+        wait_for(tracker)
+
+        on_failure.assert_called_once_with(['runner-1', 'runner-2'], error)
+        assert metrics.snapshot()['counters']['gce_operations_total{kind="insert",status="failed"}'] == 1
+
+    def test_failure_handler_error_is_logged(self):
+        """Test that an exception in the failure handler does not break the tracker."""
+        tracker = OperationTracker(max_workers=1)
+        operation = MagicMock()
+        operation.result.side_effect = Exception("Insert Error")
+
+        tracker.track(operation, 'insert', ['runner-1'], on_failure=Mock(side_effect=Exception("Handler Error")))
+        tracker.track(MagicMock(), 'delete', ['runner-2'])
+        wait_for(tracker)
+
+        assert metrics.snapshot()['counters']['gce_operations_total{kind="delete",status="done"}'] == 1
+
+    def test_timeout_does_not_call_handler(self):
+        """Test that an operation still running after the timeout is not treated as failed."""
+        tracker = OperationTracker(max_workers=1, timeout=1)
+        operation = MagicMock()
+        operation.result.side_effect = concurrent.futures.TimeoutError()
+        on_failure = Mock()
+
+        tracker.track(operation, 'insert', ['runner-1'], on_failure=on_failure)
+        wait_for(tracker)
+
+        on_failure.assert_not_called()
+        assert metrics.snapshot()['counters']['gce_operations_total{kind="insert",status="timeout"}'] == 1
+
+    def test_max_pending(self):
+        """Test that operations beyond max_pending are not tracked."""
+        tracker = OperationTracker(max_workers=1, max_pending=1)
+        release = threading.Event()
+        operation = MagicMock()
+        operation.result.side_effect = lambda timeout: release.wait(2)
+
+        assert tracker.track(operation, 'insert', ['runner-1'])
+        assert not tracker.track(MagicMock(), 'insert', ['runner-2'])
+        release.set()
+        wait_for(tracker)
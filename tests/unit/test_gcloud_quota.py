@@ -0,0 +1,70 @@
+from unittest.mock import Mock, patch
+import google.cloud.compute_v1 as compute_v1
+from app.clients.gcloud_quota import QuotaTracker, template_demand
+
+
+def make_region(**quotas):
+    return compute_v1.Region(quotas=[
+        compute_v1.Quota(metric=metric, limit=limit, usage=usage) for metric, (limit, usage) in quotas.items()
+    ])
+
+
+class TestTemplateDemand:
+    def test_template_demand(self):
+        """Test that vCPUs, boot disk and external IP of a template are counted."""
+        template = compute_v1.InstanceTemplate(properties=compute_v1.InstanceProperties(
+            machine_type='n2-standard-4',
+            disks=[compute_v1.AttachedDisk(initialize_params=compute_v1.AttachedDiskInitializeParams(
+                disk_type='pd-ssd', disk_size_gb=50
+            ))],
+            network_interfaces=[compute_v1.NetworkInterface(access_configs=[compute_v1.AccessConfig()])],
+        ))
+
+        assert template_demand(template, 4) == {
+            'CPUS': 4, 'N2_CPUS': 4, 'SSD_TOTAL_GB': 50, 'IN_USE_ADDRESSES': 1
+        }
+
+    def test_template_demand_hyperdisk_without_ip(self):
+        """Test that disk types without regional quota and internal-only instances are not counted."""
+        template = compute_v1.InstanceTemplate(properties=compute_v1.InstanceProperties(
+            machine_type='c4a-standard-2',
+            disks=[compute_v1.AttachedDisk(initialize_params=compute_v1.AttachedDiskInitializeParams(
+                disk_type='hyperdisk-balanced', disk_size_gb=50
+            ))],
+            network_interfaces=[compute_v1.NetworkInterface()],
+        ))
+
+        assert template_demand(template, 2) == {'CPUS': 2, 'C4A_CPUS': 2}
+
+
+class TestQuotaTracker:
+    def test_reserve_until_refresh(self):
+        """Test that reservations count against the quota until the next fetch."""
+        fetch = Mock(return_value=make_region(CPUS=(10, 2)))
+        tracker = QuotaTracker(fetch, ttl=60)
+
+        with patch('app.clients.gcloud_quota.time.monotonic', return_value=1000):
+            assert tracker.reserve({'CPUS': 4, 'N2_CPUS': 4})
+            assert tracker.reserve({'CPUS': 4})
+            assert not tracker.fits({'CPUS': 4})
+            assert not tracker.reserve({'CPUS': 4})
+        fetch.assert_called_once()
+
+        with patch('app.clients.gcloud_quota.time.monotonic', return_value=1060):
+            assert tracker.fits({'CPUS': 4})
+        assert fetch.call_count == 2
+
+    def test_failed_fetch_admits(self):
+        """Test that runners are admitted if the quotas were never fetched."""
+        tracker = QuotaTracker(Mock(side_effect=Exception("API Error")))
+        assert tracker.reserve({'CPUS': 4})
+
+    def test_failed_refresh_keeps_quotas(self):
+        """Test that a failing refresh keeps the last quotas."""
+        fetch = Mock(side_effect=[make_region(CPUS=(4, 4)), Exception("API Error")])
+        tracker = QuotaTracker(fetch, ttl=60)
+
+        with patch('app.clients.gcloud_quota.time.monotonic', return_value=1000):
+            assert not tracker.fits({'CPUS': 1})
+        with patch('app.clients.gcloud_quota.time.monotonic', return_value=2000):
+            assert not tracker.fits({'CPUS': 1})
@@ -0,0 +1,166 @@
+import threading
+import time
+from unittest.mock import MagicMock, Mock, patch
+import pytest
+from app.clients.gcloud_template_index import (
+    TemplateIndex, build_index, label_prefix, parse_label_rules, resolve_labels
+)
+from app.utils import metrics
+
+
+def make_template(name):
+    template = MagicMock()
+    template.name = name
+    return template
+
+
+class TestBuildIndex:
+    def test_newest_template_wins(self):
+        """Test that the template with the highest timestamp suffix is selected regardless of list order."""
+        templates = [
+            make_template('gcp-ubuntu-24-04-20250301120000'),
+            make_template('gcp-ubuntu-24-04-20250101120000'),
+            make_template('gcp-ubuntu-24-04-20250201120000'),
+            make_template('gcp-ubuntu-24-04-arm-20240101120000'),
+            make_template('not-a-runner-template'),
+        ]
+
+        for ordering in (templates, list(reversed(templates))):
+            index = build_index(ordering)
+            assert index['gcp-ubuntu-24-04'].name == 'gcp-ubuntu-24-04-20250301120000'
+            assert index['gcp-ubuntu-24-04-arm'].name == 'gcp-ubuntu-24-04-arm-20240101120000'
+            assert len(index) == 2
+
+    def test_tie_is_broken_by_name(self):
+        """Test that templates with the same timestamp are ordered deterministically."""
+        templates = [make_template('gcp-test-20250101120000b'), make_template('gcp-test-20250101120000a')]
+        assert build_index(templates)['gcp-test'].name == 'gcp-test-20250101120000b'
+        assert build_index(reversed(templates))['gcp-test'].name == 'gcp-test-20250101120000b'
+
+    def test_counter_suffix_is_not_compared(self):
+        """Test that the digits of a name_prefix counter do not outrank a newer timestamp."""
+        templates = [
+            make_template('gcp-test-20250101120000123400000001'),
+            make_template('gcp-test-2025060112000012340000000a'),
+        ]
+        assert build_index(templates)['gcp-test'].name == 'gcp-test-2025060112000012340000000a'
+
+    def test_label_prefix(self):
+        """Test that dots in labels are replaced with dashes."""
+        assert label_prefix('gcp-ubuntu-24.04') == 'gcp-ubuntu-24-04'
+
+
+class TestResolveLabels:
+    def test_parse_label_rules(self):
+        """Test that rules are parsed in order with lowercase labels."""
+        assert parse_label_rules('ARM64=arm, large=large,x64=,') == {'arm64': 'arm', 'large': 'large', 'x64': ''}
+        assert parse_label_rules('') == {}
+
+    def test_base_label(self):
+        """Test that the first gcp- or dependabot label is the template label."""
+        assert resolve_labels(['self-hosted', 'gcp-ubuntu-24.04', 'gcp-other']) == ('gcp-ubuntu-24.04', None)
+        assert resolve_labels(['Dependabot']) == ('Dependabot', None)
+
+    def test_no_base_label(self):
+        """Test that jobs without template label are rejected."""
+        assert resolve_labels(['ubuntu-latest', 'arm64'], parse_label_rules('arm64=arm')) is None
+        assert resolve_labels([]) is None
+
+    def test_combined_labels(self):
+        """Test that rule labels add their suffix in rule order, whatever the job's label order."""
+        rules = parse_label_rules('ARM64=arm,large=large,x64=')
+        assert resolve_labels(['large', 'gcp-ubuntu-24.04', 'arm64'], rules) == (
+            'gcp-ubuntu-24.04-arm-large', ['gcp-ubuntu-24.04', 'arm64', 'large']
+        )
+        assert resolve_labels(['gcp-ubuntu-24.04', 'X64'], rules) == ('gcp-ubuntu-24.04', ['gcp-ubuntu-24.04', 'X64'])
+
+
+class TestTemplateIndex:
+    def test_hit_does_not_list_again(self):
+        """Test that lookups within the TTL are served from the index."""
+        index = TemplateIndex(ttl=300)
+        fetch = Mock(return_value=[make_template('gcp-test-20250101120000')])
+
+        assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250101120000'
+        assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250101120000'
+
+        fetch.assert_called_once()
+        counters = metrics.snapshot()['counters']
+        assert counters['gce_template_index_refreshes_total'] == 1
+        assert counters['gce_template_index_hits_total'] == 2
+
+    def test_refresh_after_ttl(self):
+        """Test that the index is rebuilt once the TTL has passed."""
+        index = TemplateIndex(ttl=300)
+        fetch = Mock(side_effect=[
+            [make_template('gcp-test-20250101120000')],
+            [make_template('gcp-test-20250201120000')],
+        ])
+
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1000):
+            assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250101120000'
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1301):
+            assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250201120000'
+        assert fetch.call_count == 2
+
+    def test_miss_refreshes_at_most_once_per_interval(self):
+        """Test that unknown labels only rebuild an index older than the miss refresh interval."""
+        index = TemplateIndex(ttl=300, miss_refresh_interval=30)
+        fetch = Mock(side_effect=[
+            [make_template('gcp-test-20250101120000')],
+            [make_template('gcp-test-20250101120000'), make_template('gcp-new-20250101120000')],
+        ])
+
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1000):
+            index.get('key', 'gcp-test', fetch)
+            assert index.get('key', 'gcp-new', fetch) is None
+        assert fetch.call_count == 1
+
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1031):
+            assert index.get('key', 'gcp-new', fetch).name == 'gcp-new-20250101120000'
+        assert fetch.call_count == 2
+
+    def test_failed_refresh_keeps_index(self):
+        """Test that a failing list call keeps serving the last index."""
+        index = TemplateIndex(ttl=300)
+        fetch = Mock(side_effect=[[make_template('gcp-test-20250101120000')], Exception("API Error")])
+
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=1000):
+            index.get('key', 'gcp-test', fetch)
+        with patch('app.clients.gcloud_template_index.time.monotonic', return_value=2000):
+            assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250101120000'
+
+    def test_failed_first_refresh_raises(self):
+        """Test that a failing list call without cached index raises."""
+        index = TemplateIndex(ttl=300)
+        with pytest.raises(Exception, match="API Error"):
+            index.get('key', 'gcp-test', Mock(side_effect=Exception("API Error")))
+
+    def test_load(self):
+        """Test that load builds the index once per TTL."""
+        index = TemplateIndex(ttl=300)
+        fetch = Mock(return_value=[make_template('gcp-test-20250101120000')])
+
+        assert set(index.load('key', fetch)) == {'gcp-test'}
+        assert index.get('key', 'gcp-test', fetch).name == 'gcp-test-20250101120000'
+        index.load('key', fetch)
+
+        fetch.assert_called_once()
+
+    def test_single_flight(self):
+        """Test that concurrent cold lookups only list the templates once."""
+        index = TemplateIndex(ttl=300)
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            time.sleep(0.05)
+            return [make_template('gcp-test-20250101120000')]
+
+        threads = [threading.Thread(target=index.get, args=('key', 'gcp-test', fetch)) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        assert len(calls) == 1
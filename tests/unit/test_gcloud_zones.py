@@ -0,0 +1,54 @@
+from unittest.mock import patch
+from google.api_core import exceptions as google_exceptions
+from app.clients.gcloud_zones import ZoneCooldown, is_exhaustion_error, parse_zones
+from app.utils import metrics
+
+
+class TestZones:
+    def test_parse_zones(self):
+        """Test that zones keep their order and duplicates are dropped."""
+        assert parse_zones('us-central1-b, us-central1-a,us-central1-b', 'us-central1-c') == [
+            'us-central1-b', 'us-central1-a'
+        ]
+
+    def test_parse_zones_default(self):
+        """Test that the default zone is used without zone list."""
+        assert parse_zones(None, 'europe-west4-a') == ['europe-west4-a']
+        assert parse_zones(' , ', 'europe-west4-a') == ['europe-west4-a']
+
+    def test_parse_zones_other_region(self):
+        """Test that zones outside the region of the first zone are ignored."""
+        assert parse_zones('us-central1-a,europe-west4-a,us-central1-f', 'us-central1-a') == [
+            'us-central1-a', 'us-central1-f'
+        ]
+
+    def test_is_exhaustion_error(self):
+        """Test that resource and quota exhaustion are detected."""
+        assert is_exhaustion_error(Exception("ZONE_RESOURCE_POOL_EXHAUSTED_WITH_DETAILS: no e2 left"))
+        assert is_exhaustion_error(google_exceptions.Forbidden("QUOTA_EXCEEDED: Quota 'CPUS' exceeded"))
+        assert not is_exhaustion_error(google_exceptions.NotFound("Template not found"))
+
+
+class TestZoneCooldown:
+    def test_cooled_down_zone_is_skipped(self):
+        """Test that a zone is skipped until its cool-down ends."""
+        cooldown = ZoneCooldown(seconds=300)
+        zones = ['us-central1-a', 'us-central1-b', 'us-central1-c']
+
+        with patch('app.clients.gcloud_zones.time.monotonic', return_value=1000):
+            cooldown.cool_down('us-central1-a')
+            assert cooldown.available(zones) == ['us-central1-b', 'us-central1-c']
+        with patch('app.clients.gcloud_zones.time.monotonic', return_value=1301):
+            assert cooldown.available(zones) == zones
+        assert metrics.snapshot()['counters']['gce_zone_cooldowns_total{zone="us-central1-a"}'] == 1
+
+    def test_all_zones_cooled_down(self):
+        """Test that all zones are returned by earliest cool-down end if none is available."""
+        cooldown = ZoneCooldown(seconds=300)
+        zones = ['us-central1-a', 'us-central1-b']
+
+        with patch('app.clients.gcloud_zones.time.monotonic', return_value=1000):
+            cooldown.cool_down('us-central1-b')
+        with patch('app.clients.gcloud_zones.time.monotonic', return_value=1100):
+            cooldown.cool_down('us-central1-a')
+            assert cooldown.available(zones) == ['us-central1-b', 'us-central1-a']
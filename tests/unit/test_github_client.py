@@ -1,7 +1,20 @@
+import os
 import pytest
 import logging
+import time
+import jwt
+import requests
 from unittest.mock import patch, MagicMock
-from app.clients.github_client import GitHubClient
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+from app.clients.github_rate_limit import GitHubRateLimitError
+from app.clients.github_client import (
+    GitHubClient,
+    REGISTRATION_TOKEN_MIN_TTL,
+    installation_token_cache,
+    parse_expires_at,
+    registration_token_cache,
+)
 
 
 @pytest.fixture
@@ -14,6 +27,17 @@ def mock_env_vars(monkeypatch):
     monkeypatch.setenv('GITHUB_WEBHOOK_SECRET', 'test-secret')
 
 
+@pytest.fixture(scope='module')
+def rsa_private_key_pem():
+    """Generate a real RSA private key in PEM format."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+
+
 @pytest.fixture
 def mock_private_key_file(tmp_path):
     """Create a temporary private key file."""
@@ -68,10 +92,10 @@ class TestGitHubClient:
         assert key == "SECRET_KEY_FROM_ENV"
 
     @patch('app.clients.github_client.jwt.encode')
-    @patch.object(GitHubClient, '_get_private_key')
-    def test_generate_jwt(self, mock_get_key, mock_jwt_encode, mock_env_vars):
+    @patch.object(GitHubClient, '_load_private_key')
+    def test_generate_jwt(self, mock_load_key, mock_jwt_encode, mock_env_vars):
         """Test JWT generation."""
-        mock_get_key.return_value = "FAKE_KEY"
+        mock_load_key.return_value = ("FAKE_KEY", None)
         mock_jwt_encode.return_value = "FAKE_JWT_TOKEN"
 
         client = GitHubClient()
@@ -80,7 +104,35 @@ class TestGitHubClient:
         assert token == "FAKE_JWT_TOKEN"
         mock_jwt_encode.assert_called_once()
 
-    @patch('app.clients.github_client.requests.post')
+    @patch('app.clients.github_client.jwt.encode')
+    @patch.object(GitHubClient, '_load_private_key')
+    def test_generate_jwt_reused(self, mock_load_key, mock_jwt_encode, mock_env_vars):
+        """Test that the signed JWT is reused instead of signing on every call."""
+        mock_load_key.return_value = ("FAKE_KEY", None)
+        mock_jwt_encode.return_value = "FAKE_JWT_TOKEN"
+
+        assert GitHubClient()._generate_jwt() == "FAKE_JWT_TOKEN"
+        assert GitHubClient()._generate_jwt() == "FAKE_JWT_TOKEN"
+
+        mock_jwt_encode.assert_called_once()
+        mock_load_key.assert_called_once()
+
+    @patch('app.clients.github_client.jwt.encode')
+    @patch.object(GitHubClient, '_load_private_key')
+    def test_sign_jwt_payload(self, mock_load_key, mock_jwt_encode, mock_env_vars):
+        """Test the claims of a newly signed JWT."""
+        mock_load_key.return_value = ("FAKE_KEY", None)
+        mock_jwt_encode.return_value = "FAKE_JWT_TOKEN"
+
+        token, expires_at = GitHubClient()._sign_jwt()
+
+        payload = mock_jwt_encode.call_args[0][0]
+        assert token == "FAKE_JWT_TOKEN"
+        assert payload['iss'] == '12345'
+        assert payload['exp'] - payload['iat'] == 600
+        assert expires_at == payload['exp']
+
+    @patch('app.utils.http.requests.Session.post')
     @patch.object(GitHubClient, '_generate_jwt')
     def test_get_installation_access_token(self, mock_jwt, mock_post, mock_env_vars):
         """Test getting installation access token."""
@@ -95,7 +147,149 @@ class TestGitHubClient:
         assert token == 'INSTALL_TOKEN'
         mock_post.assert_called_once()
 
-    @patch('app.clients.github_client.requests.post')
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, '_generate_jwt')
+    def test_get_installation_access_token_cached(self, mock_jwt, mock_post, mock_env_vars):
+        """Test that installation access tokens are reused across clients until shortly before expiry."""
+        mock_jwt.return_value = "JWT_TOKEN"
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'token': 'INSTALL_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.return_value = mock_response
+
+        assert GitHubClient().get_installation_access_token() == 'INSTALL_TOKEN'
+        assert GitHubClient().get_installation_access_token() == 'INSTALL_TOKEN'
+
+        mock_post.assert_called_once()
+        stats = installation_token_cache.stats()
+        assert stats['hits'] == 1
+        assert stats['misses'] == 1
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, '_generate_jwt')
+    def test_get_installation_access_token_per_installation(self, mock_jwt, mock_post, mock_env_vars):
+        """Test that each installation gets and caches its own access token."""
+        mock_jwt.return_value = "JWT_TOKEN"
+        first = MagicMock()
+        first.json.return_value = {'token': 'TOKEN_A', 'expires_at': '2999-01-01T00:00:00Z'}
+        second = MagicMock()
+        second.json.return_value = {'token': 'TOKEN_B', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.side_effect = [first, second]
+
+        assert GitHubClient().get_installation_access_token() == 'TOKEN_A'
+        client = GitHubClient(installation_id=24680)
+        assert client.installation_id == '24680'
+        assert client.get_installation_access_token() == 'TOKEN_B'
+        assert GitHubClient(installation_id='24680').get_installation_access_token() == 'TOKEN_B'
+
+        assert mock_post.call_count == 2
+        assert mock_post.call_args[0][0] == 'https://api.github.com/app/installations/24680/access_tokens'
+        assert installation_token_cache.stats()['size'] == 2
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, '_generate_jwt')
+    def test_get_installation_access_token_refresh_before_expiry(self, mock_jwt, mock_post, mock_env_vars):
+        """Test that a token expiring within the refresh margin is replaced."""
+        mock_jwt.return_value = "JWT_TOKEN"
+        expiring = MagicMock()
+        expiring.json.return_value = {'token': 'OLD_TOKEN', 'expires_at': '2000-01-01T00:00:00Z'}
+        fresh = MagicMock()
+        fresh.json.return_value = {'token': 'NEW_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.side_effect = [expiring, fresh]
+
+        client = GitHubClient()
+        assert client.get_installation_access_token() == 'OLD_TOKEN'
+        assert client.get_installation_access_token() == 'NEW_TOKEN'
+        assert mock_post.call_count == 2
+
+    @patch('app.clients.github_rate_limit.time.sleep')
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_retries_after_rate_limit(self, mock_install_token, mock_post, mock_sleep,
+                                                             mock_env_vars):
+        """Test that a secondary rate limit is honored with Retry-After and retried once."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        limited = MagicMock()
+        limited.status_code = 403
+        limited.headers = {'Retry-After': '2'}
+        ok = MagicMock()
+        ok.status_code = 201
+        ok.headers = {'X-RateLimit-Remaining': '4999'}
+        ok.json.return_value = {'token': 'REG_TOKEN'}
+        mock_post.side_effect = [limited, ok]
+
+        token = GitHubClient().get_registration_token(repo_name='owner/repo')
+
+        assert token == 'REG_TOKEN'
+        assert mock_post.call_count == 2
+        mock_sleep.assert_called_once()
+        limited.raise_for_status.assert_not_called()
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_rate_limit_too_long(self, mock_install_token, mock_post, mock_env_vars):
+        """Test that a long Retry-After raises GitHubRateLimitError instead of blocking."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        limited = MagicMock()
+        limited.status_code = 429
+        limited.headers = {'Retry-After': '600'}
+        mock_post.return_value = limited
+
+        with pytest.raises(GitHubRateLimitError):
+            GitHubClient().get_registration_token(repo_name='owner/repo')
+        mock_post.assert_called_once()
+
+    @patch('app.utils.retry.time.sleep')
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_retries_server_error(self, mock_install_token, mock_post, mock_sleep,
+                                                         mock_env_vars):
+        """Test that a transient 502 from GitHub is retried."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        bad_gateway = MagicMock()
+        bad_gateway.status_code = 502
+        bad_gateway.headers = {}
+        bad_gateway.raise_for_status.side_effect = requests.exceptions.HTTPError("502", response=bad_gateway)
+        ok = MagicMock()
+        ok.status_code = 201
+        ok.headers = {}
+        ok.json.return_value = {'token': 'REG_TOKEN'}
+        mock_post.side_effect = [bad_gateway, ok]
+
+        assert GitHubClient().get_registration_token(org_name='my-org') == 'REG_TOKEN'
+        assert mock_post.call_count == 2
+        mock_sleep.assert_called_once()
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, '_generate_jwt', return_value='JWT')
+    def test_rejected_installation_token_is_renewed(self, mock_jwt, mock_post, mock_env_vars):
+        """Test that a 401 drops the cached installation token and retries once with a new one."""
+        def token_response(token):
+            response = MagicMock()
+            response.status_code = 201
+            response.headers = {}
+            response.json.return_value = {'token': token, 'expires_at': '2099-01-01T00:00:00Z'}
+            return response
+
+        unauthorized = MagicMock()
+        unauthorized.status_code = 401
+        unauthorized.headers = {}
+        unauthorized.raise_for_status.side_effect = requests.exceptions.HTTPError("401", response=unauthorized)
+        mock_post.side_effect = [
+            token_response('REVOKED'), unauthorized, token_response('NEW'), token_response('REG_TOKEN'),
+        ]
+
+        assert GitHubClient().get_registration_token(org_name='my-org') == 'REG_TOKEN'
+
+        authorizations = [call.kwargs['headers']['Authorization'] for call in mock_post.call_args_list]
+        assert authorizations == ['Bearer JWT', 'Bearer REVOKED', 'Bearer JWT', 'Bearer NEW']
+        assert GitHubClient().get_installation_access_token() == 'NEW'
+
+    def test_parse_expires_at(self):
+        """Test parsing GitHub expiry timestamps."""
+        assert parse_expires_at('2016-07-11T22:14:10Z') == 1468275250
+        assert parse_expires_at(None, default_ttl=60) > time.time()
+
+    @patch('app.utils.http.requests.Session.post')
     @patch.object(GitHubClient, 'get_installation_access_token')
     def test_get_registration_token_for_repo(self, mock_install_token, mock_post, mock_env_vars):
         """Test getting registration token for a repository."""
@@ -112,7 +306,7 @@ class TestGitHubClient:
         args, kwargs = mock_post.call_args
         assert 'repos/owner/repo' in args[0]
 
-    @patch('app.clients.github_client.requests.post')
+    @patch('app.utils.http.requests.Session.post')
     @patch.object(GitHubClient, 'get_installation_access_token')
     def test_get_registration_token_for_org(self, mock_install_token, mock_post, mock_env_vars):
         """Test getting registration token for an organization."""
@@ -128,6 +322,56 @@ class TestGitHubClient:
         args, kwargs = mock_post.call_args
         assert 'orgs/my-org' in args[0]
 
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_reused(self, mock_install_token, mock_post, mock_env_vars):
+        """Test that a still-valid registration token is reused per organization."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'token': 'ORG_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.return_value = mock_response
+
+        client = GitHubClient()
+        for _ in range(50):
+            assert client.get_registration_token(org_name='my-org') == 'ORG_TOKEN'
+
+        mock_post.assert_called_once()
+        mock_install_token.assert_called_once()
+        assert registration_token_cache.stats()['hits'] == 49
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_keyed_by_scope(self, mock_install_token, mock_post, mock_env_vars):
+        """Test that organizations and repositories get their own registration tokens."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        org_response = MagicMock()
+        org_response.json.return_value = {'token': 'ORG_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        repo_response = MagicMock()
+        repo_response.json.return_value = {'token': 'REPO_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.side_effect = [org_response, repo_response]
+
+        client = GitHubClient()
+        assert client.get_registration_token(org_name='my-org') == 'ORG_TOKEN'
+        assert client.get_registration_token(repo_name='my-org/repo') == 'REPO_TOKEN'
+        assert client.get_registration_token(org_name='my-org') == 'ORG_TOKEN'
+        assert mock_post.call_count == 2
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_registration_token_too_close_to_expiry(self, mock_install_token, mock_post, mock_env_vars):
+        """Test that a token without enough validity left for a booting VM is not handed out."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        almost_expired = time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(time.time() + REGISTRATION_TOKEN_MIN_TTL - 60))
+        old_response = MagicMock()
+        old_response.json.return_value = {'token': 'OLD_TOKEN', 'expires_at': almost_expired}
+        new_response = MagicMock()
+        new_response.json.return_value = {'token': 'NEW_TOKEN', 'expires_at': '2999-01-01T00:00:00Z'}
+        mock_post.side_effect = [old_response, new_response]
+
+        client = GitHubClient()
+        assert client.get_registration_token(repo_name='owner/repo') == 'OLD_TOKEN'
+        assert client.get_registration_token(repo_name='owner/repo') == 'NEW_TOKEN'
+
     @patch.object(GitHubClient, 'get_installation_access_token')
     def test_get_registration_token_no_params(self, mock_install_token, mock_env_vars):
         """Test that ValueError is raised when neither org nor repo is provided."""
@@ -155,10 +399,221 @@ class TestGitHubClient:
             client._generate_jwt()
 
 
+class TestGitHubClientJitConfig:
+    """Tests for just-in-time runner configurations."""
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_generate_jit_config_for_org(self, mock_install_token, mock_post, mock_env_vars):
+        """Test creating a JIT config for an organization runner in the default group."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'runner': {'id': 1}, 'encoded_jit_config': 'ENCODED'}
+        mock_post.return_value = mock_response
+
+        config = GitHubClient().generate_jit_config(
+            'gcp-runner-abc', ['gcp-ubuntu-24.04'], org_name='my-org', delivery_id='jit-001'
+        )
+
+        assert config == 'ENCODED'
+        args, kwargs = mock_post.call_args
+        assert args[0] == 'https://api.github.com/orgs/my-org/actions/runners/generate-jitconfig'
+        assert kwargs['json'] == {
+            'name': 'gcp-runner-abc',
+            'runner_group_id': 1,
+            'labels': ['gcp-ubuntu-24.04'],
+            'work_folder': '_work',
+        }
+
+    @patch('app.utils.http.requests.Session.get')
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_generate_jit_config_with_runner_group(self, mock_install_token, mock_post, mock_get,
+                                                   mock_env_vars, monkeypatch):
+        """Test that the runner group name is resolved to its ID once."""
+        monkeypatch.setenv('GITHUB_RUNNER_GROUP', 'platform-runners')
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        groups_response = MagicMock()
+        groups_response.links = {}
+        groups_response.json.return_value = {'runner_groups': [
+            {'id': 1, 'name': 'Default'},
+            {'id': 7, 'name': 'platform-runners'},
+        ]}
+        mock_get.return_value = groups_response
+        mock_response = MagicMock()
+        mock_response.json.return_value = {'encoded_jit_config': 'ENCODED'}
+        mock_post.return_value = mock_response
+
+        client = GitHubClient()
+        client.generate_jit_config('gcp-runner-1', ['gcp-ubuntu-24.04'], org_name='my-org')
+        client.generate_jit_config('gcp-runner-2', ['gcp-ubuntu-24.04'], org_name='my-org')
+
+        assert mock_post.call_args.kwargs['json']['runner_group_id'] == 7
+        mock_get.assert_called_once()
+
+    @patch('app.utils.http.requests.Session.get')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_get_runner_group_id_not_found(self, mock_install_token, mock_get, mock_env_vars):
+        """Test that an unknown runner group raises ValueError."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        groups_response = MagicMock()
+        groups_response.links = {}
+        groups_response.json.return_value = {'runner_groups': [{'id': 1, 'name': 'Default'}]}
+        mock_get.return_value = groups_response
+
+        with pytest.raises(ValueError, match="Runner group 'missing' not found"):
+            GitHubClient().get_runner_group_id('my-org', 'missing')
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_rerun_job(self, mock_install_token, mock_post, mock_env_vars):
+        """Test re-running a workflow job."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        mock_post.return_value = MagicMock()
+
+        GitHubClient().rerun_job('owner/repo', 555)
+
+        assert mock_post.call_args[0][0].endswith('/repos/owner/repo/actions/jobs/555/rerun')
+
+    @patch('app.utils.http.requests.Session.post')
+    @patch('app.utils.http.requests.Session.get')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_rerun_failed_jobs_of_run(self, mock_install_token, mock_get, mock_post, mock_env_vars):
+        """Test listing the jobs of a workflow run and re-running its failed jobs."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        jobs_page = MagicMock()
+        jobs_page.links = {}
+        jobs_page.json.return_value = {'jobs': [{'id': 555, 'conclusion': 'failure', 'runner_name': 'gcp-runner-1'}]}
+        mock_get.return_value = jobs_page
+
+        client = GitHubClient()
+        assert [job['id'] for job in client.list_run_jobs('owner/repo', 42)] == [555]
+        client.rerun_failed_jobs('owner/repo', 42)
+
+        assert '/repos/owner/repo/actions/runs/42/jobs?filter=latest' in mock_get.call_args[0][0]
+        assert mock_post.call_args[0][0].endswith('/repos/owner/repo/actions/runs/42/rerun-failed-jobs')
+
+    @patch('app.clients.github_client.rate_limiter.before_request')
+    @patch('app.utils.http.requests.Session.get')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_list_runners_paginated(self, mock_install_token, mock_get, mock_before_request, mock_env_vars):
+        """Test that all runner pages are listed as non-urgent calls."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        first_page = MagicMock()
+        first_page.links = {'next': {'url': 'https://api.github.com/orgs/my-org/actions/runners?page=2'}}
+        first_page.json.return_value = {'runners': [{'name': 'gcp-runner-1', 'status': 'online', 'busy': True}]}
+        second_page = MagicMock()
+        second_page.links = {}
+        second_page.json.return_value = {'runners': [{'name': 'gcp-runner-2', 'status': 'offline', 'busy': False}]}
+        mock_get.side_effect = [first_page, second_page]
+
+        runners = GitHubClient().list_runners(org_name='my-org')
+
+        assert [runner['name'] for runner in runners] == ['gcp-runner-1', 'gcp-runner-2']
+        assert 'orgs/my-org/actions/runners?per_page=100' in mock_get.call_args_list[0][0][0]
+        assert all(not call.kwargs['urgent'] for call in mock_before_request.call_args_list)
+
+    @patch('app.utils.http.requests.Session.get')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_list_runners_by_name(self, mock_install_token, mock_get, mock_env_vars):
+        """Test that a single runner is looked up with the name filter."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        mock_get.return_value.links = {}
+        mock_get.return_value.json.return_value = {'runners': [{'name': 'gcp-runner-1', 'busy': True}]}
+
+        GitHubClient().list_runners(repo_name='owner/repo', name='gcp-runner-1')
+
+        assert mock_get.call_args[0][0].endswith('repos/owner/repo/actions/runners?per_page=100&name=gcp-runner-1')
+
+    @patch('app.utils.retry.time.sleep')
+    @patch('app.utils.http.requests.Session.post')
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_generate_jit_config_for_repo_not_retried(self, mock_install_token, mock_post, mock_sleep,
+                                                      mock_env_vars):
+        """Test that a repository JIT config is not retried after an ambiguous 502."""
+        mock_install_token.return_value = "INSTALL_TOKEN"
+        bad_gateway = MagicMock()
+        bad_gateway.status_code = 502
+        bad_gateway.headers = {}
+        bad_gateway.raise_for_status.side_effect = requests.exceptions.HTTPError("502", response=bad_gateway)
+        mock_post.return_value = bad_gateway
+
+        with pytest.raises(requests.exceptions.HTTPError):
+            GitHubClient().generate_jit_config('gcp-runner-abc', ['gcp-ubuntu-24.04'], repo_name='owner/repo')
+
+        assert 'repos/owner/repo/actions/runners/generate-jitconfig' in mock_post.call_args[0][0]
+        mock_post.assert_called_once()
+
+    @patch.object(GitHubClient, 'get_installation_access_token')
+    def test_generate_jit_config_no_params(self, mock_install_token, mock_env_vars):
+        """Test that ValueError is raised when neither org nor repo is provided."""
+        with pytest.raises(ValueError, match="Either org_name or repo_name must be provided"):
+            GitHubClient().generate_jit_config('gcp-runner-abc', ['gcp-ubuntu-24.04'])
+
+
+class TestGitHubClientPrivateKey:
+    """Tests for loading and caching the deserialized private key."""
+
+    def test_load_private_key_from_env_once(self, monkeypatch, rsa_private_key_pem):
+        """Test that the PEM from the environment is parsed only once."""
+        monkeypatch.setenv('GITHUB_APP_ID', '12345')
+        monkeypatch.setenv('GITHUB_PRIVATE_KEY', rsa_private_key_pem)
+
+        with patch('app.clients.github_client.serialization.load_pem_private_key',
+                   wraps=serialization.load_pem_private_key) as mock_load:
+            key1, version1 = GitHubClient()._load_private_key()
+            key2, version2 = GitHubClient()._load_private_key()
+
+        assert isinstance(key1, rsa.RSAPrivateKey)
+        assert key1 is key2
+        assert version1 == version2
+        mock_load.assert_called_once()
+
+    def test_load_private_key_from_file_reloads_on_change(self, monkeypatch, tmp_path, rsa_private_key_pem):
+        """Test that the key file is read only once and reloaded when its mtime changes."""
+        key_file = tmp_path / "key.pem"
+        key_file.write_text(rsa_private_key_pem)
+        monkeypatch.delenv('GITHUB_PRIVATE_KEY', raising=False)
+        monkeypatch.setenv('GITHUB_PRIVATE_KEY_PATH', str(key_file))
+
+        client = GitHubClient()
+        with patch.object(GitHubClient, '_get_private_key', wraps=client._get_private_key) as mock_get:
+            key1, _ = client._load_private_key()
+            key2, _ = client._load_private_key()
+            assert mock_get.call_count == 1
+            assert key1 is key2
+
+            stat = os.stat(key_file)
+            os.utime(key_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+            key3, _ = client._load_private_key()
+            assert mock_get.call_count == 2
+            assert key3 is not key1
+
+    def test_jwt_renewed_after_key_rotation(self, monkeypatch, rsa_private_key_pem):
+        """Test that a rotated key produces a new JWT signed with the new key."""
+        monkeypatch.setenv('GITHUB_APP_ID', '12345')
+        monkeypatch.setenv('GITHUB_PRIVATE_KEY', rsa_private_key_pem)
+        old_token = GitHubClient()._generate_jwt()
+        assert GitHubClient()._generate_jwt() == old_token
+
+        new_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+        new_pem = new_key.private_bytes(
+            encoding=serialization.Encoding.PEM,
+            format=serialization.PrivateFormat.TraditionalOpenSSL,
+            encryption_algorithm=serialization.NoEncryption(),
+        ).decode()
+        monkeypatch.setenv('GITHUB_PRIVATE_KEY', new_pem)
+        new_token = GitHubClient()._generate_jwt()
+
+        assert new_token != old_token
+        claims = jwt.decode(new_token, new_key.public_key(), algorithms=['RS256'])
+        assert claims['iss'] == '12345'
+
+
 class TestGitHubClientDeliveryIdLogging:
     """Tests to verify that delivery_id is logged in GitHubClient methods."""
 
-    @patch("app.clients.github_client.requests.post")
+    @patch("app.utils.http.requests.Session.post")
     @patch.object(GitHubClient, "get_installation_access_token")
     def test_registration_token_for_repo_logs_delivery_id(
         self, mock_install_token, mock_post, mock_env_vars, caplog
@@ -180,7 +635,7 @@ class TestGitHubClientDeliveryIdLogging:
             "gh-repo-delivery-001" in r.message for r in caplog.records
         ), "delivery_id not found in log for repo registration token"
 
-    @patch("app.clients.github_client.requests.post")
+    @patch("app.utils.http.requests.Session.post")
     @patch.object(GitHubClient, "get_installation_access_token")
     def test_registration_token_for_org_logs_delivery_id(
         self, mock_install_token, mock_post, mock_env_vars, caplog
@@ -0,0 +1,92 @@
+import time
+import pytest
+from unittest.mock import patch, MagicMock
+from app.clients.github_rate_limit import GitHubRateLimiter, GitHubRateLimitError
+from app.utils import metrics
+
+
+def make_response(status_code=200, headers=None):
+    """Create a mock response with rate limit headers."""
+    response = MagicMock()
+    response.status_code = status_code
+    response.headers = headers or {}
+    return response
+
+
+class TestGitHubRateLimiter:
+    def test_update_tracks_budget_and_exports_gauge(self):
+        """Test that rate limit headers update the budget and the metric."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        limiter.update('67890', make_response(headers={
+            'X-RateLimit-Remaining': '4321',
+            'X-RateLimit-Limit': '5000',
+            'X-RateLimit-Reset': str(int(time.time()) + 600),
+        }))
+
+        assert limiter.stats('67890')['remaining'] == 4321
+        gauges = metrics.snapshot()['gauges']
+        assert gauges['github_rate_limit_remaining{installation="67890"}'] == 4321
+        assert gauges['github_rate_limit_limit{installation="67890"}'] == 5000
+
+    def test_update_ignores_missing_headers(self):
+        """Test that responses without rate limit headers are ignored."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        assert limiter.update('67890', make_response(headers=MagicMock())) is None
+        assert limiter.stats('67890')['remaining'] is None
+
+    def test_retry_after_on_secondary_rate_limit(self):
+        """Test that Retry-After on a 403 is returned and blocks further calls."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        retry_after = limiter.update('67890', make_response(403, {'Retry-After': '3'}))
+
+        assert retry_after == 3
+        with patch('app.clients.github_rate_limit.time.sleep') as mock_sleep:
+            limiter.before_request('67890')
+        assert 2 < mock_sleep.call_args[0][0] <= 3
+
+    def test_primary_rate_limit_on_429(self):
+        """Test that an exhausted budget on a 429 waits until the reset."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        retry_after = limiter.update('67890', make_response(429, {
+            'X-RateLimit-Remaining': '0',
+            'X-RateLimit-Reset': str(int(time.time()) + 2),
+        }))
+        assert 0 < retry_after <= 2
+
+    def test_forbidden_without_rate_limit(self):
+        """Test that a plain 403 is not treated as rate limited."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        assert limiter.update('67890', make_response(403, {'X-RateLimit-Remaining': '100'})) is None
+
+    def test_non_urgent_calls_wait_when_budget_low(self):
+        """Test that non-urgent calls are delayed while urgent calls use the reserve."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        limiter.update('67890', make_response(headers={
+            'X-RateLimit-Remaining': '5',
+            'X-RateLimit-Reset': str(int(time.time()) + 3),
+        }))
+
+        with patch('app.clients.github_rate_limit.time.sleep') as mock_sleep:
+            limiter.before_request('67890', urgent=True)
+            mock_sleep.assert_not_called()
+            limiter.before_request('67890', urgent=False)
+            mock_sleep.assert_called_once()
+        assert metrics.snapshot()['counters']['github_rate_limit_delays_total'] == 1
+
+    def test_wait_longer_than_max_wait_raises(self):
+        """Test that a long wait raises instead of blocking the thread."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        limiter.update('67890', make_response(429, {'Retry-After': '60'}))
+
+        with pytest.raises(GitHubRateLimitError) as exc_info:
+            limiter.before_request('67890')
+        assert exc_info.value.retry_after > 5
+
+    def test_keys_are_independent(self):
+        """Test that the budget is tracked per installation."""
+        limiter = GitHubRateLimiter(reserve=10, max_wait=5)
+        limiter.update('1', make_response(429, {'Retry-After': '60'}))
+
+        with patch('app.clients.github_rate_limit.time.sleep') as mock_sleep:
+            limiter.before_request('2')
+        mock_sleep.assert_not_called()
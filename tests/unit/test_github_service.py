@@ -2,6 +2,7 @@ import pytest
 import json
 from unittest.mock import patch, MagicMock
 from app.services.github_service import GitHubService
+from app.utils.http import REQUEST_TIMEOUT
 
 
 class TestGitHubService:
@@ -18,10 +19,12 @@ class TestGitHubService:
         assert manifest['hook_attributes']['active'] is True
         assert manifest['default_permissions']['administration'] == 'write'
         assert manifest['default_permissions']['organization_self_hosted_runners'] == 'write'
+        assert manifest['default_permissions']['actions'] == 'write'
         assert 'workflow_job' in manifest['default_events']
+        assert 'workflow_run' in manifest['default_events']
         assert manifest['public'] is False
 
-    @patch('app.services.github_service.requests.post')
+    @patch('app.utils.http.requests.Session.post')
     def test_exchange_code_success(self, mock_post):
         """Test exchanging code for app configuration."""
         mock_response = MagicMock()
@@ -37,9 +40,11 @@ class TestGitHubService:
         assert result['id'] == 12345
         assert result['pem'] == 'FAKE_PEM_KEY'
         assert result['slug'] == 'test-app'
-        mock_post.assert_called_once_with('https://api.github.com/app-manifests/test-code-123/conversions', timeout=30)
+        mock_post.assert_called_once_with(
+            'https://api.github.com/app-manifests/test-code-123/conversions', timeout=REQUEST_TIMEOUT
+        )
 
-    @patch('app.services.github_service.requests.post')
+    @patch('app.utils.http.requests.Session.post')
     def test_exchange_code_error(self, mock_post):
         """Test error handling when exchanging code fails."""
         mock_response = MagicMock()
@@ -0,0 +1,35 @@
+import logging
+from unittest.mock import patch
+from app.utils import http
+
+
+class TestHttpSession:
+    def test_session_is_shared(self):
+        """Test that the same pooled session is returned on every call."""
+        assert http.get_session() is http.get_session()
+
+    def test_session_pool_size(self):
+        """Test that the HTTPS adapter keeps POOL_SIZE connections alive."""
+        adapter = http.get_session().get_adapter('https://api.github.com')
+        assert adapter._pool_maxsize == http.POOL_SIZE
+
+    def test_separate_timeouts(self):
+        """Test that connect and read timeouts are separate."""
+        assert http.REQUEST_TIMEOUT == (http.CONNECT_TIMEOUT, http.READ_TIMEOUT)
+        assert http.CONNECT_TIMEOUT < http.READ_TIMEOUT
+
+    @patch('app.utils.http.requests.Session.head')
+    def test_warm_up(self, mock_head):
+        """Test that warm up opens a connection to the GitHub API."""
+        http.warm_up()
+        mock_head.assert_called_once_with('https://api.github.com', timeout=http.REQUEST_TIMEOUT)
+
+    @patch('app.utils.http.requests.Session.head')
+    def test_warm_up_error(self, mock_head, caplog):
+        """Test that a failing warm up is logged and not raised."""
+        mock_head.side_effect = Exception("Connection refused")
+
+        with caplog.at_level(logging.WARNING, logger="app.utils.http"):
+            http.warm_up()
+
+        assert any("Failed to pre-warm" in r.message for r in caplog.records)
@@ -0,0 +1,123 @@
+import time
+import pytest
+from app.services.job_queue import JobQueueFull, MemoryJobQueue, SQLiteJobQueue, job_queue_from_env
+
+
+@pytest.fixture(params=['memory', 'sqlite'])
+def job_queue(request, tmp_path):
+    if request.param == 'memory':
+        return MemoryJobQueue(max_size=2)
+    return SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease=60, max_size=2)
+
+
+class TestJobQueue:
+    def test_put_get_ack(self, job_queue):
+        """Test that jobs are handed out in order and removed on ack."""
+        job_queue.put({'action': 'queued'}, 'delivery-1')
+        job_queue.put({'action': 'completed'}, 'delivery-2')
+
+        job = job_queue.get(timeout=0)
+        assert job.payload == {'action': 'queued'}
+        assert job.delivery_id == 'delivery-1'
+        assert job.attempts == 1
+        job_queue.ack(job)
+
+        assert job_queue.get(timeout=0).delivery_id == 'delivery-2'
+        assert job_queue.size() == 1
+
+    def test_get_empty(self, job_queue):
+        """Test that get returns None once the timeout passed."""
+        assert job_queue.get(timeout=0.1) is None
+
+    def test_nack(self, job_queue):
+        """Test that a released job is handed out again with its attempts counted."""
+        job_queue.put({}, 'delivery-1')
+        job_queue.nack(job_queue.get(timeout=0))
+
+        job = job_queue.get(timeout=0)
+        assert job.delivery_id == 'delivery-1'
+        assert job.attempts == 2
+
+    def test_full(self, job_queue):
+        """Test that put raises JobQueueFull beyond max_size."""
+        job_queue.put({}, 'delivery-1')
+        job_queue.put({}, 'delivery-2')
+        with pytest.raises(JobQueueFull):
+            job_queue.put({}, 'delivery-3')
+
+
+class TestMemoryJobQueue:
+    def test_nack_delay(self):
+        """Test that a job released with a delay is handed out once it is due."""
+        job_queue = MemoryJobQueue()
+        job_queue.put({}, 'delivery-1')
+        job_queue.nack(job_queue.get(timeout=0), delay=0.3)
+        job_queue.put({}, 'delivery-2')
+
+        assert job_queue.get(timeout=0).delivery_id == 'delivery-2'
+        assert job_queue.get(timeout=0) is None
+        assert job_queue.size() == 2
+
+        started = time.monotonic()
+        job = job_queue.get(timeout=2)
+        assert job.delivery_id == 'delivery-1'
+        assert time.monotonic() - started >= 0.2
+
+
+class TestSQLiteJobQueue:
+    def test_leased_job_is_hidden(self, tmp_path):
+        """Test that a leased job is not handed out to a second worker."""
+        job_queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease=60)
+        job_queue.put({}, 'delivery-1')
+
+        assert job_queue.get(timeout=0) is not None
+        assert job_queue.get(timeout=0) is None
+
+    def test_expired_lease(self, tmp_path):
+        """Test that a job of a crashed worker is handed out again after its lease."""
+        job_queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'), lease=0)
+        job_queue.put({}, 'delivery-1')
+        job_queue.get(timeout=0)
+
+        job = job_queue.get(timeout=0)
+        assert job.delivery_id == 'delivery-1'
+        assert job.attempts == 2
+
+    def test_nack_delay(self, tmp_path):
+        """Test that a job released with a delay is hidden until the delay passed."""
+        job_queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+        job_queue.put({}, 'delivery-1')
+        job_queue.nack(job_queue.get(timeout=0), delay=60)
+
+        assert job_queue.get(timeout=0) is None
+        assert job_queue.size() == 1
+
+    def test_survives_restart(self, tmp_path):
+        """Test that queued jobs are kept in the database file."""
+        SQLiteJobQueue(str(tmp_path / 'jobs.db')).put({'action': 'queued'}, 'delivery-1')
+
+        job = SQLiteJobQueue(str(tmp_path / 'jobs.db')).get(timeout=0)
+        assert job.payload == {'action': 'queued'}
+
+
+class TestJobQueueFromEnv:
+    def test_default_memory(self, monkeypatch):
+        """Test that the in-memory queue is the default."""
+        monkeypatch.delenv('GITHUB_JOB_QUEUE', raising=False)
+        job_queue = job_queue_from_env(max_size=5)
+        assert isinstance(job_queue, MemoryJobQueue)
+        assert job_queue.max_size == 5
+
+    def test_sqlite(self, monkeypatch, tmp_path):
+        """Test that sqlite:/// URLs create a SQLite queue."""
+        monkeypatch.setenv('GITHUB_JOB_QUEUE', f"sqlite:///{tmp_path / 'jobs.db'}")
+        monkeypatch.setenv('GITHUB_JOB_QUEUE_LEASE', '120')
+        job_queue = job_queue_from_env()
+        assert job_queue.durable
+        assert job_queue.lease == 120
+
+    def test_unsupported(self, monkeypatch):
+        """Test that unknown queues are rejected."""
+        monkeypatch.setenv('GITHUB_JOB_QUEUE', 'redis://localhost')
+        with pytest.raises(ValueError):
+            job_queue_from_env()
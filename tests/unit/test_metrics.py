@@ -0,0 +1,36 @@
+import base64
+from app.utils import metrics
+
+
+def make_basic_auth_headers(username='cloud', password='test-project'):
+    """Create HTTP Basic Auth headers."""
+    credentials = base64.b64encode(f'{username}:{password}'.encode()).decode()
+    return {'Authorization': f'Basic {credentials}'}
+
+
+class TestMetrics:
+    def test_counters_and_gauges(self):
+        """Test incrementing counters and setting gauges."""
+        metrics.inc('requests_total')
+        metrics.inc('requests_total', 2)
+        metrics.set_gauge('queue_depth', 5)
+
+        snapshot = metrics.snapshot()
+        assert snapshot['counters']['requests_total'] == 3
+        assert snapshot['gauges']['queue_depth'] == 5
+
+
+class TestMetricsRoute:
+    def test_metrics_requires_auth(self, client):
+        """Test that the metrics endpoint requires basic auth."""
+        response = client.get('/metrics')
+        assert response.status_code == 401
+
+    def test_metrics_snapshot(self, client):
+        """Test that the metrics endpoint returns the snapshot."""
+        metrics.inc('github_installation_token_cache_hits_total')
+
+        response = client.get('/metrics', headers=make_basic_auth_headers())
+
+        assert response.status_code == 200
+        assert response.json['counters']['github_installation_token_cache_hits_total'] == 1
@@ -0,0 +1,144 @@
+import threading
+import time
+import pytest
+from unittest.mock import Mock
+from app.services.job_queue import MemoryJobQueue, SQLiteJobQueue
+from app.services.provisioning_workers import ProvisioningWorkers
+from app.utils import metrics
+
+
+class ImmediateRetryQueue(MemoryJobQueue):
+    """In-memory queue retrying without the backoff delay."""
+
+    def nack(self, job, delay=0):
+        super().nack(job)
+
+
+class TestProvisioningWorkers:
+    def test_from_env_disabled(self, monkeypatch):
+        """Test that no workers are created without GITHUB_WEBHOOK_ASYNC."""
+        monkeypatch.delenv('GITHUB_WEBHOOK_ASYNC', raising=False)
+        assert ProvisioningWorkers.from_env(Mock()) is None
+
+    def test_process_deliveries(self):
+        """Test that queued deliveries are processed and failures are counted."""
+        handle = Mock(side_effect=[{'action': 'created', 'runner_name': 'gcp-runner-1'}, Exception("API Error")])
+        workers = ProvisioningWorkers(handle, max_workers=2, max_attempts=1)
+
+        assert workers.submit({'action': 'queued'}, 'async-001')
+        assert workers.submit({'action': 'completed'}, 'async-002')
+
+        assert workers.shutdown(timeout=2) == 0
+        assert handle.call_count == 2
+        counters = metrics.snapshot()['counters']
+        assert counters['provisioning_jobs_total{status="done"}'] == 1
+        assert counters['provisioning_jobs_total{status="failed"}'] == 1
+        assert metrics.snapshot()['gauges']['provisioning_workers_busy'] == 0
+
+    def test_queue_full(self):
+        """Test that deliveries beyond the queue size are rejected."""
+        release = threading.Event()
+        started = threading.Event()
+
+        def handle(payload, delivery_id):
+            started.set()
+            release.wait(2)
+            return {}
+
+        workers = ProvisioningWorkers(handle, max_workers=1, max_queue=1)
+        assert workers.submit({}, 'async-001')
+        assert started.wait(2)
+        assert workers.submit({}, 'async-002')
+        assert not workers.submit({}, 'async-003')
+        assert metrics.snapshot()['counters']['provisioning_queue_rejected_total'] == 1
+
+        release.set()
+        assert workers.shutdown(timeout=2) == 0
+
+    def test_shutdown_drains_and_rejects(self):
+        """Test that shutdown waits for queued deliveries and rejects new ones."""
+        release = threading.Event()
+        workers = ProvisioningWorkers(lambda payload, delivery_id: release.wait(2) and {}, max_workers=1)
+        workers.submit({}, 'async-001')
+
+        assert workers.shutdown(timeout=0.1) == 1
+        assert not workers.submit({}, 'async-002')
+        release.set()
+        assert workers.shutdown(timeout=2) == 0
+
+    def test_retry_failed_delivery(self):
+        """Test that a failed delivery is retried until it succeeds."""
+        handle = Mock(side_effect=[Exception("API Error"), {'action': 'created'}])
+        workers = ProvisioningWorkers(handle, max_workers=1, max_attempts=3, job_queue=ImmediateRetryQueue())
+
+        assert workers.submit({'action': 'queued'}, 'async-001')
+
+        assert workers.shutdown(timeout=2) == 0
+        assert handle.call_count == 2
+        counters = metrics.snapshot()['counters']
+        assert counters['provisioning_jobs_total{status="retried"}'] == 1
+        assert counters['provisioning_jobs_total{status="done"}'] == 1
+
+    def test_dropped_delivery_is_released(self):
+        """Test that a delivery dropped after max_attempts is passed to on_drop."""
+        on_drop = Mock()
+        workers = ProvisioningWorkers(
+            Mock(side_effect=Exception("API Error")), max_workers=1, max_attempts=1, on_drop=on_drop
+        )
+
+        assert workers.submit({'action': 'queued'}, 'async-001')
+
+        assert workers.shutdown(timeout=2) == 0
+        on_drop.assert_called_once_with({'action': 'queued'}, 'async-001')
+        assert metrics.snapshot()['counters']['provisioning_jobs_total{status="failed"}'] == 1
+
+    def test_ingress_only_keeps_durable_jobs(self, tmp_path):
+        """Test that without workers deliveries stay in the durable queue for worker.py."""
+        job_queue = SQLiteJobQueue(str(tmp_path / 'jobs.db'))
+        handle = Mock(return_value={})
+        ingress = ProvisioningWorkers(handle, max_workers=0, job_queue=job_queue)
+
+        assert ingress.submit({'action': 'queued'}, 'async-001')
+        assert ingress.shutdown(timeout=0) == 0
+        assert job_queue.size() == 1
+        handle.assert_not_called()
+
+        worker = ProvisioningWorkers(handle, max_workers=1, job_queue=job_queue)
+        deadline = time.monotonic() + 2
+        while job_queue.size() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        assert worker.shutdown(timeout=2) == 0
+        handle.assert_called_once_with({'action': 'queued'}, 'async-001')
+        assert job_queue.size() == 0
+
+    def test_create_from_env(self, monkeypatch, tmp_path):
+        """Test that GITHUB_JOB_QUEUE selects the SQLite queue."""
+        monkeypatch.setenv('GITHUB_JOB_QUEUE', f"sqlite:///{tmp_path / 'jobs.db'}")
+        monkeypatch.setenv('GITHUB_WEBHOOK_WORKERS', '0')
+        monkeypatch.setenv('GITHUB_JOB_MAX_ATTEMPTS', '5')
+
+        workers = ProvisioningWorkers.create(Mock())
+
+        assert isinstance(workers.job_queue, SQLiteJobQueue)
+        assert workers.max_attempts == 5
+        assert len(workers._threads) == 0
+        assert workers.shutdown(timeout=0) == 0
+
+    def test_no_workers_without_durable_queue(self, monkeypatch):
+        """Test that an in-memory queue without workers is refused, its deliveries would never be processed."""
+        monkeypatch.setenv('GITHUB_WEBHOOK_ASYNC', 'true')
+        monkeypatch.setenv('GITHUB_WEBHOOK_WORKERS', '0')
+        monkeypatch.delenv('GITHUB_JOB_QUEUE', raising=False)
+
+        with pytest.raises(ValueError, match='durable GITHUB_JOB_QUEUE'):
+            ProvisioningWorkers.from_env(Mock())
+
+    def test_create_with_own_worker_count(self, monkeypatch, tmp_path):
+        """Test that worker.py's thread count overrides GITHUB_WEBHOOK_WORKERS of the web app."""
+        monkeypatch.setenv('GITHUB_JOB_QUEUE', f"sqlite:///{tmp_path / 'jobs.db'}")
+        monkeypatch.setenv('GITHUB_WEBHOOK_WORKERS', '0')
+
+        workers = ProvisioningWorkers.create(Mock(), max_workers=2)
+
+        assert len(workers._threads) == 2
+        assert workers.shutdown(timeout=2) == 0
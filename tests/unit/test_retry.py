@@ -0,0 +1,113 @@
+import pytest
+import requests
+from unittest.mock import Mock, MagicMock, patch
+from google.api_core import exceptions as google_exceptions
+from app.utils.retry import RetryPolicy, is_retryable, remaining_budget, time_budget
+from app.utils import metrics
+
+
+def http_error(status_code):
+    """Create a requests HTTPError with the given status code."""
+    response = MagicMock()
+    response.status_code = status_code
+    return requests.exceptions.HTTPError(f"{status_code} Error", response=response)
+
+
+class TestIsRetryable:
+    def test_http_status_codes(self):
+        """Test classification of HTTP errors."""
+        assert is_retryable(http_error(502)) is True
+        assert is_retryable(http_error(503), idempotent=False) is False
+        assert is_retryable(http_error(429), idempotent=False) is True
+        assert is_retryable(http_error(404)) is False
+        assert is_retryable(http_error(401)) is False
+
+    def test_connection_errors(self):
+        """Test that connect timeouts are always retried and read timeouts only if idempotent."""
+        assert is_retryable(requests.exceptions.ConnectTimeout(), idempotent=False) is True
+        assert is_retryable(requests.exceptions.ReadTimeout(), idempotent=False) is False
+        assert is_retryable(requests.exceptions.ReadTimeout()) is True
+        assert is_retryable(requests.exceptions.ConnectionError()) is True
+
+    def test_google_errors(self):
+        """Test classification of Google API errors."""
+        assert is_retryable(google_exceptions.ServiceUnavailable("unavailable"), idempotent=False) is True
+        assert is_retryable(google_exceptions.InternalServerError("internal")) is True
+        assert is_retryable(google_exceptions.InternalServerError("internal"), idempotent=False) is False
+        assert is_retryable(google_exceptions.NotFound("missing")) is False
+        assert is_retryable(google_exceptions.Forbidden("QUOTA_EXCEEDED")) is False
+
+    def test_other_errors(self):
+        """Test that unknown errors are not retried."""
+        assert is_retryable(Exception("API Error")) is False
+        assert is_retryable(ValueError("bad")) is False
+
+
+@patch('app.utils.retry.time.sleep')
+class TestRetryPolicy:
+    def test_success_without_retry(self, mock_sleep):
+        """Test that a successful call is not retried."""
+        func = Mock(return_value='ok')
+        assert RetryPolicy('test').call(func, 1, key='value') == 'ok'
+        func.assert_called_once_with(1, key='value')
+        mock_sleep.assert_not_called()
+
+    def test_retries_transient_errors(self, mock_sleep):
+        """Test that transient errors are retried with backoff."""
+        func = Mock(side_effect=[google_exceptions.ServiceUnavailable("unavailable"), http_error(502), 'ok'])
+        policy = RetryPolicy('test', max_attempts=3, base_delay=0.1, max_delay=1)
+
+        assert policy.call(func) == 'ok'
+        assert func.call_count == 3
+        assert mock_sleep.call_count == 2
+        for call in mock_sleep.call_args_list:
+            assert 0 <= call[0][0] <= 1
+        assert metrics.snapshot()['counters']['retry_attempts_total{operation="test"}'] == 2
+
+    def test_gives_up_after_max_attempts(self, mock_sleep):
+        """Test that the last error is raised after max_attempts."""
+        func = Mock(side_effect=google_exceptions.ServiceUnavailable("unavailable"))
+        with pytest.raises(google_exceptions.ServiceUnavailable):
+            RetryPolicy('test', max_attempts=3, base_delay=0.1).call(func)
+        assert func.call_count == 3
+
+    def test_does_not_retry_permanent_errors(self, mock_sleep):
+        """Test that permanent errors are raised immediately."""
+        func = Mock(side_effect=Exception("API Error"))
+        with pytest.raises(Exception, match="API Error"):
+            RetryPolicy('test').call(func)
+        func.assert_called_once()
+
+    def test_non_idempotent_call(self, mock_sleep):
+        """Test that a non-idempotent call is not retried on ambiguous errors."""
+        func = Mock(side_effect=http_error(500))
+        with pytest.raises(requests.exceptions.HTTPError):
+            RetryPolicy('test').call(func, idempotent=False)
+        func.assert_called_once()
+
+    def test_time_budget_stops_retries(self, mock_sleep):
+        """Test that no retry is attempted once the time budget is used up."""
+        func = Mock(side_effect=google_exceptions.ServiceUnavailable("unavailable"))
+        policy = RetryPolicy('test', max_attempts=5, base_delay=10, max_delay=10)
+
+        with patch('app.utils.retry.random.uniform', return_value=5):
+            with time_budget(1):
+                with pytest.raises(google_exceptions.ServiceUnavailable):
+                    policy.call(func)
+
+        func.assert_called_once()
+        assert metrics.snapshot()['counters']['retry_budget_exhausted_total{operation="test"}'] == 1
+
+
+class TestTimeBudget:
+    def test_budget_scope(self):
+        """Test that the budget only applies within the block."""
+        assert remaining_budget() is None
+        with time_budget(5):
+            assert 4 < remaining_budget() <= 5
+        assert remaining_budget() is None
+
+    def test_zero_disables_budget(self):
+        """Test that a zero budget disables the deadline."""
+        with time_budget(0):
+            assert remaining_budget() is None
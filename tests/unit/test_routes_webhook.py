@@ -1,6 +1,10 @@
 import json
 import logging
-from unittest.mock import patch
+import threading
+import time
+from unittest.mock import MagicMock, patch
+from app.routes.webhook import get_webhook_service, init_webhook_service_in_background
+from app.utils import metrics
 
 
 class TestWebhookRoutes:
@@ -33,6 +37,54 @@ class TestWebhookRoutes:
             sample_workflow_job_payload, delivery_id="abc-123-def"
         )
 
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_webhook_service_is_shared(self, mock_webhook_service, mock_verify, app, client,
+                                       sample_workflow_job_payload):
+        """Test that the WebhookService and its clients are created once per app, not per delivery."""
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_job.return_value = {
+            "action": "created",
+            "runner_name": "runner-abc123"
+        }
+
+        for job_id, delivery_id in enumerate(('delivery-1', 'delivery-2', 'delivery-3')):
+            workflow_job = dict(sample_workflow_job_payload['workflow_job'], id=job_id)
+            payload = dict(sample_workflow_job_payload, workflow_job=workflow_job)
+            response = client.post(
+                '/webhook',
+                data=json.dumps(payload),
+                content_type='application/json',
+                headers={'X-GitHub-Event': 'workflow_job', 'X-GitHub-Delivery': delivery_id}
+            )
+            assert response.status_code == 200
+
+        mock_webhook_service.assert_called_once_with()
+        assert app.extensions['webhook_service'] is mock_webhook_service.return_value
+        assert mock_webhook_service.return_value.handle_workflow_job.call_count == 3
+        mock_webhook_service.return_value.start.assert_called_once_with()
+
+    @patch('app.routes.webhook.WebhookService')
+    def test_ingress_does_not_start_background_tasks(self, mock_webhook_service, app, monkeypatch):
+        """Test that a web app leaving provisioning to worker.py does not run the pool and reconciler loops."""
+        monkeypatch.setenv('GITHUB_WEBHOOK_ASYNC', 'true')
+        monkeypatch.setenv('GITHUB_WEBHOOK_WORKERS', '0')
+
+        assert get_webhook_service(app) is mock_webhook_service.return_value
+        mock_webhook_service.return_value.start.assert_not_called()
+
+    @patch('app.routes.webhook.WebhookService')
+    def test_init_webhook_service_in_background(self, mock_webhook_service, app):
+        """Test that the shared WebhookService can be created before the first delivery."""
+        init_webhook_service_in_background(app)
+        for thread in threading.enumerate():
+            if thread.name == 'webhook-service-init':
+                thread.join(2)
+
+        assert get_webhook_service(app) is mock_webhook_service.return_value
+        mock_webhook_service.assert_called_once_with()
+        mock_webhook_service.return_value.gcloud_client.load_templates.assert_called_once_with()
+
     @patch('app.routes.webhook.verify_github_signature')
     @patch('app.routes.webhook.WebhookService')
     def test_workflow_job_webhook_created_response(self, mock_webhook_service, mock_verify, client):
@@ -194,6 +246,171 @@ class TestWebhookRoutes:
         # Security improvement: we now return generic 'Internal error' instead of exposing the actual error
         assert response.json['message'] == 'Internal error'
 
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_workflow_job_webhook_async(self, mock_webhook_service, mock_verify, app, client,
+                                        sample_workflow_job_payload, monkeypatch):
+        """Test that deliveries are validated, answered with 202 and processed by the workers."""
+        monkeypatch.setenv('GITHUB_WEBHOOK_ASYNC', 'true')
+        mock_verify.return_value = True
+        mock_service_instance = mock_webhook_service.return_value
+        processed = threading.Event()
+        mock_service_instance.handle_workflow_job.side_effect = lambda *args, **kwargs: (
+            processed.set() or {'action': 'created', 'runner_name': 'runner-abc123'}
+        )
+
+        response = client.post(
+            '/webhook',
+            data=json.dumps(sample_workflow_job_payload),
+            content_type='application/json',
+            headers={
+                'X-GitHub-Event': 'workflow_job',
+                'X-GitHub-Delivery': 'delivery-async-001'
+            }
+        )
+
+        assert response.status_code == 202
+        assert response.json['status'] == 'accepted'
+        mock_service_instance.validate_payload.assert_called_once_with(sample_workflow_job_payload)
+        assert processed.wait(2)
+        mock_service_instance.handle_workflow_job.assert_called_once_with(
+            sample_workflow_job_payload, delivery_id='delivery-async-001'
+        )
+        assert app.extensions['provisioning_workers'].shutdown(timeout=2) == 0
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_workflow_job_webhook_async_queue_full(self, mock_webhook_service, mock_verify, app, client,
+                                                   sample_workflow_job_payload):
+        """Test that a full provisioning queue is answered with 503."""
+        mock_verify.return_value = True
+        workers = MagicMock()
+        workers.submit.return_value = False
+        app.extensions['provisioning_workers'] = workers
+
+        response = client.post(
+            '/webhook',
+            data=json.dumps(sample_workflow_job_payload),
+            content_type='application/json',
+            headers={
+                'X-GitHub-Event': 'workflow_job',
+                'X-GitHub-Delivery': 'delivery-async-002'
+            }
+        )
+
+        assert response.status_code == 503
+        mock_webhook_service.return_value.handle_workflow_job.assert_not_called()
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_duplicate_delivery(self, mock_webhook_service, mock_verify, client, sample_workflow_job_payload):
+        """Test that redeliveries of a delivery and repeats of a job are answered without processing."""
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_job.return_value = {
+            "action": "created",
+            "runner_name": "runner-abc123"
+        }
+
+        statuses = []
+        for delivery_id in ('delivery-dup-1', 'delivery-dup-1', 'delivery-dup-2'):
+            response = client.post(
+                '/webhook',
+                data=json.dumps(sample_workflow_job_payload),
+                content_type='application/json',
+                headers={'X-GitHub-Event': 'workflow_job', 'X-GitHub-Delivery': delivery_id}
+            )
+            assert response.status_code == 200
+            statuses.append(response.json['status'])
+
+        assert statuses == ['success', 'duplicate', 'duplicate']
+        mock_webhook_service.return_value.handle_workflow_job.assert_called_once()
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_failed_delivery_is_not_duplicate(self, mock_webhook_service, mock_verify, client,
+                                              sample_workflow_job_payload):
+        """Test that the redelivery of a failed delivery is processed again."""
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_job.side_effect = [
+            Exception("API Error"),
+            {"action": "created", "runner_name": "runner-abc123"},
+        ]
+
+        for expected in (500, 200):
+            response = client.post(
+                '/webhook',
+                data=json.dumps(sample_workflow_job_payload),
+                content_type='application/json',
+                headers={'X-GitHub-Event': 'workflow_job', 'X-GitHub-Delivery': 'delivery-retry-1'}
+            )
+            assert response.status_code == expected
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_workflow_run_webhook(self, mock_webhook_service, mock_verify, client):
+        """Test that workflow_run deliveries are passed to the re-run of preempted jobs."""
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_run.return_value = {'action': 'rerun', 'runner_name': None}
+        payload = {'action': 'completed', 'workflow_run': {'id': 42, 'conclusion': 'failure'}}
+
+        response = client.post(
+            '/webhook',
+            data=json.dumps(payload),
+            content_type='application/json',
+            headers={'X-GitHub-Event': 'workflow_run', 'X-GitHub-Delivery': 'delivery-run-001'}
+        )
+
+        assert response.status_code == 200
+        assert response.json == {'status': 'success', 'action': 'rerun'}
+        mock_webhook_service.return_value.handle_workflow_run.assert_called_once_with(
+            payload, delivery_id='delivery-run-001'
+        )
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_dropped_async_delivery_is_not_duplicate(self, mock_webhook_service, mock_verify, app, client,
+                                                     sample_workflow_job_payload, monkeypatch):
+        """Test that the redelivery of an accepted delivery dropped by the workers is processed again."""
+        monkeypatch.setenv('GITHUB_WEBHOOK_ASYNC', 'true')
+        monkeypatch.setenv('GITHUB_JOB_MAX_ATTEMPTS', '1')
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_job.side_effect = Exception("API Error")
+
+        statuses = []
+        for dropped in (1, 2):
+            response = client.post(
+                '/webhook',
+                data=json.dumps(sample_workflow_job_payload),
+                content_type='application/json',
+                headers={'X-GitHub-Event': 'workflow_job', 'X-GitHub-Delivery': 'delivery-dropped-1'}
+            )
+            statuses.append(response.json['status'])
+            deadline = time.monotonic() + 2
+            while app.extensions['provisioning_workers'].pending() and time.monotonic() < deadline:
+                time.sleep(0.05)
+            assert metrics.snapshot()['counters']['provisioning_jobs_total{status="failed"}'] == dropped
+
+        assert statuses == ['accepted', 'accepted']
+        assert mock_webhook_service.return_value.handle_workflow_job.call_count == 2
+
+    @patch('app.routes.webhook.verify_github_signature')
+    @patch('app.routes.webhook.WebhookService')
+    def test_dedup_disabled(self, mock_webhook_service, mock_verify, client, sample_workflow_job_payload, monkeypatch):
+        """Test that GITHUB_DEDUP_TTL=0 processes every delivery."""
+        monkeypatch.setenv('GITHUB_DEDUP_TTL', '0')
+        mock_verify.return_value = True
+        mock_webhook_service.return_value.handle_workflow_job.return_value = {"action": "created"}
+
+        for _ in range(2):
+            client.post(
+                '/webhook',
+                data=json.dumps(sample_workflow_job_payload),
+                content_type='application/json',
+                headers={'X-GitHub-Event': 'workflow_job', 'X-GitHub-Delivery': 'delivery-same'}
+            )
+
+        assert mock_webhook_service.return_value.handle_workflow_job.call_count == 2
+
     @patch('app.routes.webhook.verify_github_signature')
     def test_webhook_invalid_signature(self, mock_verify, client):
         """Test webhook with invalid signature."""
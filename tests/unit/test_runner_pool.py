@@ -0,0 +1,156 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock
+from app.services.runner_pool import RunnerPool, parse_pool_sizes
+from app.utils import metrics
+
+
+def make_instance(name, status, claimed=False):
+    instance = MagicMock()
+    instance.name = name
+    instance.status = status
+    instance.claimed = claimed
+    return instance
+
+
+def make_gcloud_client(instances, ready=()):
+    gcloud_client = MagicMock()
+    gcloud_client.list_pool_instances.return_value = instances
+    gcloud_client.is_pool_instance_claimed.side_effect = lambda instance: instance.claimed
+    gcloud_client.is_pool_instance_ready.side_effect = lambda name: name in ready
+    gcloud_client.create_pool_instance.return_value = 'gcp-runner-new'
+    return gcloud_client
+
+
+class TestParsePoolSizes:
+    def test_parse_pool_sizes(self):
+        """Test parsing label=size pairs."""
+        assert parse_pool_sizes('gcp-ubuntu-24.04=2, gcp-ubuntu-24.04-arm=1') == {
+            'gcp-ubuntu-24.04': 2,
+            'gcp-ubuntu-24.04-arm': 1,
+        }
+
+    def test_parse_pool_sizes_invalid(self):
+        """Test that empty, zero and invalid entries are skipped."""
+        assert parse_pool_sizes('gcp-a=x,gcp-b=0,,gcp-c') == {}
+        assert parse_pool_sizes(None) == {}
+
+
+class TestRunnerPool:
+    def test_from_env_disabled(self, monkeypatch):
+        """Test that no pool is created without GCE_WARM_POOL."""
+        monkeypatch.delenv('GCE_WARM_POOL', raising=False)
+        assert RunnerPool.from_env(MagicMock()) is None
+
+    def test_refill(self):
+        """Test that suspended instances become ready, booted ones are suspended and missing ones created."""
+        suspended = make_instance('gcp-runner-1', 'SUSPENDED')
+        gcloud_client = make_gcloud_client([
+            suspended,
+            make_instance('gcp-runner-2', 'RUNNING'),
+            make_instance('gcp-runner-3', 'RUNNING'),
+            make_instance('gcp-runner-4', 'SUSPENDED', claimed=True),
+            make_instance('gcp-runner-5', 'TERMINATED'),
+        ], ready={'gcp-runner-3'})
+        pool = RunnerPool(gcloud_client, {'gcp-ubuntu-24.04': 5})
+
+        pool.refill('gcp-ubuntu-24.04')
+
+        gcloud_client.suspend_instance.assert_called_once_with('gcp-runner-3')
+        # 1 ready and 2 booting instances, 2 are missing
+        assert gcloud_client.create_pool_instance.call_count == 2
+        assert metrics.snapshot()['gauges']['gce_warm_pool_ready{label="gcp-ubuntu-24.04"}'] == 1
+        assert pool.acquire('gcp-ubuntu-24.04') is suspended
+        assert pool.acquire('gcp-ubuntu-24.04') is None
+
+        counters = metrics.snapshot()['counters']
+        assert counters['gce_warm_pool_hits_total{label="gcp-ubuntu-24.04"}'] == 1
+        assert counters['gce_warm_pool_misses_total{label="gcp-ubuntu-24.04"}'] == 1
+
+    def test_refill_full_pool(self):
+        """Test that a full pool creates no instances."""
+        gcloud_client = make_gcloud_client([make_instance('gcp-runner-1', 'SUSPENDED')])
+        pool = RunnerPool(gcloud_client, {'gcp-ubuntu-24.04': 1})
+
+        pool.refill('gcp-ubuntu-24.04')
+
+        gcloud_client.create_pool_instance.assert_not_called()
+
+    def test_refill_all_logs_errors(self):
+        """Test that a failing label does not stop the refill of other labels."""
+        gcloud_client = make_gcloud_client([])
+        gcloud_client.list_pool_instances.side_effect = [Exception("API Error"), []]
+        pool = RunnerPool(gcloud_client, {'gcp-a': 1, 'gcp-b': 1})
+
+        pool.refill_all()
+
+        gcloud_client.create_pool_instance.assert_called_once_with('gcp-b')
+
+    def test_wake_resumes(self):
+        """Test that a claimed instance is resumed."""
+        gcloud_client = MagicMock()
+        RunnerPool(gcloud_client, {'gcp-a': 1}).wake('gcp-runner-1', delivery_id='pool-001')
+        gcloud_client.resume_instance.assert_called_once_with('gcp-runner-1', delivery_id='pool-001')
+
+    def test_from_env_stop_mode(self, monkeypatch):
+        """Test that the stop mode and maximum age are read from the environment."""
+        monkeypatch.setenv('GCE_WARM_POOL', 'gcp-a=1')
+        monkeypatch.setenv('GCE_WARM_POOL_MODE', 'stop')
+        monkeypatch.setenv('GCE_WARM_POOL_MAX_AGE', '3600')
+        pool = RunnerPool.from_env(MagicMock())
+        assert pool.mode == 'stop'
+        assert pool.max_age == 3600
+
+
+class TestRunnerPoolStopMode:
+    def test_refill_stop_mode(self):
+        """Test that stopped instances become ready, surplus and old ones are deleted and none are created."""
+        now = datetime.now(timezone.utc)
+        fresh = make_instance('gcp-runner-1', 'TERMINATED')
+        fresh.creation_timestamp = now.isoformat()
+        older = make_instance('gcp-runner-2', 'TERMINATED')
+        older.creation_timestamp = (now - timedelta(hours=1)).isoformat()
+        expired = make_instance('gcp-runner-3', 'TERMINATED')
+        expired.creation_timestamp = (now - timedelta(days=2)).isoformat()
+        gcloud_client = make_gcloud_client([older, expired, fresh, make_instance('gcp-runner-4', 'STOPPING')])
+        pool = RunnerPool(gcloud_client, {'gcp-a': 1}, mode='stop', max_age=24 * 60 * 60)
+
+        pool.refill('gcp-a')
+
+        deleted = [call.args[0] for call in gcloud_client.delete_runner_instance.call_args_list]
+        assert sorted(deleted) == ['gcp-runner-2', 'gcp-runner-3']
+        gcloud_client.create_pool_instance.assert_not_called()
+        assert pool.acquire('gcp-a') is fresh
+
+    def test_wake_starts(self):
+        """Test that a claimed instance is started in stop mode."""
+        gcloud_client = MagicMock()
+        RunnerPool(gcloud_client, {'gcp-a': 1}, mode='stop').wake('gcp-runner-1', delivery_id='pool-002')
+        gcloud_client.start_instance.assert_called_once_with('gcp-runner-1', delivery_id='pool-002')
+
+    def test_recycle(self):
+        """Test that a completed runner is returned to a pool with free space."""
+        gcloud_client = make_gcloud_client([])
+        instance = make_instance('gcp-runner-1', 'RUNNING')
+        instance.creation_timestamp = datetime.now(timezone.utc).isoformat()
+        gcloud_client.get_instance.return_value = instance
+        pool = RunnerPool(gcloud_client, {'gcp-a': 1}, mode='stop')
+
+        assert pool.recycle('gcp-runner-1', 'gcp-a', delivery_id='pool-003')
+
+        gcloud_client.recycle_pool_instance.assert_called_once_with(instance, 'gcp-a', delivery_id='pool-003')
+        assert metrics.snapshot()['counters']['gce_warm_pool_recycled_total{label="gcp-a"}'] == 1
+
+    def test_recycle_rejected(self):
+        """Test that runners are not recycled in suspend mode, into full pools or when too old."""
+        gcloud_client = make_gcloud_client([])
+        assert not RunnerPool(gcloud_client, {'gcp-a': 1}).recycle('gcp-runner-1', 'gcp-a')
+        assert not RunnerPool(gcloud_client, {'gcp-a': 1}, mode='stop').recycle('gcp-runner-1', 'gcp-b')
+
+        full = make_gcloud_client([make_instance('gcp-runner-2', 'TERMINATED')])
+        assert not RunnerPool(full, {'gcp-a': 1}, mode='stop').recycle('gcp-runner-1', 'gcp-a')
+
+        instance = make_instance('gcp-runner-1', 'RUNNING')
+        instance.creation_timestamp = '2020-01-01T00:00:00.000-07:00'
+        gcloud_client.get_instance.return_value = instance
+        assert not RunnerPool(gcloud_client, {'gcp-a': 1}, mode='stop').recycle('gcp-runner-1', 'gcp-a')
+        gcloud_client.recycle_pool_instance.assert_not_called()
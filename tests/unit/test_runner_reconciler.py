@@ -0,0 +1,162 @@
+from datetime import datetime, timedelta, timezone
+from unittest.mock import MagicMock, patch
+import requests
+from app.services.runner_reconciler import RunnerReconciler
+from app.utils import metrics
+
+
+def make_instance(name, pool=False, claimed=False, age=timedelta(hours=1), scope=('my-org', 'repo')):
+    instance = MagicMock()
+    instance.name = name
+    instance.pool = pool
+    instance.claimed = claimed
+    instance.scope = scope
+    instance.creation_timestamp = (datetime.now(timezone.utc) - age).isoformat()
+    return instance
+
+
+def make_reconciler(instances, runners, grace=0, idle_timeout=0):
+    gcloud_client = MagicMock()
+    gcloud_client.iter_runner_instances.side_effect = lambda: iter(instances)
+    gcloud_client.is_pool_instance.side_effect = lambda instance: instance.pool
+    gcloud_client.is_pool_instance_claimed.side_effect = lambda instance: instance.claimed
+    gcloud_client.runner_scope.side_effect = lambda instance: instance.scope
+    github_client = MagicMock()
+    github_client.list_runners.return_value = runners
+    reconciler = RunnerReconciler(
+        gcloud_client, MagicMock(return_value=github_client), grace=grace, idle_timeout=idle_timeout
+    )
+    reconciler.remember_scope(None, 'my-org', 'my-org/repo')
+    return reconciler, gcloud_client, github_client
+
+
+class TestRunnerReconciler:
+    def test_from_env_disabled(self, monkeypatch):
+        """Test that no reconciler is created without GCE_RECONCILE_INTERVAL."""
+        monkeypatch.delenv('GCE_RECONCILE_INTERVAL', raising=False)
+        assert RunnerReconciler.from_env(MagicMock(), MagicMock()) is None
+
+    def test_reconcile(self):
+        """Test that gone, offline and idle runners are deleted, busy runners and pool instances are kept."""
+        reconciler, gcloud_client, github_client = make_reconciler(
+            [
+                make_instance('gcp-runner-gone'),
+                make_instance('gcp-runner-offline'),
+                make_instance('gcp-runner-idle'),
+                make_instance('gcp-runner-busy'),
+                make_instance('gcp-runner-pool', pool=True),
+            ],
+            [
+                {'name': 'gcp-runner-offline', 'status': 'offline', 'busy': False},
+                {'name': 'gcp-runner-idle', 'status': 'online', 'busy': False},
+                {'name': 'gcp-runner-busy', 'status': 'online', 'busy': True},
+            ],
+        )
+
+        deleted = reconciler.reconcile()
+
+        assert deleted == ['gcp-runner-gone', 'gcp-runner-offline', 'gcp-runner-idle']
+        github_client.list_runners.assert_called_once_with(org_name='my-org', repo_name=None)
+        counters = metrics.snapshot()['counters']
+        assert counters['gce_orphans_deleted_total{reason="gone"}'] == 1
+        assert counters['gce_orphans_deleted_total{reason="idle"}'] == 1
+
+    def test_grace_period(self):
+        """Test that runners are only deleted after being missing for the grace period."""
+        reconciler, gcloud_client, _ = make_reconciler([make_instance('gcp-runner-1')], [], grace=600)
+
+        with patch('app.services.runner_reconciler.time.monotonic', return_value=1000):
+            assert reconciler.reconcile() == []
+        with patch('app.services.runner_reconciler.time.monotonic', return_value=1599):
+            assert reconciler.reconcile() == []
+        with patch('app.services.runner_reconciler.time.monotonic', return_value=1600):
+            assert reconciler.reconcile() == ['gcp-runner-1']
+
+    def test_young_instance_is_kept(self):
+        """Test that instances younger than the grace period are not deleted while they boot."""
+        reconciler, gcloud_client, _ = make_reconciler(
+            [make_instance('gcp-runner-1', age=timedelta(seconds=10))], [], grace=60
+        )
+
+        with patch('app.services.runner_reconciler.time.monotonic', return_value=1000):
+            reconciler.reconcile()
+        with patch('app.services.runner_reconciler.time.monotonic', return_value=2000):
+            assert reconciler.reconcile() == []
+        gcloud_client.delete_runner_instance.assert_not_called()
+
+    def test_runner_list_is_cached(self):
+        """Test that the GitHub runner list is reused within one interval."""
+        reconciler, _, github_client = make_reconciler(
+            [make_instance('gcp-runner-1'), make_instance('gcp-runner-2')],
+            [{'name': 'gcp-runner-1', 'status': 'online', 'busy': True}],
+        )
+
+        reconciler.reconcile()
+        reconciler.reconcile()
+
+        github_client.list_runners.assert_called_once()
+
+    def test_failed_runner_list_skips_reconciliation(self):
+        """Test that nothing is deleted if a runner list cannot be fetched."""
+        reconciler, gcloud_client, github_client = make_reconciler([make_instance('gcp-runner-1')], [])
+        github_client.list_runners.side_effect = Exception("API Error")
+
+        assert reconciler.reconcile() == []
+        gcloud_client.delete_runner_instance.assert_not_called()
+
+    def test_instance_without_scope_is_kept(self):
+        """Test that an instance without owner and repository labels is not classified."""
+        reconciler, gcloud_client, github_client = make_reconciler([make_instance('gcp-runner-1', scope=None)], [])
+
+        assert reconciler.reconcile() == []
+        github_client.list_runners.assert_not_called()
+
+    def test_scopes_are_listed_separately(self):
+        """Test that each instance is compared with its own organization and a failed listing only skips its scope."""
+        runners = {
+            'org-a': [{'name': 'gcp-runner-a-busy', 'status': 'online', 'busy': True}],
+            'org-b': Exception("API Error"),
+        }
+
+        def list_runners(org_name=None, repo_name=None):
+            if isinstance(runners[org_name], Exception):
+                raise runners[org_name]
+            return runners[org_name]
+
+        reconciler, gcloud_client, github_client = make_reconciler(
+            [
+                make_instance('gcp-runner-a-busy', scope=('org-a', 'repo')),
+                make_instance('gcp-runner-a-gone', scope=('org-a', 'repo')),
+                make_instance('gcp-runner-b-busy', scope=('org-b', 'repo')),
+            ],
+            [],
+        )
+        github_client.list_runners.side_effect = list_runners
+
+        assert reconciler.reconcile() == ['gcp-runner-a-gone']
+        assert github_client.list_runners.call_count == 2
+
+    def test_unknown_owner_after_restart(self):
+        """Test that owners without queued jobs are looked up with the configured installation."""
+        def list_runners(org_name=None, repo_name=None):
+            if org_name == 'my-org':
+                return [{'name': 'gcp-runner-org', 'status': 'online', 'busy': True}]
+            if repo_name == 'my-user/repo':
+                return []
+            raise requests.exceptions.HTTPError(response=MagicMock(status_code=404))
+
+        gcloud_client = MagicMock()
+        gcloud_client.iter_runner_instances.side_effect = lambda: iter([
+            make_instance('gcp-runner-org', scope=('my-org', 'repo')),
+            make_instance('gcp-runner-user', scope=('my-user', 'repo')),
+        ])
+        gcloud_client.is_pool_instance.return_value = False
+        gcloud_client.runner_scope.side_effect = lambda instance: instance.scope
+        github_client = MagicMock()
+        github_client.list_runners.side_effect = list_runners
+        github_client_for = MagicMock(return_value=github_client)
+        reconciler = RunnerReconciler(gcloud_client, github_client_for, grace=0, idle_timeout=0)
+
+        assert reconciler.reconcile() == ['gcp-runner-user']
+        github_client_for.assert_called_with(None)
+        assert reconciler._owners == {'my-user': (None, False)}
@@ -0,0 +1,144 @@
+import threading
+import time
+from unittest.mock import Mock
+from app.utils.token_cache import TokenCache
+from app.utils import metrics
+
+
+class TestTokenCache:
+    def test_miss_then_hit(self):
+        """Test that a cached token is returned without fetching again."""
+        cache = TokenCache('test', refresh_margin=60)
+        fetch = Mock(return_value=('TOKEN', time.time() + 3600))
+
+        assert cache.get('key', fetch) == 'TOKEN'
+        assert cache.get('key', fetch) == 'TOKEN'
+
+        fetch.assert_called_once()
+        assert cache.stats() == {'hits': 1, 'misses': 1, 'renewals': 0, 'evictions': 0, 'size': 1}
+
+    def test_refresh_within_margin(self):
+        """Test that a token close to expiry is refreshed."""
+        cache = TokenCache('test', refresh_margin=300)
+        fetch = Mock(side_effect=[
+            ('OLD', time.time() + 120),
+            ('NEW', time.time() + 3600),
+        ])
+
+        assert cache.get('key', fetch) == 'OLD'
+        assert cache.get('key', fetch) == 'NEW'
+        assert fetch.call_count == 2
+
+    def test_keys_are_independent(self):
+        """Test that different keys are cached separately."""
+        cache = TokenCache('test')
+        assert cache.get('a', lambda: ('A', time.time() + 3600)) == 'A'
+        assert cache.get('b', lambda: ('B', time.time() + 3600)) == 'B'
+        assert cache.stats()['size'] == 2
+
+    def test_max_entries_evicts_least_recently_used(self):
+        """Test that the least recently used key is evicted when the cache is full."""
+        cache = TokenCache('test', max_entries=2)
+        cache.get('a', lambda: ('A', time.time() + 3600))
+        cache.get('b', lambda: ('B', time.time() + 3600))
+        # Touch 'a' so 'b' becomes the least recently used entry
+        cache.get('a', lambda: ('A2', time.time() + 3600))
+        cache.get('c', lambda: ('C', time.time() + 3600))
+
+        assert cache.get('a', lambda: ('A2', time.time() + 3600)) == 'A'
+        assert cache.get('b', lambda: ('B2', time.time() + 3600)) == 'B2'
+        assert cache.stats()['size'] == 2
+        assert cache.stats()['evictions'] == 2
+        assert metrics.snapshot()['counters']['test_cache_evictions_total'] == 2
+
+    def test_single_flight(self):
+        """Test that concurrent misses only trigger one fetch."""
+        cache = TokenCache('test')
+        started = threading.Event()
+        release = threading.Event()
+        calls = []
+
+        def fetch():
+            calls.append(1)
+            started.set()
+            release.wait(2)
+            return 'TOKEN', time.time() + 3600
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(cache.get('key', fetch))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        started.wait(2)
+        release.set()
+        for thread in threads:
+            thread.join(2)
+
+        assert len(calls) == 1
+        assert results == ['TOKEN'] * 8
+
+    def test_fetch_error_is_not_cached(self):
+        """Test that a failed fetch propagates and is retried on the next call."""
+        cache = TokenCache('test')
+        fetch = Mock(side_effect=[Exception("API Error"), ('TOKEN', time.time() + 3600)])
+
+        try:
+            cache.get('key', fetch)
+        except Exception as e:
+            assert str(e) == "API Error"
+        assert cache.get('key', fetch) == 'TOKEN'
+
+    def test_invalidate_and_clear(self):
+        """Test that invalidated tokens are fetched again."""
+        cache = TokenCache('test')
+        fetch = Mock(return_value=('TOKEN', time.time() + 3600))
+        cache.get('key', fetch)
+        cache.invalidate('key')
+        cache.get('key', fetch)
+        assert fetch.call_count == 2
+
+        cache.clear()
+        assert cache.stats() == {'hits': 0, 'misses': 0, 'renewals': 0, 'evictions': 0, 'size': 0}
+
+    def test_background_renewal(self):
+        """Test that a token in the renew window is returned while a new one is fetched in the background."""
+        cache = TokenCache('test', refresh_margin=60, renew_margin=300)
+        renewed = threading.Event()
+
+        def fetch_new():
+            renewed.set()
+            return 'NEW', time.time() + 3600
+
+        cache.get('key', lambda: ('OLD', time.time() + 120))
+        assert cache.get('key', fetch_new) == 'OLD'
+        assert renewed.wait(2)
+
+        for _ in range(100):
+            if cache.stats()['renewals'] == 1:
+                break
+            time.sleep(0.01)
+        assert cache.get('key', fetch_new) == 'NEW'
+
+    def test_background_renewal_failure_keeps_token(self):
+        """Test that a failed background renewal keeps serving the cached token."""
+        cache = TokenCache('test', refresh_margin=60, renew_margin=300)
+        failed = threading.Event()
+
+        def fetch_error():
+            failed.set()
+            raise Exception("API Error")
+
+        cache.get('key', lambda: ('OLD', time.time() + 120))
+        assert cache.get('key', fetch_error) == 'OLD'
+        assert failed.wait(2)
+        assert cache.get('key', lambda: ('OLD', time.time() + 120)) == 'OLD'
+
+    def test_metrics_counters(self):
+        """Test that hits and misses are exported as metrics."""
+        cache = TokenCache('test')
+        fetch = Mock(return_value=('TOKEN', time.time() + 3600))
+        cache.get('key', fetch)
+        cache.get('key', fetch)
+
+        counters = metrics.snapshot()['counters']
+        assert counters['test_cache_hits_total'] == 1
+        assert counters['test_cache_misses_total'] == 1
@@ -1,7 +1,10 @@
 import pytest
 import logging
 from unittest.mock import Mock, patch
+from google.api_core import exceptions as google_exceptions
 from app.services.webhook_service import WebhookService
+from app.utils import metrics
+from app.utils.retry import remaining_budget
 
 
 class TestWebhookService:
@@ -42,6 +45,7 @@ class TestWebhookService:
             'gcp-ubuntu-24.04',
             'owner/repo',
             delivery_id="delivery-001",
+            runner_labels=None,
         )
 
     @patch('app.services.webhook_service.GCloudClient')
@@ -242,6 +246,681 @@ class TestWebhookService:
             'gcp-runner-12345', delivery_id="delivery-delerr-001"
         )
 
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_runs_within_time_budget(self, mock_gh_client_class, mock_gc_client_class,
+                                                       monkeypatch):
+        """Test that provisioning runs within the per-delivery time budget."""
+        monkeypatch.setenv('DELIVERY_TIME_BUDGET', '5')
+        budgets = []
+
+        def get_registration_token(**kwargs):
+            budgets.append(remaining_budget())
+            return "fake-token"
+
+        mock_gh_client = Mock()
+        mock_gh_client.get_registration_token.side_effect = get_registration_token
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client_class.return_value = Mock()
+
+        service = WebhookService()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+        service.handle_workflow_job(payload, delivery_id="delivery-budget-001")
+
+        assert 4 < budgets[0] <= 5
+        assert remaining_budget() is None
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_jit_mode(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that JIT mode creates a JIT config for the instance name instead of a registration token."""
+        monkeypatch.setenv('GITHUB_RUNNER_PROVISIONING_MODE', 'jit')
+        mock_gh_client = Mock()
+        mock_gh_client.generate_jit_config.return_value = "ENCODED"
+        mock_gh_client_class.return_value = mock_gh_client
+
+        mock_gc_client = Mock()
+        mock_gc_client.template_exists.return_value = True
+        mock_gc_client.new_instance_name.return_value = "gcp-runner-jit123"
+        mock_gc_client.create_runner_instance.return_value = "gcp-runner-jit123"
+        mock_gc_client_class.return_value = mock_gc_client
+
+        service = WebhookService()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'organization': {'login': 'my-org'},
+            'repository': {
+                'html_url': 'https://github.com/my-org/repo',
+                'full_name': 'my-org/repo',
+                'owner': {'html_url': 'https://github.com/my-org'}
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-jit-001")
+
+        assert result == {"action": "created", "runner_name": "gcp-runner-jit123"}
+        mock_gh_client.get_registration_token.assert_not_called()
+        mock_gh_client.generate_jit_config.assert_called_once_with(
+            "gcp-runner-jit123",
+            ['gcp-ubuntu-24.04'],
+            org_name='my-org',
+            repo_name=None,
+            delivery_id="delivery-jit-001",
+        )
+        mock_gc_client.create_runner_instance.assert_called_once_with(
+            None,
+            'https://github.com/my-org',
+            'gcp-ubuntu-24.04',
+            'my-org/repo',
+            delivery_id="delivery-jit-001",
+            jit_config="ENCODED",
+            instance_name="gcp-runner-jit123",
+            runner_labels=None,
+        )
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_jit_mode_no_template(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that a job without matching template is ignored before any GitHub call."""
+        monkeypatch.setenv('GITHUB_RUNNER_PROVISIONING_MODE', 'jit')
+        mock_gh_client = Mock()
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client.template_exists.return_value = False
+        mock_gc_client_class.return_value = mock_gc_client
+
+        service = WebhookService()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-unknown']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-jit-002")
+
+        assert result == {"action": "ignored", "runner_name": None}
+        mock_gh_client.generate_jit_config.assert_not_called()
+        mock_gc_client.create_runner_instance.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_routes_to_installation(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that the registration token is requested as the installation that sent the webhook."""
+        default_client = Mock()
+        default_client.installation_id = '12345'
+        installation_client = Mock()
+        installation_client.get_registration_token.return_value = "OTHER_TOKEN"
+        mock_gh_client_class.side_effect = [default_client, installation_client]
+
+        mock_gc_client = Mock()
+        mock_gc_client.create_runner_instance.return_value = "gcp-runner-other"
+        mock_gc_client_class.return_value = mock_gc_client
+
+        service = WebhookService()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'organization': {'login': 'other-org'},
+            'installation': {'id': 67890},
+            'repository': {
+                'html_url': 'https://github.com/other-org/repo',
+                'full_name': 'other-org/repo',
+                'owner': {'html_url': 'https://github.com/other-org'}
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-inst-001")
+
+        assert result == {"action": "created", "runner_name": "gcp-runner-other"}
+        mock_gh_client_class.assert_called_with(installation_id=67890)
+        default_client.get_registration_token.assert_not_called()
+        installation_client.get_registration_token.assert_called_once_with(
+            org_name='other-org', delivery_id="delivery-inst-001"
+        )
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_default_installation(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that the default client is reused for the configured installation."""
+        default_client = Mock()
+        default_client.installation_id = '12345'
+        default_client.get_registration_token.return_value = "TOKEN"
+        mock_gh_client_class.return_value = default_client
+        mock_gc_client_class.return_value = Mock()
+
+        service = WebhookService()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'installation': {'id': 12345},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        service.handle_workflow_job(payload, delivery_id="delivery-inst-002")
+
+        mock_gh_client_class.assert_called_once_with()
+        default_client.get_registration_token.assert_called_once()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_validate_payload_invalid_installation(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a malformed installation field is rejected."""
+        service = WebhookService()
+        with pytest.raises(ValueError, match="Invalid installation field"):
+            service.handle_workflow_job({'action': 'queued', 'installation': 'x'})
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_failed_provision_is_retried_once(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a runner whose insert operation failed is replaced once."""
+        mock_gh_client = Mock()
+        mock_gh_client.get_registration_token.return_value = "TOKEN"
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client.create_runner_instance.side_effect = ["gcp-runner-1", "gcp-runner-2"]
+        mock_gc_client_class.return_value = mock_gc_client
+
+        service = WebhookService()
+        assert mock_gc_client.on_provision_failure == service._on_provision_failure
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+        service.handle_workflow_job(payload, delivery_id="delivery-op-001")
+
+        service._on_provision_failure(['gcp-runner-1'], Exception("ZONE_RESOURCE_POOL_EXHAUSTED"))
+        assert mock_gc_client.create_runner_instance.call_count == 2
+        assert mock_gc_client.create_runner_instance.call_args == mock_gc_client.create_runner_instance.call_args_list[0]
+
+        # The replacement failed as well, give up
+        service._on_provision_failure(['gcp-runner-2'], Exception("ZONE_RESOURCE_POOL_EXHAUSTED"))
+        assert mock_gc_client.create_runner_instance.call_count == 2
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_failed_provision_of_unknown_instance(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that failures of instances this service did not create are ignored."""
+        mock_gc_client = Mock()
+        mock_gc_client_class.return_value = mock_gc_client
+
+        WebhookService()._on_provision_failure(['gcp-runner-unknown'], Exception("Insert Error"))
+
+        mock_gc_client.create_runner_instance.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_from_warm_pool(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that a queued job claims and resumes a warm pool instance."""
+        monkeypatch.setenv('GCE_WARM_POOL', 'gcp-ubuntu-24.04=1')
+        mock_gh_client = Mock()
+        mock_gh_client.get_registration_token.return_value = "TOKEN"
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client_class.return_value = mock_gc_client
+
+        with patch('app.services.webhook_service.RunnerPool') as mock_pool_class:
+            mock_pool = mock_pool_class.from_env.return_value
+            taken = Mock()
+            taken.name = 'gcp-runner-taken'
+            pooled = Mock()
+            pooled.name = 'gcp-runner-pooled'
+            mock_pool.acquire.side_effect = [taken, pooled]
+            mock_gc_client.claim_pool_instance.side_effect = [
+                google_exceptions.PreconditionFailed("Fingerprint changed"), None
+            ]
+            service = WebhookService()
+
+        mock_pool.start.assert_not_called()
+        service.start()
+        mock_pool.start.assert_called_once()
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-pool-001")
+
+        assert result == {"action": "created", "runner_name": "gcp-runner-pooled"}
+        mock_gc_client.claim_pool_instance.assert_called_with(
+            pooled,
+            'https://github.com/owner/repo',
+            'TOKEN',
+            'gcp-ubuntu-24.04',
+            jit_config=None,
+            runner_labels=None,
+            instance_label='owner/repo',
+        )
+        mock_pool.wake.assert_called_once_with('gcp-runner-pooled', delivery_id="delivery-pool-001")
+        mock_pool.request_refill.assert_called_once()
+        mock_gc_client.create_runner_instance.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_handle_queued_job_empty_warm_pool(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a new instance is created if the warm pool is empty."""
+        mock_gh_client = Mock()
+        mock_gh_client.get_registration_token.return_value = "TOKEN"
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client.create_runner_instance.return_value = "gcp-runner-new"
+        mock_gc_client_class.return_value = mock_gc_client
+
+        with patch('app.services.webhook_service.RunnerPool') as mock_pool_class:
+            mock_pool_class.from_env.return_value.acquire.return_value = None
+            service = WebhookService()
+
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-pool-002")
+
+        assert result == {"action": "created", "runner_name": "gcp-runner-new"}
+        mock_gc_client.claim_pool_instance.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_warm_pool_resume_failure_deletes_instance(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a claimed instance that cannot be resumed is deleted and a new one created."""
+        mock_gh_client_class.return_value = Mock()
+        mock_gc_client = Mock()
+        mock_gc_client.create_runner_instance.return_value = "gcp-runner-new"
+        mock_gc_client_class.return_value = mock_gc_client
+
+        with patch('app.services.webhook_service.RunnerPool') as mock_pool_class:
+            mock_pool = mock_pool_class.from_env.return_value
+            pooled = Mock()
+            pooled.name = 'gcp-runner-pooled'
+            mock_pool.acquire.return_value = pooled
+            mock_pool.wake.side_effect = Exception("Resume Error")
+            service = WebhookService()
+
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-pool-003")
+
+        assert result == {"action": "created", "runner_name": "gcp-runner-new"}
+        mock_gc_client.delete_runner_instance.assert_called_once_with(
+            'gcp-runner-pooled', delivery_id="delivery-pool-003"
+        )
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_completed_job_is_recycled(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a completed runner returned to the warm pool is not deleted."""
+        mock_gh_client_class.return_value = Mock()
+        mock_gc_client = Mock()
+        mock_gc_client_class.return_value = mock_gc_client
+
+        with patch('app.services.webhook_service.RunnerPool') as mock_pool_class:
+            mock_pool = mock_pool_class.from_env.return_value
+            mock_pool.recycle.side_effect = [True, False]
+            service = WebhookService()
+
+        payload = {
+            'action': 'completed',
+            'workflow_job': {'runner_name': 'gcp-runner-1', 'labels': ['self-hosted', 'gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-recycle-001")
+        assert result == {"action": "deleted", "runner_name": "gcp-runner-1"}
+        mock_pool.recycle.assert_called_once_with('gcp-runner-1', 'gcp-ubuntu-24.04', delivery_id="delivery-recycle-001")
+        mock_gc_client.delete_runner_instance.assert_not_called()
+
+        service.handle_workflow_job(payload, delivery_id="delivery-recycle-002")
+        mock_gc_client.delete_runner_instance.assert_called_once_with('gcp-runner-1', delivery_id="delivery-recycle-002")
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_queued_job_scope_is_reconciled(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that the scope of a created runner is passed to the reconciler."""
+        monkeypatch.setenv('GCE_RECONCILE_INTERVAL', '300')
+        mock_gh_client_class.return_value.get_registration_token.return_value = "TOKEN"
+        mock_gc_client_class.return_value.create_runner_instance.return_value = "gcp-runner-1"
+
+        with patch('app.services.webhook_service.RunnerReconciler.start') as mock_start:
+            service = WebhookService()
+            mock_start.assert_not_called()
+            service.start()
+        mock_start.assert_called_once()
+
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            },
+            'installation': {'id': 24680},
+        }
+        service.handle_workflow_job(payload, delivery_id="delivery-reconcile-001")
+
+        assert service.reconciler._owners == {'owner': (24680, False)}
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_preempted_job_pauses_spot(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a job failed on a preempted Spot VM pauses Spot for the label and waits for its run to re-run."""
+        mock_gh_client = Mock()
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client.is_spot_label.return_value = True
+        mock_gc_client.was_preempted.return_value = True
+        mock_gc_client_class.return_value = mock_gc_client
+        service = WebhookService()
+
+        payload = {
+            'action': 'completed',
+            'workflow_job': {
+                'id': 555,
+                'run_attempt': 1,
+                'conclusion': 'failure',
+                'runner_name': 'gcp-runner-1',
+                'labels': ['gcp-ubuntu-24.04'],
+            },
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-spot-001")
+
+        assert result == {"action": "deleted", "runner_name": "gcp-runner-1"}
+        mock_gc_client.was_preempted.assert_called_once_with('gcp-runner-1')
+        mock_gc_client.spot_unavailable.assert_called_once_with('gcp-ubuntu-24.04', 'preempted')
+        mock_gh_client.rerun_job.assert_not_called()
+        mock_gc_client.delete_runner_instance.assert_called_once()
+
+    @staticmethod
+    def _run_payload(run_attempt=1, conclusion='failure'):
+        return {
+            'action': 'completed',
+            'workflow_run': {'id': 42, 'run_attempt': run_attempt, 'conclusion': conclusion},
+            'repository': {'html_url': 'https://github.com/owner/repo', 'full_name': 'owner/repo'},
+        }
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_completed_run_reruns_preempted_jobs(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that the failed jobs of a completed run are re-run if all of them were preempted."""
+        mock_gh_client = mock_gh_client_class.return_value
+        mock_gh_client.list_run_jobs.return_value = [
+            {'id': 555, 'conclusion': 'failure', 'runner_name': 'gcp-runner-1', 'labels': ['gcp-ubuntu-24.04']},
+            {'id': 556, 'conclusion': 'failure', 'runner_name': 'gcp-runner-2', 'labels': ['gcp-ubuntu-24.04']},
+            {'id': 557, 'conclusion': 'success', 'runner_name': 'gcp-runner-3', 'labels': ['gcp-ubuntu-24.04']},
+        ]
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.is_spot_label.return_value = True
+        mock_gc_client.was_preempted.return_value = True
+        service = WebhookService()
+
+        result = service.handle_workflow_run(self._run_payload(), delivery_id="delivery-run-001")
+
+        assert result == {'action': 'rerun', 'runner_name': None}
+        mock_gh_client.list_run_jobs.assert_called_once_with('owner/repo', 42)
+        mock_gh_client.rerun_failed_jobs.assert_called_once_with('owner/repo', 42, delivery_id="delivery-run-001")
+        mock_gh_client.rerun_job.assert_not_called()
+
+        # The re-run failed again, the limit is reached
+        assert service.handle_workflow_run(self._run_payload(run_attempt=2))['action'] == 'ignored'
+        mock_gh_client.rerun_failed_jobs.assert_called_once()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_completed_run_reruns_only_preempted_job(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a preempted job is re-run alone if the run has other failures."""
+        mock_gh_client = mock_gh_client_class.return_value
+        mock_gh_client.list_run_jobs.return_value = [
+            {'id': 555, 'conclusion': 'failure', 'runner_name': 'gcp-runner-1', 'labels': ['gcp-ubuntu-24.04']},
+            {'id': 556, 'conclusion': 'failure', 'runner_name': 'gcp-runner-2', 'labels': ['gcp-ubuntu-24.04']},
+        ]
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.is_spot_label.return_value = True
+        mock_gc_client.was_preempted.side_effect = lambda runner_name: runner_name == 'gcp-runner-2'
+        service = WebhookService()
+
+        assert service.handle_workflow_run(self._run_payload())['action'] == 'rerun'
+
+        mock_gh_client.rerun_job.assert_called_once_with('owner/repo', 556, delivery_id=None)
+        mock_gh_client.rerun_failed_jobs.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_successful_run_is_ignored(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that only failed runs list their jobs."""
+        service = WebhookService()
+
+        assert service.handle_workflow_run(self._run_payload(conclusion='success'))['action'] == 'ignored'
+        mock_gh_client_class.return_value.list_run_jobs.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_failed_job_without_preemption_is_not_rerun(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that regular job failures on Spot VMs are not re-run."""
+        mock_gh_client = Mock()
+        mock_gh_client_class.return_value = mock_gh_client
+        mock_gc_client = Mock()
+        mock_gc_client.is_spot_label.return_value = True
+        mock_gc_client.was_preempted.return_value = False
+        mock_gc_client_class.return_value = mock_gc_client
+
+        WebhookService()._handle_completed_job(
+            {'id': 555, 'conclusion': 'failure', 'runner_name': 'gcp-runner-1', 'labels': ['gcp-ubuntu-24.04']},
+            repo_name='owner/repo',
+        )
+
+        mock_gh_client.rerun_job.assert_not_called()
+        mock_gc_client.spot_unavailable.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_queued_job_held_without_quota(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that a job without quota is held and created once a completion frees quota."""
+        monkeypatch.setenv('GCE_QUOTA_ADMISSION', 'true')
+        mock_gh_client_class.return_value.get_registration_token.return_value = "TOKEN"
+        mock_gc_client = Mock()
+        mock_gc_client.reserve_quota.side_effect = [False, True]
+        mock_gc_client.has_quota.return_value = True
+        mock_gc_client.create_runner_instance.return_value = "gcp-runner-1"
+        mock_gc_client_class.return_value = mock_gc_client
+        service = WebhookService()
+        service.admission_queue.start = Mock()
+
+        payload = {
+            'action': 'queued',
+            'workflow_job': {'labels': ['gcp-ubuntu-24.04']},
+            'repository': {
+                'html_url': 'https://github.com/owner/repo',
+                'full_name': 'owner/repo'
+            }
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-held-001")
+
+        assert result == {"action": "held", "runner_name": None}
+        mock_gc_client.create_runner_instance.assert_not_called()
+        assert service.admission_queue.size() == 1
+
+        assert service.admission_queue.drain() == 1
+        mock_gc_client.create_runner_instance.assert_called_once_with(
+            "TOKEN", 'https://github.com/owner/repo', 'gcp-ubuntu-24.04', 'owner/repo',
+            delivery_id="delivery-held-001", runner_labels=None
+        )
+        assert service.admission_queue.size() == 0
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_queued_job_dropped_when_held_queue_full(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that a job without quota is reported as dropped when no more jobs can be held."""
+        monkeypatch.setenv('GCE_QUOTA_ADMISSION', 'true')
+        monkeypatch.setenv('GCE_ADMISSION_MAX_HELD', '1')
+        mock_gh_client_class.return_value.get_registration_token.return_value = "TOKEN"
+        mock_gc_client = Mock()
+        mock_gc_client.reserve_quota.return_value = False
+        mock_gc_client_class.return_value = mock_gc_client
+        service = WebhookService()
+        service.admission_queue.start = Mock()
+
+        payload = self._job_payload('queued', 1)
+        assert service.handle_workflow_job(payload, delivery_id="delivery-held-001") == {
+            "action": "held", "runner_name": None
+        }
+
+        result = service.handle_workflow_job(payload, delivery_id="delivery-held-002")
+
+        assert result == {"action": "held_queue_full", "runner_name": None}
+        mock_gc_client.create_runner_instance.assert_not_called()
+        assert service.admission_queue.size() == 1
+
+    @staticmethod
+    def _job_payload(action, job_id, runner_name=None):
+        return {
+            'action': action,
+            'workflow_job': {'id': job_id, 'labels': ['gcp-ubuntu-24.04'], 'runner_name': runner_name},
+            'repository': {'html_url': 'https://github.com/owner/repo', 'full_name': 'owner/repo'},
+        }
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_cancelled_job_deletes_its_runner(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that the runner of a job completed before pickup is deleted."""
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.create_runner_instance.return_value = 'gcp-runner-a'
+        mock_gh_client_class.return_value.list_runners.return_value = [{'name': 'gcp-runner-a', 'busy': False}]
+        service = WebhookService()
+
+        service.handle_workflow_job(self._job_payload('queued', 1), delivery_id='delivery-cancel-001')
+        result = service.handle_workflow_job(self._job_payload('completed', 1), delivery_id='delivery-cancel-002')
+
+        assert result == {'action': 'deleted', 'runner_name': 'gcp-runner-a'}
+        mock_gc_client.delete_runner_instance.assert_called_once_with('gcp-runner-a', delivery_id='delivery-cancel-002')
+        assert metrics.snapshot()['counters']['gce_unassigned_runners_released_total'] == 1
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_cancelled_job_spares_busy_runner(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a runner that picked up another job is kept and the other job's runner is deleted."""
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.create_runner_instance.side_effect = ['gcp-runner-a', 'gcp-runner-b']
+        mock_gh_client_class.return_value.list_runners.return_value = [{'name': 'gcp-runner-a', 'busy': True}]
+        service = WebhookService()
+
+        service.handle_workflow_job(self._job_payload('queued', 1))
+        service.handle_workflow_job(self._job_payload('queued', 2))
+        service.handle_workflow_job(self._job_payload('in_progress', 2, 'gcp-runner-a'))
+        result = service.handle_workflow_job(self._job_payload('completed', 1))
+
+        assert result['runner_name'] == 'gcp-runner-b'
+        mock_gc_client.delete_runner_instance.assert_called_once_with('gcp-runner-b', delivery_id=None)
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_cancelled_job_keeps_runner_busy_on_github(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that the runner of a cancelled job is kept if GitHub reports it busy with another job."""
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.create_runner_instance.return_value = 'gcp-runner-a'
+        mock_gh_client = mock_gh_client_class.return_value
+        mock_gh_client.list_runners.return_value = [
+            {'name': 'gcp-runner-other', 'busy': False},
+            {'name': 'gcp-runner-a', 'busy': True},
+        ]
+        service = WebhookService()
+
+        service.handle_workflow_job(self._job_payload('queued', 1))
+        result = service.handle_workflow_job(self._job_payload('completed', 1))
+
+        assert result['runner_name'] is None
+        mock_gh_client.list_runners.assert_called_once_with(org_name=None, repo_name='owner/repo', name='gcp-runner-a')
+        mock_gc_client.delete_runner_instance.assert_not_called()
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_completed_job_forgets_runner(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a repeated completion without runner does not delete the finished job's runner again."""
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.create_runner_instance.return_value = 'gcp-runner-a'
+        service = WebhookService()
+
+        service.handle_workflow_job(self._job_payload('queued', 1))
+        service.handle_workflow_job(self._job_payload('completed', 1, 'gcp-runner-a'))
+        result = service.handle_workflow_job(self._job_payload('completed', 1))
+
+        assert result['runner_name'] is None
+        mock_gc_client.delete_runner_instance.assert_called_once_with('gcp-runner-a', delivery_id=None)
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_queued_job_without_template_rejected(self, mock_gh_client_class, mock_gc_client_class):
+        """Test that a job whose label has no template is ignored without a registration token."""
+        mock_gc_client = mock_gc_client_class.return_value
+        mock_gc_client.template_exists.return_value = False
+        service = WebhookService()
+
+        result = service.handle_workflow_job(self._job_payload('queued', 1), delivery_id='delivery-reject-001')
+
+        assert result == {'action': 'ignored', 'runner_name': None}
+        mock_gh_client_class.return_value.get_registration_token.assert_not_called()
+        mock_gc_client.create_runner_instance.assert_not_called()
+        assert metrics.snapshot()['counters']['webhook_jobs_rejected_total'] == 1
+
+    @patch('app.services.webhook_service.GCloudClient')
+    @patch('app.services.webhook_service.GitHubClient')
+    def test_queued_job_combined_labels(self, mock_gh_client_class, mock_gc_client_class, monkeypatch):
+        """Test that label rules select the combined template and register the runner with the job's labels."""
+        monkeypatch.setenv('GCE_LABEL_RULES', 'ARM64=arm')
+        mock_gh_client_class.return_value.get_registration_token.return_value = 'TOKEN'
+        mock_gc_client = mock_gc_client_class.return_value
+        service = WebhookService()
+        payload = self._job_payload('queued', 1)
+        payload['workflow_job']['labels'] = ['arm64', 'gcp-ubuntu-24.04']
+
+        service.handle_workflow_job(payload, delivery_id='delivery-combined-001')
+
+        mock_gc_client.template_exists.assert_called_once_with('gcp-ubuntu-24.04-arm')
+        mock_gc_client.create_runner_instance.assert_called_once_with(
+            'TOKEN', 'https://github.com/owner/repo', 'gcp-ubuntu-24.04-arm', 'owner/repo',
+            delivery_id='delivery-combined-001', runner_labels=['gcp-ubuntu-24.04', 'arm64']
+        )
+
 
 class TestWebhookServiceDeliveryIdLogging:
     """Tests to verify that delivery_id is logged throughout the webhook service."""
@@ -400,6 +1079,7 @@ class TestWebhookServiceDeliveryIdLogging:
             "gcp-ubuntu-24.04",
             "owner/repo",
             delivery_id="fwd-create-001",
+            runner_labels=None,
         )
 
     @patch("app.services.webhook_service.GCloudClient")
@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the cost of creating the webhook service and its API clients.
+Compares constructing a new WebhookService (GitHubClient and GCloudClient
+with fresh Compute Engine clients) for every delivery with looking up
+the WebhookService shared by the app.
+"""
+
+import argparse
+import logging
+import os
+import sys
+import time
+from unittest.mock import patch
+import google.auth
+from google.auth.credentials import AnonymousCredentials
+
+# Allow running the script from the tools directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app import create_app  # noqa: E402
+from app.routes.webhook import get_webhook_service  # noqa: E402
+from app.services import WebhookService  # noqa: E402
+
+
+def measure(func, iterations):
+    """Return the mean duration of func in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def run(iterations):
+    """Print the mean cost of a new and of the shared WebhookService."""
+    app = create_app()
+    logging.getLogger().setLevel(logging.ERROR)
+
+    per_request = measure(WebhookService, iterations)
+    get_webhook_service(app)
+    shared = measure(lambda: get_webhook_service(app), iterations)
+
+    print(f"Iterations:                 {iterations}")
+    print(f"New WebhookService:         {per_request:10.1f} µs/delivery")
+    print(f"Shared WebhookService:      {shared:10.1f} µs/delivery")
+    print(f"Saved per delivery:         {per_request - shared:10.1f} µs")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark WebhookService construction.")
+    parser.add_argument("--iterations", type=int, default=100, help="Calls per measurement")
+    args = parser.parse_args()
+
+    os.environ.setdefault('GOOGLE_CLOUD_PROJECT', 'benchmark-project')
+
+    try:
+        google.auth.default()
+    except google.auth.exceptions.DefaultCredentialsError:
+        # Without Application Default Credentials, only the client construction itself is measured
+        print("No Application Default Credentials found, using anonymous credentials.")
+        with patch('google.auth.default', return_value=(AnonymousCredentials(), None)):
+            run(args.iterations)
+        return
+
+    run(args.iterations)
+
+
+if __name__ == "__main__":
+    main()
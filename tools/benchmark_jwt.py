@@ -0,0 +1,73 @@
+#!/usr/bin/env python3
+
+"""
+Benchmark the cost of creating a GitHub App JWT.
+Compares parsing the PEM and signing a new RS256 JWT on every call,
+signing with the already deserialized key, and the cached JWT
+returned by GitHubClient._generate_jwt().
+"""
+
+import argparse
+import os
+import sys
+import time
+import jwt
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import rsa
+
+# Allow running the script from the tools directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from app.clients import github_client  # noqa: E402
+from app.clients.github_client import GitHubClient  # noqa: E402
+
+
+def generate_private_key():
+    """Generate a throwaway 2048-bit RSA key (GitHub App keys have the same size)."""
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    return key.private_bytes(
+        encoding=serialization.Encoding.PEM,
+        format=serialization.PrivateFormat.TraditionalOpenSSL,
+        encryption_algorithm=serialization.NoEncryption(),
+    ).decode()
+
+
+def measure(func, iterations):
+    """Return the mean duration of func in microseconds."""
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark GitHub App JWT generation.")
+    parser.add_argument("--iterations", type=int, default=1000, help="Calls per measurement")
+    args = parser.parse_args()
+
+    os.environ['GITHUB_APP_ID'] = '12345'
+    os.environ['GITHUB_INSTALLATION_ID'] = '67890'
+    pem = generate_private_key()
+    os.environ['GITHUB_PRIVATE_KEY'] = pem
+
+    client = GitHubClient()
+    github_client.clear_private_key_cache()
+    github_client.jwt_cache.clear()
+
+    def parse_and_sign():
+        now = int(time.time())
+        return jwt.encode({'iat': now, 'exp': now + 600, 'iss': client.app_id}, pem, algorithm='RS256')
+
+    parsed = measure(parse_and_sign, args.iterations)
+    uncached = measure(lambda: client._sign_jwt(), args.iterations)
+    cached = measure(lambda: client._generate_jwt(), args.iterations)
+
+    print(f"Iterations:                 {args.iterations}")
+    print(f"Parse PEM and sign:         {parsed:10.1f} µs/call")
+    print(f"Sign with parsed key:       {uncached:10.1f} µs/call")
+    print(f"Cached JWT:                 {cached:10.1f} µs/call")
+    print(f"Speedup (cached vs parse):  {parsed / cached:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+
+"""
+Entry point for the provisioning worker of the GitHub Actions Runners manager.
+This script processes the webhook deliveries that the web app queued in the
+durable job queue, so ingress and provisioning can be scaled independently.
+"""
+
+import logging
+import os
+import signal
+import threading
+from dotenv import load_dotenv
+from app.services import WebhookService
+from app.services.delivery_dedup import DeliveryDeduplicator
+from app.services.provisioning_workers import ProvisioningWorkers
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger('worker')
+
+
+def main():
+    # GITHUB_WEBHOOK_WORKERS is 0 in the web app when this worker provisions, so it has its own setting
+    max_workers = int(os.environ.get('GITHUB_JOB_WORKERS', 4))
+    if max_workers < 1:
+        raise SystemExit("worker.py needs at least one GITHUB_JOB_WORKERS thread")
+
+    webhook_service = WebhookService()
+    webhook_service.gcloud_client.load_templates()
+    webhook_service.start()
+    # With a shared GITHUB_DEDUP_STORE, the redelivery of a dropped delivery is processed again
+    deduplicator = DeliveryDeduplicator.from_env()
+    workers = ProvisioningWorkers.create(
+        lambda payload, delivery_id: webhook_service.handle_workflow_job(payload, delivery_id=delivery_id),
+        max_workers=max_workers,
+        on_drop=deduplicator.release if deduplicator else None,
+    )
+    if not workers.job_queue.durable:
+        raise SystemExit("worker.py needs a durable GITHUB_JOB_QUEUE, e.g. sqlite:///var/lib/runner/jobs.db")
+
+    stopped = threading.Event()
+    signal.signal(signal.SIGTERM, lambda signum, frame: stopped.set())
+    signal.signal(signal.SIGINT, lambda signum, frame: stopped.set())
+    logger.info("Provisioning worker started")
+    stopped.wait()
+
+    # Finish the running deliveries, queued ones stay in the queue for the next worker
+    logger.info("Provisioning worker stopping")
+    workers.shutdown()
+
+
+if __name__ == "__main__":
+    main()